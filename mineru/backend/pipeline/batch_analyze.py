@@ -8,6 +8,7 @@ import numpy as np
 
 from .model_init import AtomModelSingleton
 from .model_list import AtomicModel
+from .ocr_rec_queue import OcrRecQueue
 from ...utils.config_reader import get_formula_enable, get_table_enable
 from ...utils.model_utils import crop_img, get_res_list_from_layout_res, clean_vram
 from ...utils.ocr_utils import merge_det_boxes, update_det_boxes, sorted_boxes
@@ -20,6 +21,7 @@ MFR_BASE_BATCH_SIZE = 16
 OCR_DET_BASE_BATCH_SIZE = 16
 TABLE_ORI_CLS_BATCH_SIZE = 16
 TABLE_Wired_Wireless_CLS_BATCH_SIZE = 16
+TABLE_WIRED_BATCH_SIZE = 4
 
 
 class BatchAnalyze:
@@ -108,133 +110,6 @@ class BatchAnalyze:
                                                 'wired_table_img':wired_table_img,
                                               })
 
-        # 表格识别 table recognition
-        if self.table_enable:
-
-            # 图片旋转批量处理
-            img_orientation_cls_model = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.ImgOrientationCls,
-            )
-            try:
-                if self.enable_ocr_det_batch:
-                    img_orientation_cls_model.batch_predict(table_res_list_all_page,
-                                                            det_batch_size=self.batch_ratio * OCR_DET_BASE_BATCH_SIZE,
-                                                            batch_size=TABLE_ORI_CLS_BATCH_SIZE)
-                else:
-                    for table_res in table_res_list_all_page:
-                        rotate_label = img_orientation_cls_model.predict(table_res['table_img'])
-                        img_orientation_cls_model.img_rotate(table_res, rotate_label)
-            except Exception as e:
-                logger.warning(
-                    f"Image orientation classification failed: {e}, using original image"
-                )
-
-            # 表格分类
-            table_cls_model = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.TableCls,
-            )
-            try:
-                table_cls_model.batch_predict(table_res_list_all_page,
-                                              batch_size=TABLE_Wired_Wireless_CLS_BATCH_SIZE)
-            except Exception as e:
-                logger.warning(
-                    f"Table classification failed: {e}, using default model"
-                )
-
-            # OCR det 过程，顺序执行
-            rec_img_lang_group = defaultdict(list)
-            det_ocr_engine = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.OCR,
-                det_db_box_thresh=0.5,
-                det_db_unclip_ratio=1.6,
-                enable_merge_det_boxes=False,
-            )
-            for index, table_res_dict in enumerate(
-                    tqdm(table_res_list_all_page, desc="Table-ocr det")
-            ):
-                bgr_image = cv2.cvtColor(table_res_dict["table_img"], cv2.COLOR_RGB2BGR)
-                ocr_result = det_ocr_engine.ocr(bgr_image, rec=False)[0]
-                # 构造需要 OCR 识别的图片字典，包括cropped_img, dt_box, table_id，并按照语言进行分组
-                for dt_box in ocr_result:
-                    rec_img_lang_group[_lang].append(
-                        {
-                            "cropped_img": get_rotate_crop_image(
-                                bgr_image, np.asarray(dt_box, dtype=np.float32)
-                            ),
-                            "dt_box": np.asarray(dt_box, dtype=np.float32),
-                            "table_id": index,
-                        }
-                    )
-
-            # OCR rec，按照语言分批处理
-            for _lang, rec_img_list in rec_img_lang_group.items():
-                ocr_engine = atom_model_manager.get_atom_model(
-                    atom_model_name=AtomicModel.OCR,
-                    det_db_box_thresh=0.5,
-                    det_db_unclip_ratio=1.6,
-                    lang=_lang,
-                    enable_merge_det_boxes=False,
-                )
-                cropped_img_list = [item["cropped_img"] for item in rec_img_list]
-                ocr_res_list = ocr_engine.ocr(cropped_img_list, det=False, tqdm_enable=True, tqdm_desc=f"Table-ocr rec {_lang}")[0]
-                # 按照 table_id 将识别结果进行回填
-                for img_dict, ocr_res in zip(rec_img_list, ocr_res_list):
-                    if table_res_list_all_page[img_dict["table_id"]].get("ocr_result"):
-                        table_res_list_all_page[img_dict["table_id"]]["ocr_result"].append(
-                            [img_dict["dt_box"], html.escape(ocr_res[0]), ocr_res[1]]
-                        )
-                    else:
-                        table_res_list_all_page[img_dict["table_id"]]["ocr_result"] = [
-                            [img_dict["dt_box"], html.escape(ocr_res[0]), ocr_res[1]]
-                        ]
-
-            clean_vram(self.model.device, vram_threshold=8)
-
-            # 先对所有表格使用无线表格模型，然后对分类为有线的表格使用有线表格模型
-            wireless_table_model = atom_model_manager.get_atom_model(
-                atom_model_name=AtomicModel.WirelessTable,
-            )
-            wireless_table_model.batch_predict(table_res_list_all_page)
-
-            # 单独拿出有线表格进行预测
-            wired_table_res_list = []
-            for table_res_dict in table_res_list_all_page:
-                # logger.debug(f"Table classification result: {table_res_dict["table_res"]["cls_label"]} with confidence {table_res_dict["table_res"]["cls_score"]}")
-                if (
-                    (table_res_dict["table_res"]["cls_label"] == AtomicModel.WirelessTable and table_res_dict["table_res"]["cls_score"] < 0.9)
-                    or table_res_dict["table_res"]["cls_label"] == AtomicModel.WiredTable
-                ):
-                    wired_table_res_list.append(table_res_dict)
-                del table_res_dict["table_res"]["cls_label"]
-                del table_res_dict["table_res"]["cls_score"]
-            if wired_table_res_list:
-                for table_res_dict in tqdm(
-                        wired_table_res_list, desc="Table-wired Predict"
-                ):
-                    if not table_res_dict.get("ocr_result", None):
-                        continue
-
-                    wired_table_model = atom_model_manager.get_atom_model(
-                        atom_model_name=AtomicModel.WiredTable,
-                        lang=table_res_dict["lang"],
-                    )
-                    table_res_dict["table_res"]["html"] = wired_table_model.predict(
-                        table_res_dict["wired_table_img"],
-                        table_res_dict["ocr_result"],
-                        table_res_dict["table_res"].get("html", None)
-                    )
-
-            # 表格格式清理
-            for table_res_dict in table_res_list_all_page:
-                html_code = table_res_dict["table_res"].get("html", "") or ""
-
-                # 检查html_code是否包含'<table>'和'</table>'
-                if "<table>" in html_code and "</table>" in html_code:
-                    # 选用<table>到</table>的内容，放入table_res_dict['table_res']['html']
-                    start_index = html_code.find("<table>")
-                    end_index = html_code.rfind("</table>") + len("</table>")
-                    table_res_dict["table_res"]["html"] = html_code[start_index:end_index]
-
         # OCR det
         if self.enable_ocr_det_batch:
             # 批处理模式 - 按语言和分辨率分组
@@ -279,80 +154,48 @@ class BatchAnalyze:
                     lang=lang
                 )
 
-                # 按分辨率分组并同时完成padding
-                # RESOLUTION_GROUP_STRIDE = 32
-                RESOLUTION_GROUP_STRIDE = 64  # 定义分辨率分组的步进值
-
-                resolution_groups = defaultdict(list)
-                for crop_info in lang_crop_list:
-                    cropped_img = crop_info[0]
-                    h, w = cropped_img.shape[:2]
-                    # 使用更大的分组容差，减少分组数量
-                    # 将尺寸标准化到32的倍数
-                    normalized_h = ((h + RESOLUTION_GROUP_STRIDE) // RESOLUTION_GROUP_STRIDE) * RESOLUTION_GROUP_STRIDE  # 向上取整到32的倍数
-                    normalized_w = ((w + RESOLUTION_GROUP_STRIDE) // RESOLUTION_GROUP_STRIDE) * RESOLUTION_GROUP_STRIDE
-                    group_key = (normalized_h, normalized_w)
-                    resolution_groups[group_key].append(crop_info)
-
-                # 对每个分辨率组进行批处理
-                for group_key, group_crops in tqdm(resolution_groups.items(), desc=f"OCR-det {lang}"):
-
-                    # 计算目标尺寸（组内最大尺寸，向上取整到32的倍数）
-                    max_h = max(crop_info[0].shape[0] for crop_info in group_crops)
-                    max_w = max(crop_info[0].shape[1] for crop_info in group_crops)
-                    target_h = ((max_h + RESOLUTION_GROUP_STRIDE - 1) // RESOLUTION_GROUP_STRIDE) * RESOLUTION_GROUP_STRIDE
-                    target_w = ((max_w + RESOLUTION_GROUP_STRIDE - 1) // RESOLUTION_GROUP_STRIDE) * RESOLUTION_GROUP_STRIDE
-
-                    # 对所有图像进行padding到统一尺寸
-                    batch_images = []
-                    for crop_info in group_crops:
-                        img = crop_info[0]
-                        h, w = img.shape[:2]
-                        # 创建目标尺寸的白色背景
-                        padded_img = np.ones((target_h, target_w, 3), dtype=np.uint8) * 255
-                        # 将原图像粘贴到左上角
-                        padded_img[:h, :w] = img
-                        batch_images.append(padded_img)
-
-                    # 批处理检测
-                    det_batch_size = min(len(batch_images), self.batch_ratio * OCR_DET_BASE_BATCH_SIZE)  # 增加批处理大小
-                    # logger.debug(f"OCR-det batch: {det_batch_size} images, target size: {target_h}x{target_w}")
-                    batch_results = ocr_model.text_detector.batch_predict(batch_images, det_batch_size)
-
-                    # 处理批处理结果
-                    for i, (crop_info, (dt_boxes, elapse)) in enumerate(zip(group_crops, batch_results)):
-                        bgr_image, useful_list, ocr_res_list_dict, res, adjusted_mfdetrec_res, _lang = crop_info
-
-                        if dt_boxes is not None and len(dt_boxes) > 0:
-                            # 直接应用原始OCR流程中的关键处理步骤
-
-                            # 1. 排序检测框
-                            if len(dt_boxes) > 0:
-                                dt_boxes_sorted = sorted_boxes(dt_boxes)
-                            else:
-                                dt_boxes_sorted = []
-
-                            # 2. 合并相邻检测框
-                            if dt_boxes_sorted:
-                                dt_boxes_merged = merge_det_boxes(dt_boxes_sorted)
-                            else:
-                                dt_boxes_merged = []
-
-                            # 3. 根据公式位置更新检测框（关键步骤！）
-                            if dt_boxes_merged and adjusted_mfdetrec_res:
-                                dt_boxes_final = update_det_boxes(dt_boxes_merged, adjusted_mfdetrec_res)
-                            else:
-                                dt_boxes_final = dt_boxes_merged
-
-                            # 构造OCR结果格式
-                            ocr_res = [box.tolist() if hasattr(box, 'tolist') else box for box in dt_boxes_final]
-
-                            if ocr_res:
-                                ocr_result_list = get_ocr_result_list(
-                                    ocr_res, useful_list, ocr_res_list_dict['ocr_enable'], bgr_image, _lang
-                                )
-
-                                ocr_res_list_dict['layout_res'].extend(ocr_result_list)
+                # 按分辨率分组批处理检测
+                batch_results = ocr_model.text_detector.batch_predict_by_resolution(
+                    [crop_info[0] for crop_info in lang_crop_list],
+                    max_batch_size=self.batch_ratio * OCR_DET_BASE_BATCH_SIZE,
+                    tqdm_enable=True,
+                    tqdm_desc=f"OCR-det {lang}",
+                )
+
+                # 处理批处理结果
+                for crop_info, (dt_boxes, elapse) in zip(lang_crop_list, batch_results):
+                    bgr_image, useful_list, ocr_res_list_dict, res, adjusted_mfdetrec_res, _lang = crop_info
+
+                    if dt_boxes is not None and len(dt_boxes) > 0:
+                        # 直接应用原始OCR流程中的关键处理步骤
+
+                        # 1. 排序检测框
+                        if len(dt_boxes) > 0:
+                            dt_boxes_sorted = sorted_boxes(dt_boxes)
+                        else:
+                            dt_boxes_sorted = []
+
+                        # 2. 合并相邻检测框
+                        if dt_boxes_sorted:
+                            dt_boxes_merged = merge_det_boxes(dt_boxes_sorted)
+                        else:
+                            dt_boxes_merged = []
+
+                        # 3. 根据公式位置更新检测框（关键步骤！）
+                        if dt_boxes_merged and adjusted_mfdetrec_res:
+                            dt_boxes_final = update_det_boxes(dt_boxes_merged, adjusted_mfdetrec_res)
+                        else:
+                            dt_boxes_final = dt_boxes_merged
+
+                        # 构造OCR结果格式
+                        ocr_res = [box.tolist() if hasattr(box, 'tolist') else box for box in dt_boxes_final]
+
+                        if ocr_res:
+                            ocr_result_list = get_ocr_result_list(
+                                ocr_res, useful_list, ocr_res_list_dict['ocr_enable'], bgr_image, _lang
+                            )
+
+                            ocr_res_list_dict['layout_res'].extend(ocr_result_list)
         else:
             # 原始单张处理模式
             for ocr_res_list_dict in tqdm(ocr_res_list_all_page, desc="OCR-det Predict"):
@@ -386,66 +229,172 @@ class BatchAnalyze:
 
                         ocr_res_list_dict['layout_res'].extend(ocr_result_list)
 
-        # OCR rec
-        # Create dictionaries to store items by language
-        need_ocr_lists_by_lang = {}  # Dict of lists for each language
-        img_crop_lists_by_lang = {}  # Dict of lists for each language
+        # OCR rec 队列，表格和文本的所有语言统一调度识别
+        ocr_rec_queue = OcrRecQueue()
+
+        # 表格识别 table recognition
+        if self.table_enable:
+
+            # 图片旋转批量处理
+            img_orientation_cls_model = atom_model_manager.get_atom_model(
+                atom_model_name=AtomicModel.ImgOrientationCls,
+            )
+            try:
+                if self.enable_ocr_det_batch:
+                    img_orientation_cls_model.batch_predict(table_res_list_all_page,
+                                                            det_batch_size=self.batch_ratio * OCR_DET_BASE_BATCH_SIZE,
+                                                            batch_size=TABLE_ORI_CLS_BATCH_SIZE)
+                else:
+                    for table_res in table_res_list_all_page:
+                        rotate_label, det_res = img_orientation_cls_model.predict(table_res['table_img'], return_det_res=True)
+                        if det_res is not None:
+                            table_res['ocr_det_res'] = det_res
+                        img_orientation_cls_model.img_rotate(table_res, rotate_label)
+            except Exception as e:
+                logger.warning(
+                    f"Image orientation classification failed: {e}, using original image"
+                )
+
+            # 表格分类
+            table_cls_model = atom_model_manager.get_atom_model(
+                atom_model_name=AtomicModel.TableCls,
+            )
+            try:
+                table_cls_model.batch_predict(table_res_list_all_page,
+                                              batch_size=TABLE_Wired_Wireless_CLS_BATCH_SIZE)
+            except Exception as e:
+                logger.warning(
+                    f"Table classification failed: {e}, using default model"
+                )
+
+            # OCR det 过程
+            det_ocr_engine = atom_model_manager.get_atom_model(
+                atom_model_name=AtomicModel.OCR,
+                det_db_box_thresh=0.5,
+                det_db_unclip_ratio=1.6,
+                enable_merge_det_boxes=False,
+            )
+            table_bgr_images = [
+                cv2.cvtColor(table_res_dict["table_img"], cv2.COLOR_RGB2BGR)
+                for table_res_dict in table_res_list_all_page
+            ]
+            # 方向分类阶段已检测过且未旋转的表格直接复用检测框，其余表格需要检测
+            table_det_results = [
+                table_res_dict.pop("ocr_det_res", None) for table_res_dict in table_res_list_all_page
+            ]
+            need_det_indices = [index for index, det_res in enumerate(table_det_results) if det_res is None]
+            if self.enable_ocr_det_batch:
+                # 按分辨率分组批处理检测
+                batch_results = det_ocr_engine.text_detector.batch_predict_by_resolution(
+                    [table_bgr_images[index] for index in need_det_indices],
+                    max_batch_size=self.batch_ratio * OCR_DET_BASE_BATCH_SIZE,
+                )
+                for index, (dt_boxes, elapse) in zip(need_det_indices, batch_results):
+                    if dt_boxes is not None and len(dt_boxes) > 0:
+                        table_det_results[index] = [box.tolist() for box in sorted_boxes(dt_boxes)]
+                    else:
+                        table_det_results[index] = []
+            else:
+                for index in tqdm(need_det_indices, desc="Table-ocr det"):
+                    table_det_results[index] = det_ocr_engine.ocr(table_bgr_images[index], rec=False)[0] or []
+
+            # 裁剪出需要 OCR 识别的文本行提交到识别队列，识别结果按 table_id 回填
+            table_rec_items = []
+            for index, table_res_dict in enumerate(table_res_list_all_page):
+                bgr_image = table_bgr_images[index]
+                dt_boxes = [np.asarray(dt_box, dtype=np.float32) for dt_box in table_det_results[index]]
+                cropped_img_list = [get_rotate_crop_image(bgr_image, dt_box) for dt_box in dt_boxes]
+                ticket = ocr_rec_queue.submit(table_res_dict["lang"], cropped_img_list)
+                table_rec_items.append((ticket, dt_boxes))
+
+        # 文本 OCR rec，按语言提交到识别队列
+        need_ocr_lists_by_lang = defaultdict(list)  # Dict of lists for each language
 
         for layout_res in images_layout_res:
             for layout_res_item in layout_res:
                 if layout_res_item['category_id'] in [15]:
                     if 'np_img' in layout_res_item and 'lang' in layout_res_item:
-                        lang = layout_res_item['lang']
+                        need_ocr_lists_by_lang[layout_res_item['lang']].append(layout_res_item)
 
-                        # Initialize lists for this language if not exist
-                        if lang not in need_ocr_lists_by_lang:
-                            need_ocr_lists_by_lang[lang] = []
-                            img_crop_lists_by_lang[lang] = []
-
-                        # Add to the appropriate language-specific lists
-                        need_ocr_lists_by_lang[lang].append(layout_res_item)
-                        img_crop_lists_by_lang[lang].append(layout_res_item['np_img'])
+        text_rec_tickets = {}
+        for lang, need_ocr_list in need_ocr_lists_by_lang.items():
+            text_rec_tickets[lang] = ocr_rec_queue.submit(
+                lang, [layout_res_item['np_img'] for layout_res_item in need_ocr_list]
+            )
+            # Remove the fields after adding to queue
+            for layout_res_item in need_ocr_list:
+                layout_res_item.pop('np_img')
+                layout_res_item.pop('lang')
 
-                        # Remove the fields after adding to lists
-                        layout_res_item.pop('np_img')
-                        layout_res_item.pop('lang')
+        # 所有语言、表格和文本的文本行一起识别
+        ocr_rec_queue.run()
 
-        if len(img_crop_lists_by_lang) > 0:
+        if self.table_enable:
+            # 按照 table_id 将识别结果进行回填
+            for table_res_dict, (ticket, dt_boxes) in zip(table_res_list_all_page, table_rec_items):
+                ocr_res_list = ocr_rec_queue.get(ticket)
+                if ocr_res_list:
+                    table_res_dict["ocr_result"] = [
+                        [dt_box, html.escape(ocr_res[0]), ocr_res[1]]
+                        for dt_box, ocr_res in zip(dt_boxes, ocr_res_list)
+                    ]
 
-            # Process OCR by language
-            total_processed = 0
+            clean_vram(self.model.device, vram_threshold=8)
 
-            # Process each language separately
-            for lang, img_crop_list in img_crop_lists_by_lang.items():
-                if len(img_crop_list) > 0:
-                    # Get OCR results for this language's images
+            # 先对所有表格使用无线表格模型，然后对分类为有线的表格使用有线表格模型
+            wireless_table_model = atom_model_manager.get_atom_model(
+                atom_model_name=AtomicModel.WirelessTable,
+            )
+            wireless_table_model.batch_predict(table_res_list_all_page)
 
-                    ocr_model = atom_model_manager.get_atom_model(
-                        atom_model_name=AtomicModel.OCR,
-                        det_db_box_thresh=0.3,
-                        lang=lang
+            # 单独拿出有线表格进行预测
+            wired_table_res_list = []
+            for table_res_dict in table_res_list_all_page:
+                # logger.debug(f"Table classification result: {table_res_dict["table_res"]["cls_label"]} with confidence {table_res_dict["table_res"]["cls_score"]}")
+                if (
+                    (table_res_dict["table_res"]["cls_label"] == AtomicModel.WirelessTable and table_res_dict["table_res"]["cls_score"] < 0.9)
+                    or table_res_dict["table_res"]["cls_label"] == AtomicModel.WiredTable
+                ):
+                    wired_table_res_list.append(table_res_dict)
+                del table_res_dict["table_res"]["cls_label"]
+                del table_res_dict["table_res"]["cls_score"]
+            if wired_table_res_list:
+                # 有线表格模型按语言区分ocr引擎，同语言的表格合并批量预测
+                wired_lang_groups = defaultdict(list)
+                for table_res_dict in wired_table_res_list:
+                    wired_lang_groups[table_res_dict["lang"]].append(table_res_dict)
+                for _lang, lang_table_res_list in tqdm(wired_lang_groups.items(), desc="Table-wired Predict"):
+                    wired_table_model = atom_model_manager.get_atom_model(
+                        atom_model_name=AtomicModel.WiredTable,
+                        lang=_lang,
                     )
-                    ocr_res_list = ocr_model.ocr(img_crop_list, det=False, tqdm_enable=True)[0]
-
-                    # Verify we have matching counts
-                    assert len(ocr_res_list) == len(
-                        need_ocr_lists_by_lang[lang]), f'ocr_res_list: {len(ocr_res_list)}, need_ocr_list: {len(need_ocr_lists_by_lang[lang])} for lang: {lang}'
-
-                    # Process OCR results for this language
-                    for index, layout_res_item in enumerate(need_ocr_lists_by_lang[lang]):
-                        ocr_text, ocr_score = ocr_res_list[index]
-                        layout_res_item['text'] = ocr_text
-                        layout_res_item['score'] = float(f"{ocr_score:.3f}")
-                        if ocr_score < OcrConfidence.min_confidence:
-                            layout_res_item['category_id'] = 16
-                        else:
-                            layout_res_bbox = [layout_res_item['poly'][0], layout_res_item['poly'][1],
-                                               layout_res_item['poly'][4], layout_res_item['poly'][5]]
-                            layout_res_width = layout_res_bbox[2] - layout_res_bbox[0]
-                            layout_res_height = layout_res_bbox[3] - layout_res_bbox[1]
-                            if ocr_text in ['（204号', '（20', '（2', '（2号', '（20号', '号', '（204'] and ocr_score < 0.8 and layout_res_width < layout_res_height:
-                                layout_res_item['category_id'] = 16
-
-                    total_processed += len(img_crop_list)
+                    wired_table_model.batch_predict(lang_table_res_list, batch_size=TABLE_WIRED_BATCH_SIZE)
+
+            # 表格格式清理
+            for table_res_dict in table_res_list_all_page:
+                html_code = table_res_dict["table_res"].get("html", "") or ""
+
+                # 检查html_code是否包含'<table>'和'</table>'
+                if "<table>" in html_code and "</table>" in html_code:
+                    # 选用<table>到</table>的内容，放入table_res_dict['table_res']['html']
+                    start_index = html_code.find("<table>")
+                    end_index = html_code.rfind("</table>") + len("</table>")
+                    table_res_dict["table_res"]["html"] = html_code[start_index:end_index]
+
+        # 回填文本 OCR rec 结果
+        for lang, need_ocr_list in need_ocr_lists_by_lang.items():
+            ocr_res_list = ocr_rec_queue.get(text_rec_tickets[lang])
+            for layout_res_item, (ocr_text, ocr_score) in zip(need_ocr_list, ocr_res_list):
+                layout_res_item['text'] = ocr_text
+                layout_res_item['score'] = float(f"{ocr_score:.3f}")
+                if ocr_score < OcrConfidence.min_confidence:
+                    layout_res_item['category_id'] = 16
+                else:
+                    layout_res_bbox = [layout_res_item['poly'][0], layout_res_item['poly'][1],
+                                       layout_res_item['poly'][4], layout_res_item['poly'][5]]
+                    layout_res_width = layout_res_bbox[2] - layout_res_bbox[0]
+                    layout_res_height = layout_res_bbox[3] - layout_res_bbox[1]
+                    if ocr_text in ['（204号', '（20', '（2', '（2号', '（20号', '号', '（204'] and ocr_score < 0.8 and layout_res_width < layout_res_height:
+                        layout_res_item['category_id'] = 16
 
         return images_layout_res
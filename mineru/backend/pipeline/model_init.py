@@ -23,9 +23,9 @@ def img_orientation_cls_model_init():
         atom_model_name=AtomicModel.OCR,
         det_db_box_thresh=0.5,
         det_db_unclip_ratio=1.6,
-        lang="ch_lite",
         enable_merge_det_boxes=False
     )
+    # 与表格ocr使用同一个检测引擎，检测结果可以在表格ocr阶段直接复用
     cls_model = PaddleOrientationClsModel(ocr_engine)
     return cls_model
 
@@ -6,12 +6,12 @@ from loguru import logger
 from tqdm import tqdm
 
 from mineru.utils.config_reader import get_device, get_llm_aided_config, get_formula_enable
-from mineru.backend.pipeline.model_init import AtomModelSingleton
+from mineru.backend.pipeline.ocr_rec_queue import OcrRecQueue
 from mineru.backend.pipeline.para_split import para_split
 from mineru.utils.block_pre_proc import prepare_block_bboxes, process_groups
-from mineru.utils.block_sort import sort_blocks_by_bbox
+from mineru.utils.block_sort import sort_blocks_by_bbox, batch_sort_blocks_by_bbox
 from mineru.utils.boxbase import calculate_overlap_area_in_bbox1_area_ratio
-from mineru.utils.cut_image import cut_image_and_table
+from mineru.utils.cut_image import cut_image_and_table, discard_image_cut_jobs, flush_image_cut_jobs
 from mineru.utils.enum_class import ContentType
 from mineru.utils.llm_aided import llm_aided_title
 from mineru.utils.model_utils import clean_memory
@@ -26,6 +26,16 @@ from mineru.utils.hash_utils import bytes_md5
 
 
 def page_model_info_to_page_info(page_model_info, image_dict, page, image_writer, page_index, ocr_enable=False, formula_enabled=True):
+    page_blocks = page_model_info_to_page_blocks(
+        page_model_info, image_dict, page, image_writer, page_index, ocr_enable, formula_enabled
+    )
+    if page_blocks is None:
+        return None
+    return page_blocks_to_page_infos([page_blocks], batch_sort=False)[0]
+
+
+def page_model_info_to_page_blocks(page_model_info, image_dict, page, image_writer, page_index, ocr_enable=False, formula_enabled=True):
+    """构造页面中排序前的block，排序放到page_blocks_to_page_infos中多页一起完成"""
     scale = image_dict["scale"]
     page_pil_img = image_dict["img_pil"]
     # page_img_md5 = str_md5(image_dict["img_base64"])
@@ -164,28 +174,85 @@ def page_model_info_to_page_info(page_model_info, image_dict, page, image_writer
     """对block进行fix操作"""
     fix_blocks = fix_block_spans(block_with_spans)
 
-    """对block进行排序"""
-    sorted_blocks = sort_blocks_by_bbox(fix_blocks, page_w, page_h, footnote_blocks)
+    return {
+        'fix_blocks': fix_blocks,
+        'footnote_blocks': footnote_blocks,
+        'fix_discarded_blocks': fix_discarded_blocks,
+        'page_index': page_index,
+        'page_w': page_w,
+        'page_h': page_h,
+    }
+
+
+def page_blocks_to_page_infos(page_blocks_list, batch_sort=True):
+    """对block进行排序并构造page_info，batch_sort时多页的layoutreader推理合并为batch执行"""
+    if batch_sort:
+        sorted_blocks_list = batch_sort_blocks_by_bbox([
+            (page_blocks['fix_blocks'], page_blocks['page_w'], page_blocks['page_h'], page_blocks['footnote_blocks'])
+            for page_blocks in page_blocks_list
+        ])
+    else:
+        sorted_blocks_list = [
+            sort_blocks_by_bbox(
+                page_blocks['fix_blocks'], page_blocks['page_w'], page_blocks['page_h'], page_blocks['footnote_blocks']
+            )
+            for page_blocks in page_blocks_list
+        ]
+
+    page_info_list = []
+    for page_blocks, sorted_blocks in zip(page_blocks_list, sorted_blocks_list):
+        """构造page_info"""
+        page_info = make_page_info_dict(
+            sorted_blocks, page_blocks['page_index'], page_blocks['page_w'], page_blocks['page_h'],
+            page_blocks['fix_discarded_blocks']
+        )
+        page_info_list.append(page_info)
+    return page_info_list
 
-    """构造page_info"""
-    page_info = make_page_info_dict(sorted_blocks, page_index, page_w, page_h, fix_discarded_blocks)
 
-    return page_info
+def init_middle_json():
+    return {"pdf_info": [], "_backend":"pipeline", "_version_name": __version__}
 
 
-def result_to_middle_json(model_list, images_list, pdf_doc, image_writer, lang=None, ocr_enable=False, formula_enabled=True):
-    middle_json = {"pdf_info": [], "_backend":"pipeline", "_version_name": __version__}
-    formula_enabled = get_formula_enable(formula_enabled)
-    for page_index, page_model_info in tqdm(enumerate(model_list), total=len(model_list), desc="Processing pages"):
+def append_pages_to_middle_json(middle_json, page_model_info_list, image_dict_list, pdf_doc, page_index_list, image_writer, ocr_enable=False, formula_enabled=True):
+    """
+    逐页构造block后，所有页面的阅读顺序排序合并为一次批量推理
+
+    ocr_enable可以是整个文档共用的bool，也可以是按页码索引的每页是否使用OCR的列表
+    """
+    page_info_list = []
+    page_blocks_list = []
+    for page_model_info, image_dict, page_index in tqdm(
+            zip(page_model_info_list, image_dict_list, page_index_list), total=len(page_index_list), desc="Processing pages"
+    ):
         page = pdf_doc[page_index]
-        image_dict = images_list[page_index]
-        page_info = page_model_info_to_page_info(
-            page_model_info, image_dict, page, image_writer, page_index, ocr_enable=ocr_enable, formula_enabled=formula_enabled
+        page_blocks = page_model_info_to_page_blocks(
+            page_model_info, image_dict, page, image_writer, page_index,
+            ocr_enable=get_page_ocr_enable(ocr_enable, page_index), formula_enabled=formula_enabled
         )
-        if page_info is None:
+        if page_blocks is None:
             page_w, page_h = map(int, page.get_size())
-            page_info = make_page_info_dict([], page_index, page_w, page_h, [])
-        middle_json["pdf_info"].append(page_info)
+            page_info_list.append(make_page_info_dict([], page_index, page_w, page_h, []))
+        else:
+            page_info_list.append(None)
+            page_blocks_list.append(page_blocks)
+
+    sorted_page_infos = iter(page_blocks_to_page_infos(page_blocks_list))
+    for page_info in page_info_list:
+        middle_json["pdf_info"].append(page_info if page_info is not None else next(sorted_page_infos))
+
+
+def get_page_ocr_enable(ocr_enable, page_index):
+    if isinstance(ocr_enable, (list, tuple)):
+        return ocr_enable[page_index]
+    return ocr_enable
+
+
+def finalize_middle_json(middle_json, lang=None, image_writer=None):
+    """
+    对已收集全部页面的middle_json做跨页的后处理（后置ocr、分段、表格合并、llm优化），这些步骤不再依赖页面图片，
+    最后等待image_writer的延迟截图全部写完
+    """
 
     """后置ocr处理"""
     need_ocr_list = []
@@ -209,15 +276,10 @@ def result_to_middle_json(model_list, images_list, pdf_doc, image_writer, lang=N
                     img_crop_list.append(span['np_img'])
                     span.pop('np_img')
     if len(img_crop_list) > 0:
-        atom_model_manager = AtomModelSingleton()
-        ocr_model = atom_model_manager.get_atom_model(
-            atom_model_name='ocr',
-            det_db_box_thresh=0.3,
-            lang=lang
-        )
-        ocr_res_list = ocr_model.ocr(img_crop_list, det=False, tqdm_enable=True)[0]
-        assert len(ocr_res_list) == len(
-            need_ocr_list), f'ocr_res_list: {len(ocr_res_list)}, need_ocr_list: {len(need_ocr_list)}'
+        ocr_rec_queue = OcrRecQueue()
+        ticket = ocr_rec_queue.submit(lang, img_crop_list)
+        ocr_rec_queue.run()
+        ocr_res_list = ocr_rec_queue.get(ticket)
         for index, span in enumerate(need_ocr_list):
             ocr_text, ocr_score = ocr_res_list[index]
             if ocr_score > OcrConfidence.min_confidence:
@@ -245,6 +307,27 @@ def result_to_middle_json(model_list, images_list, pdf_doc, image_writer, lang=N
                 llm_aided_title(middle_json["pdf_info"], title_aided_config)
                 logger.info(f'llm aided title time: {round(time.time() - llm_aided_title_start_time, 2)}')
 
+    """等待截图写完"""
+    flush_image_cut_jobs(image_writer)
+
+    return middle_json
+
+
+def result_to_middle_json(model_list, images_list, pdf_doc, image_writer, lang=None, ocr_enable=False, formula_enabled=True):
+    """ocr_enable可以是整个文档的bool，也可以是doc_analyze返回的逐页bool列表"""
+    middle_json = init_middle_json()
+    formula_enabled = get_formula_enable(formula_enabled)
+    try:
+        append_pages_to_middle_json(
+            middle_json, model_list, images_list[:len(model_list)], pdf_doc, list(range(len(model_list))), image_writer,
+            ocr_enable=ocr_enable, formula_enabled=formula_enabled
+        )
+
+        finalize_middle_json(middle_json, lang, image_writer)
+    except BaseException:
+        discard_image_cut_jobs(image_writer)
+        raise
+
     """清理内存"""
     pdf_doc.close()
     if os.getenv('MINERU_DONOT_CLEAN_MEM') is None and len(model_list) >= 10:
@@ -0,0 +1,68 @@
+# Copyright (c) Opendatalab. All rights reserved.
+from loguru import logger
+
+from .model_init import AtomModelSingleton
+from .model_list import AtomicModel
+
+
+class OcrRecQueue:
+    """
+    汇总待识别的文本行图片，统一调度OCR rec。
+
+    表格ocr、文本ocr等不同来源、不同语言的图片先submit到同一个队列，run时按rec模型分组，
+    使用同一rec模型的语言(如lang为None与ch)合并为一次识别，组内按宽高比排序组batch，
+    每个rec模型只切换一次。
+    """
+
+    def __init__(self):
+        self._langs = []
+        self._imgs = []
+        self._tickets = []
+        self._results = None
+
+    def submit(self, lang, img_list) -> int:
+        """提交一组图片，返回ticket，run之后通过get(ticket)按提交顺序取回识别结果"""
+        start = len(self._imgs)
+        self._langs.extend([lang] * len(img_list))
+        self._imgs.extend(img_list)
+        self._tickets.append((start, len(self._imgs)))
+        return len(self._tickets) - 1
+
+    def __len__(self):
+        return len(self._imgs)
+
+    def run(self, tqdm_desc="OCR-rec Predict"):
+        """识别所有已提交的图片，队列只run一次，run之后释放图片，只保留识别结果"""
+        atom_model_manager = AtomModelSingleton()
+        # rec模型权重路径 -> (ocr模型, 图片下标列表)
+        rec_groups = {}
+        lang_models = {}
+        for index, lang in enumerate(self._langs):
+            if lang not in lang_models:
+                lang_models[lang] = atom_model_manager.get_atom_model(
+                    atom_model_name=AtomicModel.OCR,
+                    det_db_box_thresh=0.3,
+                    lang=lang
+                )
+            ocr_model = lang_models[lang]
+            rec_key = ocr_model.text_recognizer.weights_path
+            if rec_key not in rec_groups:
+                rec_groups[rec_key] = (ocr_model, [])
+            rec_groups[rec_key][1].append(index)
+
+        self._results = [None] * len(self._imgs)
+        for ocr_model, indices in rec_groups.values():
+            img_list = [self._imgs[index] for index in indices]
+            desc = tqdm_desc if len(rec_groups) == 1 else f"{tqdm_desc} {ocr_model.lang}"
+            ocr_res_list = ocr_model.ocr(img_list, det=False, tqdm_enable=True, tqdm_desc=desc)[0]
+            assert len(ocr_res_list) == len(indices), f'ocr_res_list: {len(ocr_res_list)}, img_list: {len(indices)}'
+            for index, ocr_res in zip(indices, ocr_res_list):
+                self._results[index] = ocr_res
+        if len(rec_groups) > 1:
+            logger.debug(f'OCR-rec: {len(self._imgs)} images from {len(lang_models)} langs in {len(rec_groups)} rec groups')
+        self._imgs = []
+        self._langs = []
+
+    def get(self, ticket) -> list:
+        start, end = self._tickets[ticket]
+        return self._results[start:end]
@@ -1,15 +1,22 @@
+import copy
 import os
 import time
 from typing import List, Tuple
+
+import pypdfium2 as pdfium
 from PIL import Image
 from loguru import logger
 
 from .model_init import MineruPipelineModel
-from mineru.utils.config_reader import get_device
+from ...model.onnx_session import log_onnx_session_stats
+from ...model.ocr.paddleocr2pytorch.tools.infer.predict_rec import log_ocr_rec_padding_stats
+from mineru.utils.config_reader import get_device, get_formula_enable, get_page_classify_enable
+from ...utils.cut_image import discard_image_cut_jobs
 from ...utils.enum_class import ImageType
-from ...utils.pdf_classify import classify
-from ...utils.pdf_image_tools import load_images_from_pdf
+from ...utils.pdf_classify import classify, classify_pages
+from ...utils.pdf_image_tools import load_images_from_pdf, iter_image_windows_from_pdf
 from ...utils.model_utils import get_vram, clean_memory
+from ...utils.page_result_cache import get_page_result_cache, get_page_cache_key
 
 
 os.environ['PYTORCH_ENABLE_MPS_FALLBACK'] = '1'  # 让mps可以fallback
@@ -77,36 +84,35 @@ def doc_analyze(
     """
     适当调大MIN_BATCH_INFERENCE_SIZE可以提高性能，更大的 MIN_BATCH_INFERENCE_SIZE会消耗更多内存，
     可通过环境变量MINERU_MIN_BATCH_INFERENCE_SIZE设置，默认值为384。
+
+    返回值中的ocr_enabled_list与pdf_bytes_list一一对应，每个元素是该文档逐页的OCR开关列表(List[bool])，
+    而不是整个文档的单个bool，可直接作为ocr_enable传给pipeline_result_to_middle_json。
     """
     min_batch_inference_size = int(os.environ.get('MINERU_MIN_BATCH_INFERENCE_SIZE', 384))
 
     # 收集所有页面信息
-    all_pages_info = []  # 存储(dataset_index, page_index, img, ocr, lang, width, height)
+    all_pages_info = []  # 存储(dataset_index, page_index, img, ocr, lang)
 
     all_image_lists = []
     all_pdf_docs = []
     ocr_enabled_list = []
     for pdf_idx, pdf_bytes in enumerate(pdf_bytes_list):
-        # 确定OCR设置
-        _ocr_enable = False
-        if parse_method == 'auto':
-            if classify(pdf_bytes) == 'ocr':
-                _ocr_enable = True
-        elif parse_method == 'ocr':
-            _ocr_enable = True
-
-        ocr_enabled_list.append(_ocr_enable)
         _lang = lang_list[pdf_idx]
 
         # 收集每个数据集中的页面
         images_list, pdf_doc = load_images_from_pdf(pdf_bytes, image_type=ImageType.PIL)
         all_image_lists.append(images_list)
         all_pdf_docs.append(pdf_doc)
+
+        # 确定每页的OCR设置
+        page_ocr_enable_list = get_page_ocr_enable_list(pdf_bytes, len(images_list), parse_method)
+        ocr_enabled_list.append(page_ocr_enable_list)
+
         for page_idx in range(len(images_list)):
             img_dict = images_list[page_idx]
             all_pages_info.append((
                 pdf_idx, page_idx,
-                img_dict['img_pil'], _ocr_enable, _lang,
+                img_dict['img_pil'], page_ocr_enable_list[page_idx], _lang,
             ))
 
     # 准备批处理
@@ -128,6 +134,8 @@ def doc_analyze(
         )
         batch_results = batch_image_analyze(batch_image, formula_enable, table_enable)
         results.extend(batch_results)
+    log_onnx_session_stats()
+    log_ocr_rec_padding_stats()
 
     # 构建返回结果
     infer_results = []
@@ -147,6 +155,93 @@ def doc_analyze(
     return infer_results, all_image_lists, all_pdf_docs, lang_list, ocr_enabled_list
 
 
+def get_ocr_enable(pdf_bytes, parse_method: str = 'auto') -> bool:
+    if parse_method == 'auto':
+        return classify(pdf_bytes) == 'ocr'
+    return parse_method == 'ocr'
+
+
+def get_page_ocr_enable_list(pdf_bytes, page_count, parse_method: str = 'auto') -> List[bool]:
+    """
+    返回每页是否需要OCR。parse_method为auto时默认逐页分类，只有扫描页执行OCR识别，文本页直接提取pdf中的文字，
+    可通过环境变量MINERU_PAGE_CLASSIFY_ENABLE=false恢复按整个文档抽样判断。
+    """
+    if parse_method == 'auto' and get_page_classify_enable():
+        page_types = classify_pages(pdf_bytes)
+        if len(page_types) != page_count:
+            return [True] * page_count
+        page_ocr_enable_list = [page_type == 'ocr' for page_type in page_types]
+        logger.info(f'page classify: {sum(page_ocr_enable_list)}/{page_count} pages need ocr')
+        return page_ocr_enable_list
+    return [get_ocr_enable(pdf_bytes, parse_method)] * page_count
+
+
+def doc_analyze_streaming(
+        pdf_bytes,
+        lang,
+        image_writer,
+        parse_method: str = 'auto',
+        formula_enable=True,
+        table_enable=True,
+):
+    """
+    流式处理单个pdf：按MIN_BATCH_INFERENCE_SIZE大小的页面窗口惰性渲染、推理并构造middle_json页面，
+    窗口处理完成后立即释放页面图片，峰值内存只与窗口大小相关，而与文档页数无关。
+    跨页的后处理（分段、表格合并等）在所有窗口完成后统一执行。
+
+    Returns:
+        tuple: (middle_json, model_list, ocr_enable)，ocr_enable为每页是否使用OCR的列表
+    """
+    from .model_json_to_middle_json import init_middle_json, append_pages_to_middle_json, finalize_middle_json
+
+    window_size = int(os.environ.get('MINERU_MIN_BATCH_INFERENCE_SIZE', 384))
+    formula_enabled = get_formula_enable(formula_enable)
+
+    model_list = []
+    middle_json = init_middle_json()
+    pdf_doc = pdfium.PdfDocument(pdf_bytes)
+    page_count = len(pdf_doc)
+    page_ocr_enable_list = get_page_ocr_enable_list(pdf_bytes, page_count, parse_method)
+    try:
+        for window_start, images_list in iter_image_windows_from_pdf(pdf_doc, window_size, image_type=ImageType.PIL):
+            logger.info(
+                f'Window {window_start // window_size + 1}/{(page_count + window_size - 1) // window_size}: '
+                f'{window_start + len(images_list)} pages/{page_count} pages'
+            )
+            images_with_extra_info = [
+                (image_dict['img_pil'], page_ocr_enable_list[window_start + offset], lang)
+                for offset, image_dict in enumerate(images_list)
+            ]
+            window_results = batch_image_analyze(images_with_extra_info, formula_enable, table_enable)
+
+            page_dict_list = []
+            for offset, (image_dict, result) in enumerate(zip(images_list, window_results)):
+                page_index = window_start + offset
+                pil_img = image_dict['img_pil']
+                page_info_dict = {'page_no': page_index, 'width': pil_img.width, 'height': pil_img.height}
+                page_dict = {'layout_dets': result, 'page_info': page_info_dict}
+                # middle_json的构造会修改page_dict，model_list中保存未修改的副本
+                model_list.append(copy.deepcopy(page_dict))
+                page_dict_list.append(page_dict)
+            append_pages_to_middle_json(
+                middle_json, page_dict_list, images_list, pdf_doc,
+                list(range(window_start, window_start + len(images_list))), image_writer,
+                ocr_enable=page_ocr_enable_list, formula_enabled=formula_enabled
+            )
+
+            # 释放当前窗口的页面图片
+            del images_list, images_with_extra_info, window_results
+
+        finalize_middle_json(middle_json, lang, image_writer)
+    except BaseException:
+        discard_image_cut_jobs(image_writer)
+        raise
+    finally:
+        pdf_doc.close()
+
+    return middle_json, model_list, page_ocr_enable_list
+
+
 def batch_image_analyze(
         images_with_extra_info: List[Tuple[Image.Image, bool, str]],
         formula_enable=True,
@@ -199,7 +294,29 @@ def batch_image_analyze(
         enable_ocr_det_batch = True
 
     batch_model = BatchAnalyze(model_manager, batch_ratio, formula_enable, table_enable, enable_ocr_det_batch)
-    results = batch_model(images_with_extra_info)
+
+    page_cache = get_page_result_cache()
+    if page_cache is None:
+        results = batch_model(images_with_extra_info)
+    else:
+        # 命中缓存的页面跳过全部模型推理，只对未命中的页面执行BatchAnalyze
+        cache_keys = [
+            get_page_cache_key(
+                pil_img, _lang, ocr_enable, batch_model.formula_enable, batch_model.table_enable
+            )
+            for pil_img, ocr_enable, _lang in images_with_extra_info
+        ]
+        results = [page_cache.get(cache_key) for cache_key in cache_keys]
+        miss_indices = [index for index, result in enumerate(results) if result is None]
+        if len(miss_indices) < len(results):
+            logger.info(f'page cache hit: {len(results) - len(miss_indices)}/{len(results)} pages')
+        # 全部命中时不调用BatchAnalyze，避免冷启动的进程仅为空输入加载全部模型
+        if miss_indices:
+            miss_results = batch_model([images_with_extra_info[index] for index in miss_indices])
+            for index, result in zip(miss_indices, miss_results):
+                page_cache.put(cache_keys[index], result)
+                results[index] = result
+        page_cache.flush()
 
     clean_memory(get_device())
 
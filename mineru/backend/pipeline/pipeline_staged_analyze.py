@@ -0,0 +1,306 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import copy
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pypdfium2 as pdfium
+from loguru import logger
+
+from mineru.utils.config_reader import get_formula_enable
+from mineru.utils.cut_image import discard_image_cut_jobs
+from mineru.utils.enum_class import ImageType
+from mineru.utils.pdf_rasterizer import render_page_to_shared_memory, load_shared_page_image, \
+    release_shared_page_image
+
+
+class StageStats:
+    """记录单个流水线阶段的处理页数、忙碌时间和等待上游的时间"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pages = 0
+        self.busy_time = 0.0
+        self.wait_time = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, pages: int, busy_time: float, wait_time: float = 0.0):
+        with self._lock:
+            self.pages += pages
+            self.busy_time += busy_time
+            self.wait_time += wait_time
+
+    def summary(self) -> str:
+        throughput = self.pages / self.busy_time if self.busy_time > 0 else 0.0
+        return (
+            f'{self.name}: {self.pages} pages, busy {round(self.busy_time, 2)}s, '
+            f'wait {round(self.wait_time, 2)}s, {round(throughput, 2)} pages/s'
+        )
+
+
+# 渲染进程内缓存已打开的pdf文档，避免每个窗口都重新解析pdf
+_worker_pdf_bytes_list = None
+_worker_pdf_docs = {}
+
+
+def _render_worker_init(pdf_bytes_list):
+    global _worker_pdf_bytes_list
+    _worker_pdf_bytes_list = pdf_bytes_list
+
+
+def _render_window(pdf_idx, window_start, window_end, dpi=200):
+    """在渲染进程中把[window_start, window_end)范围的页面渲染为图片"""
+    start_time = time.time()
+    pdf_doc = _worker_pdf_docs.get(pdf_idx)
+    if pdf_doc is None:
+        # 只保留当前文档，切换文档时关闭上一个
+        for cached_doc in _worker_pdf_docs.values():
+            cached_doc.close()
+        _worker_pdf_docs.clear()
+        pdf_doc = pdfium.PdfDocument(_worker_pdf_bytes_list[pdf_idx])
+        _worker_pdf_docs[pdf_idx] = pdf_doc
+    # 像素通过共享内存交给主进程，避免pickle整张位图
+    page_metas = [
+        render_page_to_shared_memory(pdf_doc[index], dpi=dpi)
+        for index in range(window_start, window_end)
+    ]
+    return page_metas, time.time() - start_time
+
+
+def doc_analyze_staged(
+        pdf_bytes_list,
+        lang_list,
+        image_writer_list,
+        parse_method: str = 'auto',
+        formula_enable=True,
+        table_enable=True,
+        on_doc_done=None,
+):
+    """
+    三阶段重叠执行的pipeline：
+        1. 渲染阶段：进程池按窗口渲染页面图片；
+        2. 推理阶段：主线程对每个窗口执行BatchAnalyze；
+        3. 后处理阶段：独立线程把推理结果转换为middle_json页面（pdftext取字、span去重、阅读顺序排序）。
+    阶段之间通过有界队列连接，队列长度可通过环境变量MINERU_PIPELINE_QUEUE_SIZE设置（默认2个窗口），
+    渲染进程数可通过MINERU_PIPELINE_RENDER_WORKERS设置（默认为min(4, cpu核数)）。
+    每个文档所有页面完成后在主线程执行跨页后处理，并通过on_doc_done(pdf_idx, middle_json, model_list, ocr_enable)回调输出。
+
+    Returns:
+        list: 每个文档对应的(middle_json, model_list, ocr_enable)，ocr_enable为每页是否使用OCR的列表
+    """
+    from .pipeline_analyze import batch_image_analyze, get_page_ocr_enable_list
+    from .model_json_to_middle_json import init_middle_json, append_pages_to_middle_json, finalize_middle_json
+    from mineru.model.onnx_session import log_onnx_session_stats
+    from mineru.model.ocr.paddleocr2pytorch.tools.infer.predict_rec import log_ocr_rec_padding_stats
+
+    window_size = int(os.environ.get('MINERU_MIN_BATCH_INFERENCE_SIZE', 384))
+    queue_size = max(1, int(os.environ.get('MINERU_PIPELINE_QUEUE_SIZE', 2)))
+    render_workers = max(1, int(os.environ.get('MINERU_PIPELINE_RENDER_WORKERS', min(4, os.cpu_count() or 1))))
+    formula_enabled = get_formula_enable(formula_enable)
+
+    # 按文档和窗口切分任务
+    done_queue = queue.Queue()
+    ocr_enabled_list = []
+    windows = []
+    pages_left = []
+    for pdf_idx, pdf_bytes in enumerate(pdf_bytes_list):
+        pdf_doc = pdfium.PdfDocument(pdf_bytes)
+        page_count = len(pdf_doc)
+        pdf_doc.close()
+        ocr_enabled_list.append(get_page_ocr_enable_list(pdf_bytes, page_count, parse_method))
+        pages_left.append(page_count)
+        if page_count == 0:
+            done_queue.put(pdf_idx)
+        for window_start in range(0, page_count, window_size):
+            windows.append((pdf_idx, window_start, min(window_start + window_size, page_count)))
+
+    render_stats = StageStats('render')
+    infer_stats = StageStats('inference')
+    post_stats = StageStats('middle_json')
+
+    middle_json_list = [init_middle_json() for _ in pdf_bytes_list]
+    model_list_list = [[] for _ in pdf_bytes_list]
+    results = [None] * len(pdf_bytes_list)
+
+    render_queue = queue.Queue(maxsize=queue_size)
+    post_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    errors = []
+
+    def put_until_stopped(target_queue, item):
+        while not stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get_until_stopped(source_queue):
+        # 停止后返回None，避免上游异常退出、没有放入结束标记时下游永远阻塞
+        while not stop_event.is_set():
+            try:
+                return source_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return None
+
+    # spawn避免fork已初始化cuda的进程
+    executor = ProcessPoolExecutor(
+        max_workers=render_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_render_worker_init,
+        initargs=(pdf_bytes_list,),
+    )
+
+    def render_producer():
+        # 提前提交的窗口数受render_queue长度约束，防止渲染结果堆积
+        try:
+            for window in windows:
+                future = executor.submit(_render_window, *window)
+                if not put_until_stopped(render_queue, (window, future)):
+                    future.cancel()
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put_until_stopped(render_queue, None)
+
+    def post_consumer():
+        pdf_docs = {}
+        try:
+            while True:
+                wait_start = time.time()
+                item = get_until_stopped(post_queue)
+                wait_time = time.time() - wait_start
+                if item is None:
+                    break
+                (pdf_idx, window_start, _), images_list, window_results = item
+                start_time = time.time()
+                pdf_doc = pdf_docs.get(pdf_idx)
+                if pdf_doc is None:
+                    pdf_doc = pdfium.PdfDocument(pdf_bytes_list[pdf_idx])
+                    pdf_docs[pdf_idx] = pdf_doc
+                page_dict_list = []
+                for offset, (image_dict, result) in enumerate(zip(images_list, window_results)):
+                    page_index = window_start + offset
+                    pil_img = image_dict['img_pil']
+                    page_info_dict = {'page_no': page_index, 'width': pil_img.width, 'height': pil_img.height}
+                    page_dict = {'layout_dets': result, 'page_info': page_info_dict}
+                    model_list_list[pdf_idx].append(copy.deepcopy(page_dict))
+                    page_dict_list.append(page_dict)
+                append_pages_to_middle_json(
+                    middle_json_list[pdf_idx], page_dict_list, images_list, pdf_doc,
+                    list(range(window_start, window_start + len(images_list))),
+                    image_writer_list[pdf_idx], ocr_enable=ocr_enabled_list[pdf_idx],
+                    formula_enabled=formula_enabled
+                )
+                post_stats.add(len(images_list), time.time() - start_time, wait_time)
+                pages_left[pdf_idx] -= len(images_list)
+                if pages_left[pdf_idx] <= 0:
+                    pdf_docs.pop(pdf_idx).close()
+                    done_queue.put(pdf_idx)
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            for pdf_doc in pdf_docs.values():
+                pdf_doc.close()
+
+    def finalize_done_docs():
+        while True:
+            try:
+                pdf_idx = done_queue.get_nowait()
+            except queue.Empty:
+                return
+            middle_json = finalize_middle_json(middle_json_list[pdf_idx], lang_list[pdf_idx], image_writer_list[pdf_idx])
+            results[pdf_idx] = (middle_json, model_list_list[pdf_idx], ocr_enabled_list[pdf_idx])
+            if on_doc_done is not None:
+                on_doc_done(pdf_idx, *results[pdf_idx])
+
+    def discard_image_cuts():
+        # 出错退出时丢弃尚未finalize的文档的截图错误，已finalize的文档没有残留记录
+        for image_writer in image_writer_list:
+            discard_image_cut_jobs(image_writer)
+
+    producer_thread = threading.Thread(target=render_producer, daemon=True)
+    consumer_thread = threading.Thread(target=post_consumer, daemon=True)
+    producer_thread.start()
+    consumer_thread.start()
+
+    loop_finished = False
+    try:
+        processed_pages = 0
+        total_pages = sum(window[2] - window[1] for window in windows)
+        while True:
+            wait_start = time.time()
+            item = get_until_stopped(render_queue)
+            if item is None:
+                break
+            window, future = item
+            page_metas, render_time = future.result()
+            if errors:
+                for page_meta in page_metas:
+                    release_shared_page_image(page_meta)
+                break
+            images_list = [load_shared_page_image(page_meta, ImageType.PIL) for page_meta in page_metas]
+            wait_time = time.time() - wait_start
+            render_stats.add(len(images_list), render_time)
+
+            pdf_idx, window_start, _ = window
+            start_time = time.time()
+            images_with_extra_info = [
+                (image_dict['img_pil'], ocr_enabled_list[pdf_idx][window_start + offset], lang_list[pdf_idx])
+                for offset, image_dict in enumerate(images_list)
+            ]
+            window_results = batch_image_analyze(images_with_extra_info, formula_enable, table_enable)
+            infer_stats.add(len(images_list), time.time() - start_time, wait_time)
+
+            processed_pages += len(images_list)
+            logger.info(f'Staged inference: {processed_pages} pages/{total_pages} pages')
+
+            if not put_until_stopped(post_queue, (window, images_list, window_results)):
+                break
+            del images_list, images_with_extra_info, window_results
+
+            # 跨页后处理会用到ocr模型，放在推理线程中执行，避免与推理阶段并发访问同一模型
+            finalize_done_docs()
+        loop_finished = True
+    finally:
+        if errors:
+            stop_event.set()
+        put_until_stopped(post_queue, None)
+        consumer_thread.join()
+        stop_event.set()
+        producer_thread.join()
+        # 释放已渲染但未被消费的窗口占用的共享内存
+        while not render_queue.empty():
+            item = render_queue.get_nowait()
+            if item is None:
+                continue
+            _, future = item
+            if not future.cancel() and future.exception() is None:
+                for page_meta in future.result()[0]:
+                    release_shared_page_image(page_meta)
+        executor.shutdown(wait=True, cancel_futures=True)
+        if not loop_finished:
+            # 推理阶段抛出异常，后处理线程已退出，不会再提交截图
+            discard_image_cuts()
+
+    try:
+        if errors:
+            raise errors[0]
+        finalize_done_docs()
+    except BaseException:
+        discard_image_cuts()
+        raise
+
+    for stats in (render_stats, infer_stats, post_stats):
+        logger.info(stats.summary())
+    log_onnx_session_stats()
+    log_ocr_rec_padding_stats()
+
+    return results
@@ -7,7 +7,7 @@ from loguru import logger
 
 from mineru.backend.vlm.vlm_magic_model import MagicModel
 from mineru.utils.config_reader import get_table_enable, get_llm_aided_config
-from mineru.utils.cut_image import cut_image_and_table
+from mineru.utils.cut_image import cut_image_and_table, discard_image_cut_jobs, flush_image_cut_jobs
 from mineru.utils.enum_class import ContentType
 from mineru.utils.hash_utils import bytes_md5
 from mineru.utils.pdf_image_tools import get_crop_img
@@ -101,22 +101,29 @@ def blocks_to_page_info(page_blocks, image_dict, page, image_writer, page_index)
 
 def result_to_middle_json(model_output_blocks_list, images_list, pdf_doc, image_writer):
     middle_json = {"pdf_info": [], "_backend":"vlm", "_version_name": __version__}
-    for index, page_blocks in enumerate(model_output_blocks_list):
-        page = pdf_doc[index]
-        image_dict = images_list[index]
-        page_info = blocks_to_page_info(page_blocks, image_dict, page, image_writer, index)
-        middle_json["pdf_info"].append(page_info)
-
-    """表格跨页合并"""
-    table_enable = get_table_enable(os.getenv('MINERU_VLM_TABLE_ENABLE', 'True').lower() == 'true')
-    if table_enable:
-        merge_table(middle_json["pdf_info"])
-
-    """llm优化标题分级"""
-    if heading_level_import_success:
-        llm_aided_title_start_time = time.time()
-        llm_aided_title(middle_json["pdf_info"], title_aided_config)
-        logger.info(f'llm aided title time: {round(time.time() - llm_aided_title_start_time, 2)}')
+    try:
+        for index, page_blocks in enumerate(model_output_blocks_list):
+            page = pdf_doc[index]
+            image_dict = images_list[index]
+            page_info = blocks_to_page_info(page_blocks, image_dict, page, image_writer, index)
+            middle_json["pdf_info"].append(page_info)
+
+        """表格跨页合并"""
+        table_enable = get_table_enable(os.getenv('MINERU_VLM_TABLE_ENABLE', 'True').lower() == 'true')
+        if table_enable:
+            merge_table(middle_json["pdf_info"])
+
+        """llm优化标题分级"""
+        if heading_level_import_success:
+            llm_aided_title_start_time = time.time()
+            llm_aided_title(middle_json["pdf_info"], title_aided_config)
+            logger.info(f'llm aided title time: {round(time.time() - llm_aided_title_start_time, 2)}')
+    except BaseException:
+        discard_image_cut_jobs(image_writer)
+        raise
+
+    """等待截图写完"""
+    flush_image_cut_jobs(image_writer)
 
     # 关闭pdf文档
     pdf_doc.close()
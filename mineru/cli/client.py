@@ -2,6 +2,7 @@
 import os
 import click
 from pathlib import Path
+from urllib.parse import urlparse
 from loguru import logger
 
 from mineru.utils.cli_parser import arg_parse
@@ -9,7 +10,7 @@ from mineru.utils.config_reader import get_device
 from mineru.utils.guess_suffix_or_lang import guess_suffix_by_path
 from mineru.utils.model_utils import get_vram
 from ..version import __version__
-from .common import do_parse, read_fn, pdf_suffixes, image_suffixes
+from .common import do_parse, read_fn, read_remote_fn, is_remote_path, pdf_suffixes, image_suffixes
 
 @click.command(context_settings=dict(ignore_unknown_options=True, allow_extra_args=True))
 @click.pass_context
@@ -21,9 +22,9 @@ from .common import do_parse, read_fn, pdf_suffixes, image_suffixes
     '-p',
     '--path',
     'input_path',
-    type=click.Path(exists=True),
+    type=str,
     required=True,
-    help='local filepath or directory. support pdf, png, jpg, jpeg files',
+    help='local filepath or directory, or the s3:// or http(s):// url of a single file. support pdf, png, jpg, jpeg files',
 )
 @click.option(
     '-o',
@@ -172,14 +173,20 @@ def main(
 
     os.makedirs(output_dir, exist_ok=True)
 
-    def parse_doc(path_list: list[Path]):
+    def parse_doc(path_list: list[Path | str]):
         try:
             file_name_list = []
             pdf_bytes_list = []
             lang_list = []
+            doc_start_page_id, doc_end_page_id = start_page_id, end_page_id
             for path in path_list:
-                file_name = str(Path(path).stem)
-                pdf_bytes = read_fn(path)
+                if is_remote_path(path):
+                    # 远程文件只下载页码范围内的页面，返回的pdf已经裁剪为这些页面
+                    file_name = Path(urlparse(str(path)).path).stem
+                    pdf_bytes, doc_start_page_id, doc_end_page_id = read_remote_fn(path, start_page_id, end_page_id)
+                else:
+                    file_name = str(Path(path).stem)
+                    pdf_bytes = read_fn(path)
                 file_name_list.append(file_name)
                 pdf_bytes_list.append(pdf_bytes)
                 lang_list.append(lang)
@@ -193,21 +200,25 @@ def main(
                 formula_enable=formula_enable,
                 table_enable=table_enable,
                 server_url=server_url,
-                start_page_id=start_page_id,
-                end_page_id=end_page_id,
+                start_page_id=doc_start_page_id,
+                end_page_id=doc_end_page_id,
                 **kwargs,
             )
         except Exception as e:
             logger.exception(e)
 
-    if os.path.isdir(input_path):
+    if is_remote_path(input_path):
+        parse_doc([input_path])
+    elif os.path.isdir(input_path):
         doc_path_list = []
         for doc_path in Path(input_path).glob('*'):
             if guess_suffix_by_path(doc_path) in pdf_suffixes + image_suffixes:
                 doc_path_list.append(doc_path)
         parse_doc(doc_path_list)
-    else:
+    elif os.path.exists(input_path):
         parse_doc([Path(input_path)])
+    else:
+        raise click.BadParameter(f"Path '{input_path}' does not exist.", param_hint="'-p' / '--path'")
 
 if __name__ == '__main__':
     main()
@@ -8,7 +8,11 @@ from pathlib import Path
 import pypdfium2 as pdfium
 from loguru import logger
 
-from mineru.data.data_reader_writer import FileBasedDataWriter
+from mineru.data.data_reader_writer import FileBasedDataWriter, MemoryDataWriter, S3DataReader
+from mineru.data.io.http import HttpReader
+from mineru.data.io.range_file import RangeReadFile
+from mineru.utils.config_reader import get_pipeline_streaming_enable, get_pipeline_overlap_enable, \
+    get_s3_config, parse_bucket_key
 from mineru.utils.draw_bbox import draw_layout_bbox, draw_span_bbox, draw_line_sort_bbox
 from mineru.utils.enum_class import MakeMode
 from mineru.utils.guess_suffix_or_lang import guess_suffix_by_bytes
@@ -26,13 +30,18 @@ def read_fn(path):
         path = Path(path)
     with open(str(path), "rb") as input_file:
         file_bytes = input_file.read()
-        file_suffix = guess_suffix_by_bytes(file_bytes, path)
-        if file_suffix in image_suffixes:
-            return images_bytes_to_pdf_bytes(file_bytes)
-        elif file_suffix in pdf_suffixes:
-            return file_bytes
-        else:
-            raise Exception(f"Unknown file suffix: {file_suffix}")
+    return file_bytes_to_pdf_bytes(file_bytes, path)
+
+
+def file_bytes_to_pdf_bytes(file_bytes, file_path=None):
+    """按文件内容判断类型，图片转换为pdf，pdf原样返回"""
+    file_suffix = guess_suffix_by_bytes(file_bytes, file_path)
+    if file_suffix in image_suffixes:
+        return images_bytes_to_pdf_bytes(file_bytes)
+    elif file_suffix in pdf_suffixes:
+        return file_bytes
+    else:
+        raise Exception(f"Unknown file suffix: {file_suffix}")
 
 
 def prepare_env(output_dir, pdf_file_name, parse_method):
@@ -43,9 +52,81 @@ def prepare_env(output_dir, pdf_file_name, parse_method):
     return local_image_dir, local_md_dir
 
 
+def prepare_writers(output_dir, pdf_file_name, parse_method, memory_files=None):
+    """返回(local_image_dir, local_md_dir, image_writer, md_writer)。
+
+    memory_files不为None时输出只写入该dict(路径 -> bytes)，不创建目录也不落盘，
+    此时draw_layout_bbox等直接写文件的输出需要由调用方关闭。
+    """
+    if memory_files is None:
+        local_image_dir, local_md_dir = prepare_env(output_dir, pdf_file_name, parse_method)
+        return local_image_dir, local_md_dir, FileBasedDataWriter(local_image_dir), FileBasedDataWriter(local_md_dir)
+    local_md_dir = str(os.path.join(output_dir, pdf_file_name, parse_method))
+    local_image_dir = os.path.join(str(local_md_dir), "images")
+    return (
+        local_image_dir, local_md_dir,
+        MemoryDataWriter(local_image_dir, memory_files), MemoryDataWriter(local_md_dir, memory_files)
+    )
+
+
+def is_remote_path(path) -> bool:
+    return str(path).startswith(('s3://', 'http://', 'https://'))
+
+
+def get_remote_reader(path):
+    """s3路径按配置文件中bucket_info的配置创建reader，http(s)路径使用HttpReader"""
+    path = str(path)
+    if path.startswith('s3://'):
+        bucket, _ = parse_bucket_key(path)
+        access_key, secret_key, storage_endpoint = get_s3_config(bucket)
+        return S3DataReader('', bucket, access_key, secret_key, storage_endpoint)
+    return HttpReader()
+
+
+def read_remote_fn(path, start_page_id=0, end_page_id=None):
+    """
+    读取s3或http(s)上的文件，返回(pdf_bytes, start_page_id, end_page_id)。
+
+    指定了页码范围时通过read_pdf_pages_by_range只下载这些页面用到的字节，
+    返回的pdf只包含这些页面，页码范围相应地改为从第0页到最后一页。
+    """
+    path = str(path)
+    reader = get_remote_reader(path)
+    if start_page_id == 0 and (end_page_id is None or end_page_id < 0):
+        return file_bytes_to_pdf_bytes(reader.read(path), path), start_page_id, end_page_id
+    return read_pdf_pages_by_range(reader, path, start_page_id, end_page_id), 0, None
+
+
+def read_pdf_pages_by_range(reader, path, start_page_id=0, end_page_id=None):
+    """
+    通过reader的按范围读取只下载start_page_id到end_page_id页用到的字节，返回只包含这些页面的pdf，
+    适用于从S3/HTTP读取大文件中的少量页面。返回的pdf从第0页开始，后续解析时start_page_id应为0。
+
+    reader需要实现read_at和get_size，不支持按范围读取或文件不是pdf时退回完整读取。
+    """
+    try:
+        range_file = RangeReadFile(reader, path)
+    except NotImplementedError:
+        pdf_bytes = file_bytes_to_pdf_bytes(reader.read(path), path)
+        return convert_pdf_bytes_to_bytes_by_pypdfium2(pdf_bytes, start_page_id, end_page_id)
+
+    with range_file:
+        # pdf文件头可能不在文件开头，与pdfium一致在前1024字节内查找
+        if b'%PDF' not in range_file.read(1024):
+            pdf_bytes = file_bytes_to_pdf_bytes(reader.read(path), path)
+            return convert_pdf_bytes_to_bytes_by_pypdfium2(pdf_bytes, start_page_id, end_page_id)
+        range_file.seek(0)
+        pdf_bytes = convert_pdf_bytes_to_bytes_by_pypdfium2(range_file, start_page_id, end_page_id)
+        logger.debug(
+            f'{path}: fetched {range_file.bytes_fetched}/{range_file.size} bytes '
+            f'in {range_file.request_count} range requests'
+        )
+    return pdf_bytes
+
+
 def convert_pdf_bytes_to_bytes_by_pypdfium2(pdf_bytes, start_page_id=0, end_page_id=None):
 
-    # 从字节数据加载PDF
+    # 从字节数据或可seek的文件对象加载PDF
     pdf = pdfium.PdfDocument(pdf_bytes)
 
     # 确定结束页
@@ -152,29 +233,44 @@ def _process_output(
             json.dumps(model_output, ensure_ascii=False, indent=4),
         )
 
+    # 等待后台写入（如s3并发上传）完成
+    md_writer.flush()
     logger.info(f"local output dir is {local_md_dir}")
 
 
-def _process_pipeline(
-        output_dir,
-        pdf_file_names,
+def _analyze_pipeline(
         pdf_bytes_list,
         p_lang_list,
         parse_method,
         p_formula_enable,
         p_table_enable,
-        f_draw_layout_bbox,
-        f_draw_span_bbox,
-        f_dump_md,
-        f_dump_middle_json,
-        f_dump_model_output,
-        f_dump_orig_pdf,
-        f_dump_content_list,
-        f_make_md_mode,
+        image_writer_list,
+        on_doc_done,
 ):
-    """处理pipeline后端逻辑"""
+    """执行pipeline推理并构造middle_json，每个文档完成后调用on_doc_done(idx, middle_json, model_json)"""
     from mineru.backend.pipeline.model_json_to_middle_json import result_to_middle_json as pipeline_result_to_middle_json
     from mineru.backend.pipeline.pipeline_analyze import doc_analyze as pipeline_doc_analyze
+    from mineru.backend.pipeline.pipeline_analyze import doc_analyze_streaming as pipeline_doc_analyze_streaming
+    from mineru.backend.pipeline.pipeline_staged_analyze import doc_analyze_staged as pipeline_doc_analyze_staged
+
+    if get_pipeline_overlap_enable():
+        # 重叠模式：渲染、推理、middle_json构造三个阶段并行执行
+        pipeline_doc_analyze_staged(
+            pdf_bytes_list, p_lang_list, image_writer_list, parse_method=parse_method,
+            formula_enable=p_formula_enable, table_enable=p_table_enable,
+            on_doc_done=lambda idx, middle_json, model_json, _page_ocr_enable_list: on_doc_done(idx, middle_json, model_json)
+        )
+        return
+
+    if get_pipeline_streaming_enable():
+        # 流式模式：逐文档按页面窗口处理，不再一次性渲染全部页面
+        for idx, pdf_bytes in enumerate(pdf_bytes_list):
+            middle_json, model_json, _ = pipeline_doc_analyze_streaming(
+                pdf_bytes, p_lang_list[idx], image_writer_list[idx], parse_method=parse_method,
+                formula_enable=p_formula_enable, table_enable=p_table_enable
+            )
+            on_doc_done(idx, middle_json, model_json)
+        return
 
     infer_results, all_image_lists, all_pdf_docs, lang_list, ocr_enabled_list = (
         pipeline_doc_analyze(
@@ -185,30 +281,103 @@ def _process_pipeline(
 
     for idx, model_list in enumerate(infer_results):
         model_json = copy.deepcopy(model_list)
-        pdf_file_name = pdf_file_names[idx]
-        local_image_dir, local_md_dir = prepare_env(output_dir, pdf_file_name, parse_method)
-        image_writer, md_writer = FileBasedDataWriter(local_image_dir), FileBasedDataWriter(local_md_dir)
 
         images_list = all_image_lists[idx]
         pdf_doc = all_pdf_docs[idx]
         _lang = lang_list[idx]
-        _ocr_enable = ocr_enabled_list[idx]
+        _page_ocr_enable_list = ocr_enabled_list[idx]
 
         middle_json = pipeline_result_to_middle_json(
-            model_list, images_list, pdf_doc, image_writer,
-            _lang, _ocr_enable, p_formula_enable
+            model_list, images_list, pdf_doc, image_writer_list[idx],
+            _lang, _page_ocr_enable_list, p_formula_enable
         )
+        on_doc_done(idx, middle_json, model_json)
 
-        pdf_info = middle_json["pdf_info"]
-        pdf_bytes = pdf_bytes_list[idx]
 
+def _process_pipeline(
+        output_dir,
+        pdf_file_names,
+        pdf_bytes_list,
+        p_lang_list,
+        parse_method,
+        p_formula_enable,
+        p_table_enable,
+        f_draw_layout_bbox,
+        f_draw_span_bbox,
+        f_dump_md,
+        f_dump_middle_json,
+        f_dump_model_output,
+        f_dump_orig_pdf,
+        f_dump_content_list,
+        f_make_md_mode,
+        memory_files=None,
+):
+    """处理pipeline后端逻辑"""
+    env_list = [
+        prepare_writers(output_dir, pdf_file_name, parse_method, memory_files) for pdf_file_name in pdf_file_names
+    ]
+    image_writer_list = [image_writer for _, _, image_writer, _ in env_list]
+
+    def on_doc_done(idx, middle_json, model_json):
+        local_image_dir, local_md_dir, image_writer, md_writer = env_list[idx]
+        image_writer.flush()
         _process_output(
-            pdf_info, pdf_bytes, pdf_file_name, local_md_dir, local_image_dir,
+            middle_json["pdf_info"], pdf_bytes_list[idx], pdf_file_names[idx], local_md_dir, local_image_dir,
             md_writer, f_draw_layout_bbox, f_draw_span_bbox, f_dump_orig_pdf,
             f_dump_md, f_dump_content_list, f_dump_middle_json, f_dump_model_output,
             f_make_md_mode, middle_json, model_json, is_pipeline=True
         )
 
+    _analyze_pipeline(
+        pdf_bytes_list, p_lang_list, parse_method, p_formula_enable, p_table_enable,
+        image_writer_list, on_doc_done
+    )
+
+
+def do_parse_pipeline_batch(parse_jobs: list[dict]):
+    """把多个请求的文档合并为一次pipeline推理，使页面可以跨请求组成更大的batch。
+
+    每个job是一份do_parse的参数(output_dir、pdf_file_names、pdf_bytes_list、p_lang_list、f_dump_*等)，
+    所有job的parse_method、formula_enable、table_enable必须一致，推理完成后各文档仍按所属job的参数输出到各自的output_dir，
+    job中带有memory_files时该job的输出只写入内存。
+    """
+    first_job = parse_jobs[0]
+    parse_method = first_job.get("parse_method", "auto")
+    formula_enable = first_job.get("formula_enable", True)
+    table_enable = first_job.get("table_enable", True)
+
+    doc_jobs = []
+    pdf_bytes_list = []
+    lang_list = []
+    for job in parse_jobs:
+        job_pdf_bytes_list = _prepare_pdf_bytes(
+            job["pdf_bytes_list"], job.get("start_page_id", 0), job.get("end_page_id")
+        )
+        for pdf_file_name, pdf_bytes, lang in zip(job["pdf_file_names"], job_pdf_bytes_list, job["p_lang_list"]):
+            doc_jobs.append((job, pdf_file_name, prepare_writers(
+                job["output_dir"], pdf_file_name, parse_method, job.get("memory_files")
+            )))
+            pdf_bytes_list.append(pdf_bytes)
+            lang_list.append(lang)
+
+    image_writer_list = [image_writer for _, _, (_, _, image_writer, _) in doc_jobs]
+
+    def on_doc_done(idx, middle_json, model_json):
+        job, pdf_file_name, (local_image_dir, local_md_dir, image_writer, md_writer) = doc_jobs[idx]
+        image_writer.flush()
+        _process_output(
+            middle_json["pdf_info"], pdf_bytes_list[idx], pdf_file_name, local_md_dir, local_image_dir,
+            md_writer, job.get("f_draw_layout_bbox", True), job.get("f_draw_span_bbox", True),
+            job.get("f_dump_orig_pdf", True), job.get("f_dump_md", True), job.get("f_dump_content_list", True),
+            job.get("f_dump_middle_json", True), job.get("f_dump_model_output", True),
+            job.get("f_make_md_mode", MakeMode.MM_MD), middle_json, model_json, is_pipeline=True
+        )
+
+    _analyze_pipeline(
+        pdf_bytes_list, lang_list, parse_method, formula_enable, table_enable,
+        image_writer_list, on_doc_done
+    )
+
 
 async def _async_process_vlm(
         output_dir,
@@ -224,6 +393,7 @@ async def _async_process_vlm(
         f_dump_content_list,
         f_make_md_mode,
         server_url=None,
+        memory_files=None,
         **kwargs,
 ):
     """异步处理VLM后端逻辑"""
@@ -234,14 +404,16 @@ async def _async_process_vlm(
 
     for idx, pdf_bytes in enumerate(pdf_bytes_list):
         pdf_file_name = pdf_file_names[idx]
-        local_image_dir, local_md_dir = prepare_env(output_dir, pdf_file_name, parse_method)
-        image_writer, md_writer = FileBasedDataWriter(local_image_dir), FileBasedDataWriter(local_md_dir)
+        local_image_dir, local_md_dir, image_writer, md_writer = prepare_writers(
+            output_dir, pdf_file_name, parse_method, memory_files
+        )
 
         middle_json, infer_result = await aio_vlm_doc_analyze(
             pdf_bytes, image_writer=image_writer, backend=backend, server_url=server_url, **kwargs,
         )
 
         pdf_info = middle_json["pdf_info"]
+        image_writer.flush()
 
         _process_output(
             pdf_info, pdf_bytes, pdf_file_name, local_md_dir, local_image_dir,
@@ -265,6 +437,7 @@ def _process_vlm(
         f_dump_content_list,
         f_make_md_mode,
         server_url=None,
+        memory_files=None,
         **kwargs,
 ):
     """同步处理VLM后端逻辑"""
@@ -275,14 +448,16 @@ def _process_vlm(
 
     for idx, pdf_bytes in enumerate(pdf_bytes_list):
         pdf_file_name = pdf_file_names[idx]
-        local_image_dir, local_md_dir = prepare_env(output_dir, pdf_file_name, parse_method)
-        image_writer, md_writer = FileBasedDataWriter(local_image_dir), FileBasedDataWriter(local_md_dir)
+        local_image_dir, local_md_dir, image_writer, md_writer = prepare_writers(
+            output_dir, pdf_file_name, parse_method, memory_files
+        )
 
         middle_json, infer_result = vlm_doc_analyze(
             pdf_bytes, image_writer=image_writer, backend=backend, server_url=server_url, **kwargs,
         )
 
         pdf_info = middle_json["pdf_info"]
+        image_writer.flush()
 
         _process_output(
             pdf_info, pdf_bytes, pdf_file_name, local_md_dir, local_image_dir,
@@ -312,6 +487,7 @@ def do_parse(
         f_make_md_mode=MakeMode.MM_MD,
         start_page_id=0,
         end_page_id=None,
+        memory_files=None,
         **kwargs,
 ):
     # 预处理PDF字节数据
@@ -322,7 +498,7 @@ def do_parse(
             output_dir, pdf_file_names, pdf_bytes_list, p_lang_list,
             parse_method, formula_enable, table_enable,
             f_draw_layout_bbox, f_draw_span_bbox, f_dump_md, f_dump_middle_json,
-            f_dump_model_output, f_dump_orig_pdf, f_dump_content_list, f_make_md_mode
+            f_dump_model_output, f_dump_orig_pdf, f_dump_content_list, f_make_md_mode, memory_files
         )
     else:
         if backend.startswith("vlm-"):
@@ -338,7 +514,7 @@ def do_parse(
             output_dir, pdf_file_names, pdf_bytes_list, backend,
             f_draw_layout_bbox, f_draw_span_bbox, f_dump_md, f_dump_middle_json,
             f_dump_model_output, f_dump_orig_pdf, f_dump_content_list, f_make_md_mode,
-            server_url, **kwargs,
+            server_url, memory_files, **kwargs,
         )
 
 
@@ -362,6 +538,7 @@ async def aio_do_parse(
         f_make_md_mode=MakeMode.MM_MD,
         start_page_id=0,
         end_page_id=None,
+        memory_files=None,
         **kwargs,
 ):
     # 预处理PDF字节数据
@@ -373,7 +550,7 @@ async def aio_do_parse(
             output_dir, pdf_file_names, pdf_bytes_list, p_lang_list,
             parse_method, formula_enable, table_enable,
             f_draw_layout_bbox, f_draw_span_bbox, f_dump_md, f_dump_middle_json,
-            f_dump_model_output, f_dump_orig_pdf, f_dump_content_list, f_make_md_mode
+            f_dump_model_output, f_dump_orig_pdf, f_dump_content_list, f_make_md_mode, memory_files
         )
     else:
         if backend.startswith("vlm-"):
@@ -389,7 +566,7 @@ async def aio_do_parse(
             output_dir, pdf_file_names, pdf_bytes_list, backend,
             f_draw_layout_bbox, f_draw_span_bbox, f_dump_md, f_dump_middle_json,
             f_dump_model_output, f_dump_orig_pdf, f_dump_content_list, f_make_md_mode,
-            server_url, **kwargs,
+            server_url, memory_files, **kwargs,
         )
 
 
@@ -1,30 +1,45 @@
-import uuid
+import io
 import os
 import re
-import tempfile
-import asyncio
 import uvicorn
 import click
 import zipfile
 from pathlib import Path
-import glob
 from fastapi import FastAPI, UploadFile, File, Form
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from starlette.background import BackgroundTask
+from fastapi.responses import JSONResponse, Response
 from typing import List, Optional
 from loguru import logger
 from base64 import b64encode
 
-from mineru.cli.common import aio_do_parse, read_fn, pdf_suffixes, image_suffixes
+from mineru.cli.common import file_bytes_to_pdf_bytes, pdf_suffixes, image_suffixes
+from mineru.cli.task_manager import TaskManager, TaskStatus, QueueFullError, Task, count_pdf_pages
 from mineru.utils.cli_parser import arg_parse
-from mineru.utils.guess_suffix_or_lang import guess_suffix_by_path
+from mineru.utils.guess_suffix_or_lang import guess_suffix_by_bytes
 from mineru.version import __version__
 
 app = FastAPI()
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 
+_task_manager = None
+
+
+def get_task_manager() -> TaskManager:
+    """首次使用时按命令行参数创建任务队列和worker进程池"""
+    global _task_manager
+    if _task_manager is None:
+        task_config = getattr(app.state, "task_config", {})
+        _task_manager = TaskManager(
+            workers=task_config.get("workers", 1),
+            max_queued_pages=task_config.get("max_queued_pages", 1000),
+            batch_wait=task_config.get("batch_wait_ms", 100) / 1000,
+            batch_max_pages=int(os.environ.get("MINERU_MIN_BATCH_INFERENCE_SIZE", 384)),
+            small_task_pages=task_config.get("small_task_pages", 20),
+        )
+    return _task_manager
+
+
 def sanitize_filename(filename: str) -> str:
     """
     格式化压缩文件的文件名
@@ -37,32 +52,207 @@ def sanitize_filename(filename: str) -> str:
         sanitized = '_' + sanitized[1:]
     return sanitized or 'unnamed'
 
-def cleanup_file(file_path: str) -> None:
-    """清理临时 zip 文件"""
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-    except Exception as e:
-        logger.warning(f"fail clean file {file_path}: {e}")
+def get_infer_result(files: dict, file_suffix_identifier: str, pdf_name: str, parse_dir: str) -> Optional[str]:
+    """从内存中的解析输出读取推理结果"""
+    data = files.get(os.path.join(parse_dir, f"{pdf_name}{file_suffix_identifier}"))
+    if data is None:
+        return None
+    return data.decode("utf-8")
+
+
+def get_images(files: dict, parse_dir: str) -> dict:
+    """返回解析输出中的图片，文件名 -> bytes"""
+    images_dir = os.path.join(parse_dir, "images")
+    return {
+        os.path.basename(path): data
+        for path, data in files.items()
+        if os.path.dirname(path) == images_dir and path.endswith(".jpg")
+    }
+
+
+def _load_uploads(files_content):
+    """把上传内容转换为pdf字节，返回(pdf_file_names, pdf_bytes_list)，文件类型不支持时抛出ValueError"""
+    pdf_file_names = []
+    pdf_bytes_list = []
+    for file_name, content in files_content:
+        file_path = Path(file_name)
+        # 直接按内容判断文件类型，不再经过临时文件
+        file_suffix = guess_suffix_by_bytes(content, file_path)
+        if file_suffix not in pdf_suffixes + image_suffixes:
+            raise ValueError(f"Unsupported file type: {file_suffix}")
+        try:
+            pdf_bytes = file_bytes_to_pdf_bytes(content, file_path)
+        except Exception as e:
+            raise ValueError(f"Failed to load file: {str(e)}")
+        pdf_bytes_list.append(pdf_bytes)
+        pdf_file_names.append(file_path.stem)
+    return pdf_file_names, pdf_bytes_list
+
+
+async def _submit_task(
+        files: List[UploadFile],
+        lang_list: List[str],
+        backend: str,
+        parse_method: str,
+        formula_enable: bool,
+        table_enable: bool,
+        server_url: Optional[str],
+        return_md: bool,
+        return_middle_json: bool,
+        return_model_output: bool,
+        return_content_list: bool,
+        return_images: bool,
+        response_format_zip: bool,
+        start_page_id: int,
+        end_page_id: int,
+) -> Task:
+    # 获取命令行配置参数
+    config = getattr(app.state, "config", {})
+
+    files_content = [(file.filename, await file.read()) for file in files]
+    pdf_file_names, pdf_bytes_list = _load_uploads(files_content)
+
+    # 设置语言列表，确保与文件数量一致
+    actual_lang_list = lang_list
+    if len(actual_lang_list) != len(pdf_file_names):
+        # 如果语言列表长度不匹配，使用第一个语言或默认"ch"
+        actual_lang_list = [actual_lang_list[0] if actual_lang_list else "ch"] * len(pdf_file_names)
+
+    parse_kwargs = dict(
+        pdf_file_names=pdf_file_names,
+        pdf_bytes_list=pdf_bytes_list,
+        p_lang_list=actual_lang_list,
+        backend=backend,
+        parse_method=parse_method,
+        formula_enable=formula_enable,
+        table_enable=table_enable,
+        server_url=server_url,
+        f_draw_layout_bbox=False,
+        f_draw_span_bbox=False,
+        f_dump_md=return_md,
+        f_dump_middle_json=return_middle_json,
+        f_dump_model_output=return_model_output,
+        f_dump_orig_pdf=False,
+        f_dump_content_list=return_content_list,
+        start_page_id=start_page_id,
+        end_page_id=end_page_id,
+        **config
+    )
+    response_options = dict(
+        backend=backend,
+        parse_method=parse_method,
+        return_md=return_md,
+        return_middle_json=return_middle_json,
+        return_model_output=return_model_output,
+        return_content_list=return_content_list,
+        return_images=return_images,
+        response_format_zip=response_format_zip,
+    )
+    page_count = count_pdf_pages(pdf_bytes_list, start_page_id, end_page_id)
+    # pipeline后端参数相同的请求可以合并推理，跨请求组成更大的batch
+    batch_key = (backend, parse_method, formula_enable, table_enable) if backend == "pipeline" else None
+    return get_task_manager().submit(
+        pdf_file_names, page_count, parse_kwargs, response_options, batch_key=batch_key,
+    )
+
+
+def _build_result_response(task: Task):
+    """根据任务在内存中的解析输出组织返回内容"""
+    files = task.result or {}
+    pdf_file_names = task.pdf_file_names
+    backend = task.response_options["backend"]
+    parse_method = task.response_options["parse_method"]
+    return_md = task.response_options["return_md"]
+    return_middle_json = task.response_options["return_middle_json"]
+    return_model_output = task.response_options["return_model_output"]
+    return_content_list = task.response_options["return_content_list"]
+    return_images = task.response_options["return_images"]
+
+    # 根据 response_format_zip 决定返回类型
+    if task.response_options["response_format_zip"]:
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for pdf_name in pdf_file_names:
+                safe_pdf_name = sanitize_filename(pdf_name)
+                if backend.startswith("pipeline"):
+                    parse_dir = os.path.join(pdf_name, parse_method)
+                else:
+                    parse_dir = os.path.join(pdf_name, "vlm")
+
+                # 写入文本类结果
+                def write_result(file_name, arc_file_name):
+                    data = files.get(os.path.join(parse_dir, file_name))
+                    if data is not None:
+                        zf.writestr(os.path.join(safe_pdf_name, arc_file_name), data)
+
+                if return_md:
+                    write_result(f"{pdf_name}.md", f"{safe_pdf_name}.md")
+
+                if return_middle_json:
+                    write_result(f"{pdf_name}_middle.json", f"{safe_pdf_name}_middle.json")
+
+                if return_model_output:
+                    if backend.startswith("pipeline"):
+                        write_result(f"{pdf_name}_model.json", f"{pdf_name}_model.json")
+                    else:
+                        write_result(f"{pdf_name}_model_output.txt", f"{pdf_name}_model_output.txt")
 
-def encode_image(image_path: str) -> str:
-    """Encode image using base64"""
-    with open(image_path, "rb") as f:
-        return b64encode(f.read()).decode()
+                if return_content_list:
+                    write_result(f"{pdf_name}_content_list.json", f"{safe_pdf_name}_content_list.json")
 
+                # 写入图片
+                if return_images:
+                    for image_name, image_bytes in get_images(files, parse_dir).items():
+                        zf.writestr(os.path.join(safe_pdf_name, "images", image_name), image_bytes)
 
-def get_infer_result(file_suffix_identifier: str, pdf_name: str, parse_dir: str) -> Optional[str]:
-    """从结果文件中读取推理结果"""
-    result_file_path = os.path.join(parse_dir, f"{pdf_name}{file_suffix_identifier}")
-    if os.path.exists(result_file_path):
-        with open(result_file_path, "r", encoding="utf-8") as fp:
-            return fp.read()
-    return None
+        return Response(
+            content=zip_buffer.getvalue(),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="results.zip"'},
+        )
+    else:
+        # 构建 JSON 结果
+        result_dict = {}
+        for pdf_name in pdf_file_names:
+            result_dict[pdf_name] = {}
+            data = result_dict[pdf_name]
+
+            if backend.startswith("pipeline"):
+                parse_dir = os.path.join(pdf_name, parse_method)
+            else:
+                parse_dir = os.path.join(pdf_name, "vlm")
+
+            if return_md:
+                data["md_content"] = get_infer_result(files, ".md", pdf_name, parse_dir)
+            if return_middle_json:
+                data["middle_json"] = get_infer_result(files, "_middle.json", pdf_name, parse_dir)
+            if return_model_output:
+                if backend.startswith("pipeline"):
+                    data["model_output"] = get_infer_result(files, "_model.json", pdf_name, parse_dir)
+                else:
+                    data["model_output"] = get_infer_result(files, "_model_output.txt", pdf_name, parse_dir)
+            if return_content_list:
+                data["content_list"] = get_infer_result(files, "_content_list.json", pdf_name, parse_dir)
+            if return_images:
+                data["images"] = {
+                    image_name: f"data:image/jpeg;base64,{b64encode(image_bytes).decode()}"
+                    for image_name, image_bytes in get_images(files, parse_dir).items()
+                }
+
+        return JSONResponse(
+            status_code=200,
+            content={
+                "backend": backend,
+                "version": __version__,
+                "results": result_dict
+            }
+        )
 
 
 @app.post(path="/file_parse",)
 async def parse_pdf(
         files: List[UploadFile] = File(...),
+        # 结果不再写入磁盘，保留该参数以兼容旧的调用方
         output_dir: str = Form("./output"),
         lang_list: List[str] = Form(["ch"]),
         backend: str = Form("pipeline"),
@@ -80,190 +270,160 @@ async def parse_pdf(
         end_page_id: int = Form(99999),
 ):
 
-    # 获取命令行配置参数
-    config = getattr(app.state, "config", {})
+    try:
+        # 与异步任务接口共用任务队列，推理在worker进程中执行，不阻塞事件循环
+        task = await _submit_task(
+            files, lang_list, backend, parse_method, formula_enable, table_enable, server_url,
+            return_md, return_middle_json, return_model_output, return_content_list, return_images,
+            response_format_zip, start_page_id, end_page_id,
+        )
+        await get_task_manager().wait(task)
+        # 同步接口的结果只返回一次，不再保留
+        get_task_manager().remove(task.task_id)
+        if task.status != TaskStatus.DONE:
+            return JSONResponse(
+                status_code=500,
+                content={"error": f"Failed to process file: {task.error or task.status}"}
+            )
+        return _build_result_response(task)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"error": f"Server is busy: {str(e)}"}
+        )
+    except Exception as e:
+        logger.exception(e)
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Failed to process file: {str(e)}"}
+        )
+
 
+@app.post(path="/tasks",)
+async def submit_task(
+        files: List[UploadFile] = File(...),
+        # 结果不再写入磁盘，保留该参数以兼容旧的调用方
+        output_dir: str = Form("./output"),
+        lang_list: List[str] = Form(["ch"]),
+        backend: str = Form("pipeline"),
+        parse_method: str = Form("auto"),
+        formula_enable: bool = Form(True),
+        table_enable: bool = Form(True),
+        server_url: Optional[str] = Form(None),
+        return_md: bool = Form(True),
+        return_middle_json: bool = Form(False),
+        return_model_output: bool = Form(False),
+        return_content_list: bool = Form(False),
+        return_images: bool = Form(False),
+        response_format_zip: bool = Form(False),
+        start_page_id: int = Form(0),
+        end_page_id: int = Form(99999),
+):
+    """提交解析任务后立即返回task_id，通过 GET /tasks/{task_id} 查询状态，GET /tasks/{task_id}/result 获取结果"""
     try:
-        # 创建唯一的输出目录
-        unique_dir = os.path.join(output_dir, str(uuid.uuid4()))
-        os.makedirs(unique_dir, exist_ok=True)
-
-        # 处理上传的PDF文件
-        pdf_file_names = []
-        pdf_bytes_list = []
-
-        for file in files:
-            content = await file.read()
-            file_path = Path(file.filename)
-
-            # 创建临时文件
-            temp_path = Path(unique_dir) / file_path.name
-            with open(temp_path, "wb") as f:
-                f.write(content)
-
-            # 如果是图像文件或PDF，使用read_fn处理
-            file_suffix = guess_suffix_by_path(temp_path)
-            if file_suffix in pdf_suffixes + image_suffixes:
-                try:
-                    pdf_bytes = read_fn(temp_path)
-                    pdf_bytes_list.append(pdf_bytes)
-                    pdf_file_names.append(file_path.stem)
-                    os.remove(temp_path)  # 删除临时文件
-                except Exception as e:
-                    return JSONResponse(
-                        status_code=400,
-                        content={"error": f"Failed to load file: {str(e)}"}
-                    )
-            else:
-                return JSONResponse(
-                    status_code=400,
-                    content={"error": f"Unsupported file type: {file_suffix}"}
-                )
-
-
-        # 设置语言列表，确保与文件数量一致
-        actual_lang_list = lang_list
-        if len(actual_lang_list) != len(pdf_file_names):
-            # 如果语言列表长度不匹配，使用第一个语言或默认"ch"
-            actual_lang_list = [actual_lang_list[0] if actual_lang_list else "ch"] * len(pdf_file_names)
-
-        # 调用异步处理函数
-        await aio_do_parse(
-            output_dir=unique_dir,
-            pdf_file_names=pdf_file_names,
-            pdf_bytes_list=pdf_bytes_list,
-            p_lang_list=actual_lang_list,
-            backend=backend,
-            parse_method=parse_method,
-            formula_enable=formula_enable,
-            table_enable=table_enable,
-            server_url=server_url,
-            f_draw_layout_bbox=False,
-            f_draw_span_bbox=False,
-            f_dump_md=return_md,
-            f_dump_middle_json=return_middle_json,
-            f_dump_model_output=return_model_output,
-            f_dump_orig_pdf=False,
-            f_dump_content_list=return_content_list,
-            start_page_id=start_page_id,
-            end_page_id=end_page_id,
-            **config
+        task = await _submit_task(
+            files, lang_list, backend, parse_method, formula_enable, table_enable, server_url,
+            return_md, return_middle_json, return_model_output, return_content_list, return_images,
+            response_format_zip, start_page_id, end_page_id,
+        )
+        return JSONResponse(
+            status_code=202,
+            content=get_task_manager().get_status(task.task_id)
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"error": f"Server is busy: {str(e)}"}
+        )
+    except Exception as e:
+        logger.exception(e)
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"Failed to submit task: {str(e)}"}
         )
 
-        # 根据 response_format_zip 决定返回类型
-        if response_format_zip:
-            zip_fd, zip_path = tempfile.mkstemp(suffix=".zip", prefix="mineru_results_")
-            os.close(zip_fd) 
-            with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-                for pdf_name in pdf_file_names:
-                    safe_pdf_name = sanitize_filename(pdf_name)
-                    if backend.startswith("pipeline"):
-                        parse_dir = os.path.join(unique_dir, pdf_name, parse_method)
-                    else:
-                        parse_dir = os.path.join(unique_dir, pdf_name, "vlm")
-
-                    if not os.path.exists(parse_dir):
-                        continue
-
-                    # 写入文本类结果
-                    if return_md:
-                        path = os.path.join(parse_dir, f"{pdf_name}.md")
-                        if os.path.exists(path):
-                            zf.write(path, arcname=os.path.join(safe_pdf_name, f"{safe_pdf_name}.md"))
-
-                    if return_middle_json:
-                        path = os.path.join(parse_dir, f"{pdf_name}_middle.json")
-                        if os.path.exists(path):
-                            zf.write(path, arcname=os.path.join(safe_pdf_name, f"{safe_pdf_name}_middle.json"))
-
-                    if return_model_output:
-                        if backend.startswith("pipeline"):
-                            path = os.path.join(parse_dir, f"{pdf_name}_model.json")
-                        else:
-                            path = os.path.join(parse_dir, f"{pdf_name}_model_output.txt")
-                        if os.path.exists(path): 
-                            zf.write(path, arcname=os.path.join(safe_pdf_name, os.path.basename(path)))
-
-                    if return_content_list:
-                        path = os.path.join(parse_dir, f"{pdf_name}_content_list.json")
-                        if os.path.exists(path):
-                            zf.write(path, arcname=os.path.join(safe_pdf_name, f"{safe_pdf_name}_content_list.json"))
-
-                    # 写入图片
-                    if return_images:
-                        images_dir = os.path.join(parse_dir, "images")
-                        image_paths = glob.glob(os.path.join(glob.escape(images_dir), "*.jpg"))
-                        for image_path in image_paths:
-                            zf.write(image_path, arcname=os.path.join(safe_pdf_name, "images", os.path.basename(image_path)))
-
-            return FileResponse(
-                path=zip_path,
-                media_type="application/zip",
-                filename="results.zip",
-                background=BackgroundTask(cleanup_file, zip_path)
-            )
-        else:
-            # 构建 JSON 结果
-            result_dict = {}
-            for pdf_name in pdf_file_names:
-                result_dict[pdf_name] = {}
-                data = result_dict[pdf_name]
 
-                if backend.startswith("pipeline"):
-                    parse_dir = os.path.join(unique_dir, pdf_name, parse_method)
-                else:
-                    parse_dir = os.path.join(unique_dir, pdf_name, "vlm")
-
-                if os.path.exists(parse_dir):
-                    if return_md:
-                        data["md_content"] = get_infer_result(".md", pdf_name, parse_dir)
-                    if return_middle_json:
-                        data["middle_json"] = get_infer_result("_middle.json", pdf_name, parse_dir)
-                    if return_model_output:
-                        if backend.startswith("pipeline"):
-                            data["model_output"] = get_infer_result("_model.json", pdf_name, parse_dir)
-                        else:
-                            data["model_output"] = get_infer_result("_model_output.txt", pdf_name, parse_dir)
-                    if return_content_list:
-                        data["content_list"] = get_infer_result("_content_list.json", pdf_name, parse_dir)
-                    if return_images:
-                        images_dir = os.path.join(parse_dir, "images")
-                        safe_pattern = os.path.join(glob.escape(images_dir), "*.jpg")
-                        image_paths = glob.glob(safe_pattern)
-                        data["images"] = {
-                            os.path.basename(
-                                image_path
-                            ): f"data:image/jpeg;base64,{encode_image(image_path)}"
-                            for image_path in image_paths
-                        }
+@app.get(path="/tasks/{task_id}",)
+async def get_task_status(task_id: str):
+    status = get_task_manager().get_status(task_id)
+    if status is None:
+        return JSONResponse(status_code=404, content={"error": f"Task not found: {task_id}"})
+    return JSONResponse(status_code=200, content=status)
 
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "backend": backend,
-                    "version": __version__,
-                    "results": result_dict
-                }
-            )
+
+@app.get(path="/tasks/{task_id}/result",)
+async def get_task_result(task_id: str):
+    task = get_task_manager().get(task_id)
+    if task is None:
+        return JSONResponse(status_code=404, content={"error": f"Task not found: {task_id}"})
+    if task.status in [TaskStatus.QUEUED, TaskStatus.RUNNING]:
+        return JSONResponse(status_code=202, content=get_task_manager().get_status(task_id))
+    if task.status != TaskStatus.DONE:
+        return JSONResponse(status_code=409, content=get_task_manager().get_status(task_id))
+    try:
+        return _build_result_response(task)
     except Exception as e:
         logger.exception(e)
         return JSONResponse(
             status_code=500,
-            content={"error": f"Failed to process file: {str(e)}"}
+            content={"error": f"Failed to build result: {str(e)}"}
         )
 
 
+@app.delete(path="/tasks/{task_id}",)
+async def cancel_task(task_id: str):
+    task_manager = get_task_manager()
+    if task_manager.get(task_id) is None:
+        return JSONResponse(status_code=404, content={"error": f"Task not found: {task_id}"})
+    if not task_manager.cancel(task_id):
+        # 正在执行或已结束的任务无法取消
+        return JSONResponse(status_code=409, content=task_manager.get_status(task_id))
+    return JSONResponse(status_code=200, content=task_manager.get_status(task_id))
+
+
+@app.on_event("shutdown")
+def shutdown_task_manager():
+    global _task_manager
+    if _task_manager is not None:
+        _task_manager.close()
+        _task_manager = None
+
+
 @click.command(context_settings=dict(ignore_unknown_options=True, allow_extra_args=True))
 @click.pass_context
 @click.option('--host', default='127.0.0.1', help='Server host (default: 127.0.0.1)')
 @click.option('--port', default=8000, type=int, help='Server port (default: 8000)')
 @click.option('--reload', is_flag=True, help='Enable auto-reload (development mode)')
-def main(ctx, host, port, reload, **kwargs):
+@click.option('--workers', default=1, type=int, envvar='MINERU_API_WORKERS',
+              help='Number of model-holding worker processes (default: 1)')
+@click.option('--max-queued-pages', default=1000, type=int, envvar='MINERU_API_MAX_QUEUED_PAGES',
+              help='Reject new tasks when more pages than this are queued (default: 1000)')
+@click.option('--small-task-pages', default=20, type=int, envvar='MINERU_API_SMALL_TASK_PAGES',
+              help='Tasks with at most this many pages are scheduled ahead of larger ones (default: 20)')
+@click.option('--batch-wait-ms', default=100, type=int, envvar='MINERU_API_BATCH_WAIT_MS',
+              help='Max time to wait for concurrent pipeline requests to share one batch (default: 100)')
+def main(ctx, host, port, reload, workers, max_queued_pages, small_task_pages, batch_wait_ms, **kwargs):
 
     kwargs.update(arg_parse(ctx))
 
     # 将配置参数存储到应用状态中
     app.state.config = kwargs
+    app.state.task_config = {
+        "workers": workers,
+        "max_queued_pages": max_queued_pages,
+        "small_task_pages": small_task_pages,
+        "batch_wait_ms": batch_wait_ms,
+    }
 
     """启动MinerU FastAPI服务器的命令行入口"""
     print(f"Start MinerU FastAPI Service: http://{host}:{port}")
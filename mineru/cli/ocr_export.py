@@ -0,0 +1,70 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import os
+import sys
+
+import click
+import yaml
+from loguru import logger
+
+
+@click.command()
+@click.option(
+    '-l',
+    '--lang',
+    'lang_list',
+    multiple=True,
+    help="""
+        OCR language to export, can be repeated. Export all languages in models_config.yml when omitted.
+        On cpu, ch/ch_server/japan/chinese_cht are switched to ch_lite, the same as the pipeline backend.
+        """,
+    default=None,
+)
+@click.option(
+    '-f',
+    '--force',
+    'force',
+    is_flag=True,
+    help="""
+        Re-export even if an up-to-date onnx file already exists.
+        """,
+    default=False,
+)
+def main(lang_list, force):
+    """Export the pytorch OCR det/rec models to ONNX.
+
+    The onnx files are written next to the downloaded .pth weights and are used
+    when MINERU_OCR_BACKEND=onnx is set.
+    """
+    # 导出时使用torch网络，避免初始化OCR模型时加载旧的onnx文件
+    os.environ['MINERU_OCR_BACKEND'] = 'torch'
+    from mineru.model.ocr.paddleocr2pytorch.onnx_export import export_det_onnx, export_rec_onnx
+    from mineru.model.ocr.paddleocr2pytorch.pytorch_paddle import PytorchPaddleOCR, root_dir
+
+    if not lang_list:
+        models_config_path = os.path.join(root_dir, 'pytorchocr', 'utils', 'resources', 'models_config.yml')
+        with open(models_config_path) as file:
+            lang_list = list(yaml.safe_load(file)['lang'].keys())
+
+    exported = set()
+    try:
+        for lang in lang_list:
+            ocr_model = PytorchPaddleOCR(lang=lang)
+            for export_fn, model in (
+                (export_det_onnx, ocr_model.text_detector),
+                (export_rec_onnx, ocr_model.text_recognizer),
+            ):
+                # 不同语言共用同一份det权重，只导出一次
+                if model.weights_path in exported:
+                    continue
+                onnx_path = export_fn(model, force=force)
+                exported.add(model.weights_path)
+                logger.info(f'{lang}: {onnx_path}')
+    except Exception as e:
+        logger.exception(f'An error occurred while exporting onnx models: {str(e)}')
+        sys.exit(1)
+
+    logger.info(f'{len(exported)} onnx models are up to date')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import asyncio
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pypdfium2 as pdfium
+from loguru import logger
+
+
+class TaskStatus:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+
+class QueueFullError(Exception):
+    """排队中的页数超过上限时拒绝提交"""
+
+
+class Task:
+    def __init__(self, pdf_file_names, page_count, parse_kwargs, response_options=None, batch_key=None):
+        self.task_id = str(uuid.uuid4())
+        self.pdf_file_names = pdf_file_names
+        self.page_count = page_count
+        self.parse_kwargs = parse_kwargs
+        # 获取结果时如何组织返回内容，由API层解释
+        self.response_options = response_options or {}
+        # 解析输出，相对路径 -> bytes，任务完成后由worker进程返回
+        self.result = None
+        # batch_key相同的任务可以合并到同一次推理中，None表示不参与合并
+        self.batch_key = batch_key
+        self.status = TaskStatus.QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # 任务结束(完成、失败或取消)时set_result，供协程等待
+        self.done_future = Future()
+
+    def to_dict(self, queue_position=None) -> dict:
+        info = {
+            'task_id': self.task_id,
+            'status': self.status,
+            'file_names': self.pdf_file_names,
+            'page_count': self.page_count,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if queue_position is not None:
+            info['queue_position'] = queue_position
+        if self.error is not None:
+            info['error'] = self.error
+        return info
+
+
+def count_pdf_pages(pdf_bytes_list, start_page_id=0, end_page_id=None) -> int:
+    """按start_page_id/end_page_id裁剪后的总页数，用于排队限流"""
+    total_pages = 0
+    for pdf_bytes in pdf_bytes_list:
+        pdf_doc = pdfium.PdfDocument(pdf_bytes)
+        page_num = len(pdf_doc)
+        pdf_doc.close()
+        last_page_id = page_num - 1 if end_page_id is None or end_page_id < 0 else min(end_page_id, page_num - 1)
+        total_pages += max(0, last_page_id - start_page_id + 1)
+    return total_pages
+
+
+def _run_task(jobs):
+    """在worker进程中执行解析，模型单例在进程内常驻，后续任务直接复用。
+
+    jobs为每个任务的parse_kwargs，多个任务时合并为一次pipeline推理；合并推理出错时逐个任务重新解析，
+    只有自身出错的任务失败，一个任务的损坏文件不会连累同一batch中的其他任务。
+    输出不落盘，返回(results, errors)：results为每个任务的{相对路径: bytes}，
+    路径形如"{pdf_file_name}/{parse_method}/{pdf_file_name}.md"，errors为每个任务的错误信息，成功时为None。
+    """
+    from mineru.cli.common import aio_do_parse, do_parse_pipeline_batch
+
+    results = [{} for _ in jobs]
+    errors = [None] * len(jobs)
+    if len(jobs) == 1:
+        asyncio.run(aio_do_parse(output_dir="", memory_files=results[0], **jobs[0]))
+        return results, errors
+    try:
+        do_parse_pipeline_batch([
+            dict(parse_kwargs, output_dir="", memory_files=memory_files)
+            for parse_kwargs, memory_files in zip(jobs, results)
+        ])
+        return results, errors
+    except Exception as e:
+        logger.warning(f'batch of {len(jobs)} tasks failed, parsing them one by one: {e}')
+
+    for idx, parse_kwargs in enumerate(jobs):
+        # 丢弃合并推理中写出的部分结果
+        results[idx] = {}
+        try:
+            asyncio.run(aio_do_parse(output_dir="", memory_files=results[idx], **parse_kwargs))
+        except Exception as e:
+            logger.exception(e)
+            results[idx] = None
+            errors[idx] = str(e)
+    return results, errors
+
+
+class TaskManager:
+    """API服务的任务队列。
+
+    任务按页数分为两条FIFO队列：页数不超过small_task_pages的小任务和其余的大任务，由常驻的worker进程池执行，
+    每个worker进程持有自己的模型，同时运行的任务数不超过worker数。
+    调度时小任务优先于排队中的大任务；worker数大于1时大任务最多占用workers - 1个worker，
+    始终留出一个worker给小任务，因此正在执行的超大文档不会阻塞小请求。worker数为1时运行中的任务无法让出，
+    小任务只能插队到排队中的大任务之前。
+    两条队列分别按max_queued_pages限制排队页数，超过时拒绝新任务，排队中的大任务不会导致小任务被拒绝。
+    小任务持续到达时，排队中的大任务会一直被推迟。
+    解析结果保存在内存中，已结束的任务保留task_ttl秒后清理。
+
+    batch_key相同的排队任务会被合并为一次推理：队首任务最多等待batch_wait秒，
+    期间到达的同类任务一起下发，总页数不超过batch_max_pages，以便多个小请求共享模型batch。
+    """
+
+    def __init__(
+            self,
+            workers: int = 1,
+            max_queued_pages: int = 1000,
+            task_ttl: int = 3600,
+            batch_wait: float = 0.1,
+            batch_max_pages: int = 384,
+            small_task_pages: int = 20,
+    ):
+        self.workers = max(1, workers)
+        self.max_queued_pages = max_queued_pages
+        self.small_task_pages = small_task_pages
+        self.task_ttl = task_ttl
+        self.batch_wait = batch_wait
+        self.batch_max_pages = batch_max_pages
+        self._dispatch_timer = None
+        # 进程池损坏时done回调可能在submit的调用线程中立即执行，需要可重入锁
+        self._lock = threading.RLock()
+        self._tasks = OrderedDict()
+        # 小任务队列和大任务队列，各自FIFO
+        self._pending_small = deque()
+        self._pending_large = deque()
+        self._queued_small_pages = 0
+        self._queued_large_pages = 0
+        self._running = 0
+        self._running_large = 0
+        self._executor = self._create_executor()
+
+    def _create_executor(self):
+        # spawn避免fork已初始化cuda的进程
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+
+    def submit(self, pdf_file_names, page_count, parse_kwargs, response_options=None, batch_key=None) -> Task:
+        task = Task(pdf_file_names, page_count, parse_kwargs, response_options, batch_key)
+        with self._lock:
+            self._prune_finished_tasks()
+            pending, queued_pages = self._lane(task)
+            # 队列为空时总是接受，否则单个超大文档永远无法提交
+            if pending and queued_pages + page_count > self.max_queued_pages:
+                raise QueueFullError(
+                    f'{queued_pages} pages are queued, '
+                    f'submitting {page_count} more pages exceeds the limit of {self.max_queued_pages}'
+                )
+            self._tasks[task.task_id] = task
+            self._add_pending(task)
+            self._dispatch()
+        logger.info(f'task {task.task_id} queued with {page_count} pages')
+        return task
+
+    def get(self, task_id) -> Task | None:
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def get_status(self, task_id) -> dict | None:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            queue_position = None
+            if task.status == TaskStatus.QUEUED:
+                # 小任务优先调度，大任务排在所有小任务之后
+                if self.is_small_task(task):
+                    queue_position = self._pending_small.index(task)
+                else:
+                    queue_position = len(self._pending_small) + self._pending_large.index(task)
+            return task.to_dict(queue_position)
+
+    def cancel(self, task_id) -> bool:
+        """只能取消仍在排队的任务，正在执行的任务无法中断"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or task.status != TaskStatus.QUEUED:
+                return False
+            self._remove_pending(task)
+            task.status = TaskStatus.CANCELLED
+            task.finished_at = time.time()
+        task.done_future.set_result(task)
+        return True
+
+    async def wait(self, task: Task) -> Task:
+        return await asyncio.wrap_future(task.done_future)
+
+    def remove(self, task_id) -> Task | None:
+        """移除已结束的任务并释放其结果，同步接口返回结果后立即调用"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or task.finished_at is None:
+                return None
+            return self._tasks.pop(task_id)
+
+    def is_small_task(self, task: Task) -> bool:
+        return task.page_count <= self.small_task_pages
+
+    def _lane(self, task: Task):
+        # 调用方需持有self._lock，返回任务所在的队列及其排队页数
+        if self.is_small_task(task):
+            return self._pending_small, self._queued_small_pages
+        return self._pending_large, self._queued_large_pages
+
+    def _add_pending(self, task: Task):
+        if self.is_small_task(task):
+            self._pending_small.append(task)
+            self._queued_small_pages += task.page_count
+        else:
+            self._pending_large.append(task)
+            self._queued_large_pages += task.page_count
+
+    def _remove_pending(self, task: Task):
+        if self.is_small_task(task):
+            self._pending_small.remove(task)
+            self._queued_small_pages -= task.page_count
+        else:
+            self._pending_large.remove(task)
+            self._queued_large_pages -= task.page_count
+
+    def _next_pending(self):
+        """下一个要调度的队列：小任务优先，大任务不能占满所有worker"""
+        if self._pending_small:
+            return self._pending_small
+        if self._pending_large and self._running_large < max(1, self.workers - 1):
+            return self._pending_large
+        return None
+
+    def _collect_batch(self, pending):
+        """从队首开始收集同一队列中可以合并执行的任务，返回(batch, 需要继续等待的秒数)"""
+        head = pending[0]
+        batch = [head]
+        if head.batch_key is None:
+            return batch, 0
+        batch_pages = head.page_count
+        for task in list(pending)[1:]:
+            if task.batch_key == head.batch_key and batch_pages + task.page_count <= self.batch_max_pages:
+                batch.append(task)
+                batch_pages += task.page_count
+        wait_left = head.created_at + self.batch_wait - time.time()
+        if batch_pages >= self.batch_max_pages:
+            wait_left = 0
+        return batch, wait_left
+
+    def _dispatch(self):
+        # 调用方需持有self._lock
+        while self._running < self.workers:
+            pending = self._next_pending()
+            if pending is None:
+                return
+            batch, wait_left = self._collect_batch(pending)
+            if wait_left > 0:
+                # 页数不足一个batch时等待更多请求到达
+                if self._dispatch_timer is None:
+                    self._dispatch_timer = threading.Timer(wait_left, self._on_dispatch_timer)
+                    self._dispatch_timer.daemon = True
+                    self._dispatch_timer.start()
+                return
+            is_large = pending is self._pending_large
+            for task in batch:
+                self._remove_pending(task)
+                task.status = TaskStatus.RUNNING
+                task.started_at = time.time()
+            self._running += 1
+            if is_large:
+                self._running_large += 1
+            if len(batch) > 1:
+                logger.info(f'dispatch {len(batch)} tasks with {sum(task.page_count for task in batch)} pages as one batch')
+            jobs = [task.parse_kwargs for task in batch]
+            try:
+                future = self._submit_jobs(jobs)
+            except Exception as e:
+                # 提交失败时任务已标记为运行中，需要释放worker名额并结束任务，继续调度后续任务
+                self._finish_batch(batch, [None] * len(batch), [str(e)] * len(batch), is_large)
+                self._notify_batch(batch, e)
+                continue
+            future.add_done_callback(lambda f, b=batch, large=is_large: self._on_batch_done(b, f, large))
+
+    def _submit_jobs(self, jobs):
+        # 调用方需持有self._lock
+        try:
+            return self._executor.submit(_run_task, jobs)
+        except BrokenProcessPool:
+            # worker进程异常退出(如oom)后进程池不可用，重建后继续处理
+            logger.warning('worker pool is broken, recreating it')
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create_executor()
+            return self._executor.submit(_run_task, jobs)
+
+    def _on_dispatch_timer(self):
+        with self._lock:
+            self._dispatch_timer = None
+            self._dispatch()
+
+    def _on_batch_done(self, batch, future, is_large=False):
+        error = future.exception()
+        if error is None:
+            results, errors = future.result()
+        else:
+            results, errors = [None] * len(batch), [str(error)] * len(batch)
+        with self._lock:
+            self._finish_batch(batch, results, errors, is_large)
+            self._dispatch()
+        self._notify_batch(batch, error)
+
+    def _finish_batch(self, batch, results, errors, is_large):
+        # 调用方需持有self._lock，释放batch占用的worker并记录每个任务的结果
+        self._running -= 1
+        if is_large:
+            self._running_large -= 1
+        for task, result, task_error in zip(batch, results, errors):
+            task.result = result
+            task.finished_at = time.time()
+            # 输入已不再需要，只保留输出
+            task.parse_kwargs = None
+            if task_error is None:
+                task.status = TaskStatus.DONE
+            else:
+                task.status = TaskStatus.FAILED
+                task.error = task_error
+
+    @staticmethod
+    def _notify_batch(batch, error=None):
+        for task in batch:
+            if task.status == TaskStatus.FAILED:
+                if error is not None:
+                    logger.opt(exception=error).error(f'task {task.task_id} failed')
+                else:
+                    logger.error(f'task {task.task_id} failed: {task.error}')
+            else:
+                logger.info(f'task {task.task_id} finished in {round(task.finished_at - task.started_at, 2)}s')
+            task.done_future.set_result(task)
+
+    def _prune_finished_tasks(self):
+        # 调用方需持有self._lock
+        now = time.time()
+        expired_tasks = [
+            task for task in self._tasks.values()
+            if task.finished_at is not None and now - task.finished_at > self.task_ttl
+        ]
+        for task in expired_tasks:
+            del self._tasks[task.task_id]
+
+    def close(self):
+        with self._lock:
+            if self._dispatch_timer is not None:
+                self._dispatch_timer.cancel()
+                self._dispatch_timer = None
+            pending_tasks = list(self._pending_small) + list(self._pending_large)
+            self._pending_small.clear()
+            self._pending_large.clear()
+            self._queued_small_pages = 0
+            self._queued_large_pages = 0
+        for task in pending_tasks:
+            task.status = TaskStatus.CANCELLED
+            task.done_future.set_result(task)
+        self._executor.shutdown(wait=True, cancel_futures=True)
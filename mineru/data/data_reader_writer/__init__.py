@@ -1,6 +1,7 @@
 from .base import DataReader, DataWriter
 from .dummy import DummyDataWriter
 from .filebase import FileBasedDataReader, FileBasedDataWriter
+from .memory import MemoryDataWriter
 from .multi_bucket_s3 import MultiBucketS3DataReader, MultiBucketS3DataWriter
 from .s3 import S3DataReader, S3DataWriter
 
@@ -9,6 +10,7 @@ __all__ = [
     "DataWriter",
     "FileBasedDataReader",
     "FileBasedDataWriter",
+    "MemoryDataWriter",
     "S3DataReader",
     "S3DataWriter",
     "MultiBucketS3DataReader",
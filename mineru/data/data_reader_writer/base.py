@@ -29,6 +29,20 @@ class DataReader(ABC):
         """
         pass
 
+    def get_size(self, path: str) -> int:
+        """Get the size of the file in bytes, used by range reading.
+
+        Args:
+            path (str): the file path
+
+        Raises:
+            NotImplementedError: the reader does not support range reading.
+
+        Returns:
+            int: the size of the file
+        """
+        raise NotImplementedError
+
 
 class DataWriter(ABC):
     @abstractmethod
@@ -61,3 +75,11 @@ class DataWriter(ABC):
             if flag:
                 self.write(path, bit_data)
                 break
+
+    def flush(self) -> None:
+        """Block until all the writes issued before are finished.
+
+        Writers that write in the background must implement it and raise
+        the error of any failed write, synchronous writers do nothing.
+        """
+        pass
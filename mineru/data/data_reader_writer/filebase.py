@@ -12,6 +12,12 @@ class FileBasedDataReader(DataReader):
         """
         self._parent_dir = parent_dir
 
+    def _get_abs_path(self, path: str) -> str:
+        fn_path = path
+        if not os.path.isabs(fn_path) and len(self._parent_dir) > 0:
+            fn_path = os.path.join(self._parent_dir, path)
+        return fn_path
+
     def read_at(self, path: str, offset: int = 0, limit: int = -1) -> bytes:
         """Read at offset and limit.
 
@@ -23,17 +29,24 @@ class FileBasedDataReader(DataReader):
         Returns:
             bytes: the content of file
         """
-        fn_path = path
-        if not os.path.isabs(fn_path) and len(self._parent_dir) > 0:
-            fn_path = os.path.join(self._parent_dir, path)
-
-        with open(fn_path, 'rb') as f:
+        with open(self._get_abs_path(path), 'rb') as f:
             f.seek(offset)
             if limit == -1:
                 return f.read()
             else:
                 return f.read(limit)
 
+    def get_size(self, path: str) -> int:
+        """Get the size of the file in bytes.
+
+        Args:
+            path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
+
+        Returns:
+            int: the size of the file
+        """
+        return os.path.getsize(self._get_abs_path(path))
+
 
 class FileBasedDataWriter(DataWriter):
     def __init__(self, parent_dir: str = '') -> None:
@@ -60,3 +73,16 @@ class FileBasedDataWriter(DataWriter):
 
         with open(fn_path, 'wb') as f:
             f.write(data)
+
+    def delete(self, path: str) -> None:
+        """Delete file if exists.
+
+        Args:
+            path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
+        """
+        fn_path = path
+        if not os.path.isabs(fn_path) and len(self._parent_dir) > 0:
+            fn_path = os.path.join(self._parent_dir, path)
+
+        if os.path.exists(fn_path):
+            os.remove(fn_path)
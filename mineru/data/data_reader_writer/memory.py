@@ -0,0 +1,38 @@
+import os
+
+from .base import DataWriter
+
+
+class MemoryDataWriter(DataWriter):
+    def __init__(self, parent_dir: str = '', files: dict | None = None) -> None:
+        """Initialized with parent_dir and the dict that holds written files.
+
+        Args:
+            parent_dir (str, optional): the parent directory that may be used within methods. Defaults to ''.
+            files (dict, optional): path -> bytes mapping shared by writers, a new dict is created if not given.
+        """
+        self._parent_dir = parent_dir
+        self.files = files if files is not None else {}
+
+    def _get_path(self, path: str) -> str:
+        fn_path = path
+        if not os.path.isabs(fn_path) and len(self._parent_dir) > 0:
+            fn_path = os.path.join(self._parent_dir, path)
+        return fn_path
+
+    def write(self, path: str, data: bytes) -> None:
+        """Keep the data in memory instead of writing to disk.
+
+        Args:
+            path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
+            data (bytes): the data want to write
+        """
+        self.files[self._get_path(path)] = data
+
+    def delete(self, path: str) -> None:
+        """Delete file if exists.
+
+        Args:
+            path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
+        """
+        self.files.pop(self._get_path(path), None)
@@ -1,4 +1,9 @@
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
 from ..utils.exceptions import InvalidConfig, InvalidParams
 from .base import DataReader, DataWriter
 from ..io.s3 import S3Reader, S3Writer
@@ -85,6 +90,16 @@ class MultiBucketS3DataReader(DataReader, MultiS3Mixin):
             )
         return self._s3_clients_h[bucket_name]
 
+    def __get_s3_client_and_key(self, path: str):
+        if path.startswith('s3://'):
+            bucket_name, path = parse_s3path(path)
+            s3_reader = self.__get_s3_client(bucket_name)
+        else:
+            s3_reader = self.__get_s3_client(self.default_bucket)
+            if self.default_prefix:
+                path = self.default_prefix + '/' + path
+        return s3_reader, path
+
     def read_at(self, path: str, offset: int = 0, limit: int = -1) -> bytes:
         """Read the file with offset and limit, select diffect bucket client
         for each request based on the bucket.
@@ -97,17 +112,44 @@ class MultiBucketS3DataReader(DataReader, MultiS3Mixin):
         Returns:
             bytes: the file content.
         """
-        if path.startswith('s3://'):
-            bucket_name, path = parse_s3path(path)
-            s3_reader = self.__get_s3_client(bucket_name)
-        else:
-            s3_reader = self.__get_s3_client(self.default_bucket)
-            if self.default_prefix:
-                path = self.default_prefix + '/' + path
+        s3_reader, path = self.__get_s3_client_and_key(path)
         return s3_reader.read_at(path, offset, limit)
 
+    def get_size(self, path: str) -> int:
+        """Get the size of the file in bytes, select diffect bucket client
+        for each request based on the bucket.
+
+        Args:
+            path (str): the file path.
+
+        Returns:
+            int: the size of the file.
+        """
+        s3_reader, path = self.__get_s3_client_and_key(remove_non_official_s3_args(path))
+        return s3_reader.get_size(path)
+
 
 class MultiBucketS3DataWriter(DataWriter, MultiS3Mixin):
+    def __init__(self, default_prefix: str, s3_configs: list[S3Config], max_workers: int = 0):
+        """Initialized with multiple s3 configs. With max_workers > 0, writes
+        are uploaded by a bounded thread pool so that they overlap with the
+        caller, and the caller must call flush to wait for them.
+
+        Args:
+            default_prefix (str): the default prefix of the relative path. for example, {some_bucket}/{some_prefix} or {some_bucket}
+            s3_configs (list[S3Config]): list of s3 configs, the bucket_name must be unique in the list.
+            max_workers (int, optional): the number of upload threads. Defaults to 0, which uploads synchronously in write.
+            Callers that flush the writer, such as the pipeline image writer, can pass get_s3_write_workers().
+        """
+        super().__init__(default_prefix, s3_configs)
+        self._max_workers = max(0, max_workers)
+        self._executor = None
+        # 限制排队中的上传数量，避免上传慢于生产时数据堆积在内存中
+        self._slots = threading.BoundedSemaphore(self._max_workers * 4) if self._max_workers > 0 else None
+        self._pending = set()
+        self._errors = []
+        self._lock = threading.Lock()
+
     def __get_s3_client(self, bucket_name: str):
         if bucket_name not in set([conf.bucket_name for conf in self.s3_configs]):
             raise InvalidParams(
@@ -123,12 +165,14 @@ class MultiBucketS3DataWriter(DataWriter, MultiS3Mixin):
                 conf.secret_key,
                 conf.endpoint_url,
                 conf.addressing_style,
+                max_pool_connections=max(10, self._max_workers),
             )
         return self._s3_clients_h[bucket_name]
 
     def write(self, path: str, data: bytes) -> None:
         """Write file with data, also select diffect bucket client for each
-        request based on the bucket.
+        request based on the bucket. The upload runs in the background when
+        max_workers > 0, call flush to wait for it.
 
         Args:
             path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
@@ -141,4 +185,44 @@ class MultiBucketS3DataWriter(DataWriter, MultiS3Mixin):
             s3_writer = self.__get_s3_client(self.default_bucket)
             if self.default_prefix:
                 path = self.default_prefix + '/' + path
-        return s3_writer.write(path, data)
+        if self._max_workers == 0:
+            return s3_writer.write(path, data)
+
+        self._slots.acquire()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='s3_writer')
+            future = self._executor.submit(s3_writer.write, path, data)
+            self._pending.add(future)
+        future.add_done_callback(lambda f, key=path: self._on_write_done(f, key))
+
+    def _on_write_done(self, future, key: str) -> None:
+        self._slots.release()
+        with self._lock:
+            self._pending.discard(future)
+            if future.exception() is not None:
+                logger.error(f'failed to upload {key}: {future.exception()}')
+                self._errors.append(future.exception())
+
+    def flush(self) -> None:
+        """Block until all the uploads issued before are finished, raise the
+        first error if any upload failed since the last flush."""
+        with self._lock:
+            pending = list(self._pending)
+        # 完成回调可能晚于等待返回，直接从future上取错误
+        pending_errors = [future.exception() for future in pending]
+        with self._lock:
+            errors, self._errors = self._errors, []
+        errors += [error for error in pending_errors if error is not None and error not in errors]
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        """Wait for the pending uploads and release the upload threads."""
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                executor, self._executor = self._executor, None
+            if executor is not None:
+                executor.shutdown(wait=True)
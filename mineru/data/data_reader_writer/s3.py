@@ -46,6 +46,7 @@ class S3DataWriter(MultiBucketS3DataWriter):
         sk: str,
         endpoint_url: str,
         addressing_style: str = 'auto',
+        max_workers: int = 0,
     ):
         """s3 writer client.
 
@@ -57,6 +58,8 @@ class S3DataWriter(MultiBucketS3DataWriter):
             endpoint_url (str): endpoint url of s3
             addressing_style (str, optional): Defaults to 'auto'. Other valid options here are 'path' and 'virtual'
             refer to https://boto3.amazonaws.com/v1/documentation/api/1.9.42/guide/s3.html
+            max_workers (int, optional): the number of upload threads. Defaults to 0, which uploads synchronously in write.
+            Callers that flush the writer, such as the pipeline image writer, can pass get_s3_write_workers().
         """
         super().__init__(
             f'{bucket}/{default_prefix_without_bucket}',
@@ -69,4 +72,5 @@ class S3DataWriter(MultiBucketS3DataWriter):
                     addressing_style=addressing_style,
                 )
             ],
+            max_workers=max_workers,
         )
@@ -1,6 +1,7 @@
 
 from .base import IOReader, IOWriter
 from .http import HttpReader, HttpWriter
+from .range_file import RangeReadFile
 from .s3 import S3Reader, S3Writer
 
-__all__ = ['IOReader', 'IOWriter', 'HttpReader', 'HttpWriter', 'S3Reader', 'S3Writer']
\ No newline at end of file
+__all__ = ['IOReader', 'IOWriter', 'HttpReader', 'HttpWriter', 'RangeReadFile', 'S3Reader', 'S3Writer']
\ No newline at end of file
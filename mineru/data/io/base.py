@@ -28,6 +28,20 @@ class IOReader(ABC):
         """
         pass
 
+    def get_size(self, path: str) -> int:
+        """Get the size of the file in bytes, used by range reading.
+
+        Args:
+            path (str): the path of file
+
+        Raises:
+            NotImplementedError: the reader does not support range reading.
+
+        Returns:
+            int: the size of the file
+        """
+        raise NotImplementedError
+
 
 class IOWriter(ABC):
 
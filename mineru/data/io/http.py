@@ -7,6 +7,15 @@ from .base import IOReader, IOWriter
 
 
 class HttpReader(IOReader):
+    def __init__(self, timeout: float = 60):
+        """http reader client, requests share one session so that range reads
+        reuse the keep-alive connection.
+
+        Args:
+            timeout (float, optional): timeout of each request in seconds. Defaults to 60.
+        """
+        self._timeout = timeout
+        self._session = requests.Session()
 
     def read(self, url: str) -> bytes:
         """Read the file.
@@ -17,14 +26,73 @@ class HttpReader(IOReader):
         Returns:
             bytes: the content of the file
         """
-        return requests.get(url).content
+        return self._session.get(url, timeout=self._timeout).content
+
+    def read_at(self, url: str, offset: int = 0, limit: int = -1) -> bytes:
+        """Read at offset and limit with the http Range header.
+
+        Args:
+            url (str): the url of file
+            offset (int, optional): the number of bytes skipped. Defaults to 0.
+            limit (int, optional): the length of bytes want to read. Defaults to -1.
+
+        Returns:
+            bytes: the content of file
+        """
+        if limit > -1:
+            range_header = f'bytes={offset}-{offset+limit-1}'
+        else:
+            range_header = f'bytes={offset}-'
+        response = self._session.get(url, headers={'Range': range_header}, timeout=self._timeout)
+        response.raise_for_status()
+        if response.status_code == 206:
+            return response.content
+        # 服务端不支持Range时返回完整内容，在本地截取
+        if limit > -1:
+            return response.content[offset:offset + limit]
+        return response.content[offset:]
+
+    def get_size(self, url: str) -> int:
+        """Get the size of the file in bytes with a one-byte range request.
 
-    def read_at(self, path: str, offset: int = 0, limit: int = -1) -> bytes:
-        """Not Implemented."""
-        raise NotImplementedError
+        A ranged GET is used instead of HEAD, since some servers (e.g.
+        presigned GET urls) reject HEAD requests.
+
+        Args:
+            url (str): the url of file
+
+        Raises:
+            NotImplementedError: the server does not support range requests,
+                or the request failed.
+
+        Returns:
+            int: the size of the file
+        """
+        try:
+            with self._session.get(
+                url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=self._timeout
+            ) as response:
+                status_code = response.status_code
+                content_range = response.headers.get('Content-Range', '')
+        except requests.RequestException as e:
+            raise NotImplementedError(f'failed to probe the size of {url}: {e}') from e
+        # Content-Range形如"bytes 0-0/12345"，总大小未知时为"*"
+        total = content_range.rpartition('/')[2]
+        if status_code != 206 or not total.isdigit():
+            raise NotImplementedError(f'{url} does not support range requests')
+        return int(total)
 
 
 class HttpWriter(IOWriter):
+    def __init__(self, timeout: float = 60):
+        """http writer client, requests share one keep-alive session.
+
+        Args:
+            timeout (float, optional): timeout of each request in seconds. Defaults to 60.
+        """
+        self._timeout = timeout
+        self._session = requests.Session()
+
     def write(self, url: str, data: bytes) -> None:
         """Write file with data.
 
@@ -33,5 +101,5 @@ class HttpWriter(IOWriter):
             data (bytes): the data want to write
         """
         files = {'file': io.BytesIO(data)}
-        response = requests.post(url, files=files)
+        response = self._session.post(url, files=files, timeout=self._timeout)
         assert 300 > response.status_code and response.status_code > 199
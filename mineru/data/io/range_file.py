@@ -0,0 +1,138 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import io
+import threading
+from collections import OrderedDict
+
+# 每次按范围读取的最小块大小
+DEFAULT_BLOCK_SIZE = 256 * 1024
+# 内存中最多缓存的块数，默认最多占用64MB
+DEFAULT_MAX_CACHED_BLOCKS = 256
+# 顺序读取时预读的最大块数
+MAX_READAHEAD_BLOCKS = 32
+
+
+class RangeReadFile(io.RawIOBase):
+    """
+    基于reader.read_at按块读取的只读文件对象，可以直接传给pypdfium2.PdfDocument，
+    pdfium通过自定义文件访问接口只读取解析用到的字节范围，而不需要先下载完整文件。
+
+    读取按block_size对齐，连续的未缓存块合并为一次read_at请求，最近使用的max_cached_blocks个块缓存在内存中。
+    连续向后读取时（例如pdfium遍历分散在文件中的页面对象）每次请求的预读块数加倍，最多MAX_READAHEAD_BLOCKS块，
+    以减少对象存储上的请求次数。
+    reader可以是DataReader或IOReader，需要实现read_at和get_size。
+    """
+
+    def __init__(self, reader, path: str, size: int = None, block_size: int = DEFAULT_BLOCK_SIZE,
+                 max_cached_blocks: int = DEFAULT_MAX_CACHED_BLOCKS):
+        super().__init__()
+        self._reader = reader
+        self._path = path
+        self._size = reader.get_size(path) if size is None else size
+        self._block_size = block_size
+        self._max_cached_blocks = max(1, max_cached_blocks)
+        self._blocks = OrderedDict()
+        self._pos = 0
+        self._readahead_blocks = 1
+        self._last_fetched_block = -1
+        self._lock = threading.Lock()
+        # 统计实际发起的请求数和下载的字节数
+        self.request_count = 0
+        self.bytes_fetched = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f'invalid whence: {whence}')
+        if pos < 0:
+            raise ValueError(f'negative seek position: {pos}')
+        self._pos = pos
+        return pos
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast('B')
+        end = min(self._pos + len(view), self._size)
+        if end <= self._pos:
+            return 0
+        first_block = self._pos // self._block_size
+        last_block = (end - 1) // self._block_size
+        with self._lock:
+            blocks = self._get_blocks(first_block, last_block)
+
+        written = 0
+        for block_index, block in zip(range(first_block, last_block + 1), blocks):
+            block_start = block_index * self._block_size
+            start = max(self._pos, block_start) - block_start
+            stop = min(end, block_start + len(block)) - block_start
+            view[written:written + stop - start] = block[start:stop]
+            written += stop - start
+        self._pos = end
+        return written
+
+    def close(self):
+        self._blocks.clear()
+        super().close()
+
+    def _get_blocks(self, first_block: int, last_block: int) -> list:
+        blocks = {}
+        missing_start = None
+        for block_index in range(first_block, last_block + 2):
+            block = self._blocks.get(block_index) if block_index <= last_block else None
+            if block is None and block_index <= last_block:
+                if missing_start is None:
+                    missing_start = block_index
+                continue
+            if missing_start is not None:
+                # 连续缺失的块合并为一次请求
+                blocks.update(self._fetch_blocks(missing_start, block_index - 1))
+                missing_start = None
+            if block is not None:
+                # 前面的请求可能已经把命中的块淘汰出缓存，重新放回
+                self._blocks[block_index] = block
+                self._blocks.move_to_end(block_index)
+                blocks[block_index] = block
+        while len(self._blocks) > self._max_cached_blocks:
+            self._blocks.popitem(last=False)
+        return [blocks[block_index] for block_index in range(first_block, last_block + 1)]
+
+    def _fetch_blocks(self, first_block: int, last_block: int) -> dict:
+        if 0 <= first_block - self._last_fetched_block <= self._readahead_blocks:
+            self._readahead_blocks = min(self._readahead_blocks * 2, MAX_READAHEAD_BLOCKS)
+        else:
+            self._readahead_blocks = 1
+        block_count = (self._size + self._block_size - 1) // self._block_size
+        last_block = min(max(last_block, first_block + self._readahead_blocks - 1), block_count - 1)
+        self._last_fetched_block = last_block
+
+        offset = first_block * self._block_size
+        limit = min((last_block + 1) * self._block_size, self._size) - offset
+        data = self._reader.read_at(self._path, offset, limit)
+        if len(data) != limit:
+            raise IOError(f'range read {self._path} [{offset}, {offset + limit}) returned {len(data)} bytes')
+        self.request_count += 1
+        self.bytes_fetched += limit
+
+        blocks = {}
+        for block_index in range(first_block, last_block + 1):
+            block_offset = (block_index - first_block) * self._block_size
+            block = data[block_offset:block_offset + self._block_size]
+            blocks[block_index] = block
+            self._blocks[block_index] = block
+        return blocks
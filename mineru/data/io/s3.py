@@ -1,4 +1,7 @@
+import io
+
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 
 from ..io.base import IOReader, IOWriter
@@ -70,6 +73,18 @@ class S3Reader(IOReader):
             )
         return res['Body'].read()
 
+    def get_size(self, key: str) -> int:
+        """Get the size of the object in bytes.
+
+        Args:
+            key (str): the key of the object
+
+        Returns:
+            int: the size of the object
+        """
+        res = self._s3_client.head_object(Bucket=self._bucket, Key=key)
+        return res['ContentLength']
+
 
 class S3Writer(IOWriter):
     def __init__(
@@ -79,8 +94,10 @@ class S3Writer(IOWriter):
         sk: str,
         endpoint_url: str,
         addressing_style: str = 'auto',
+        max_pool_connections: int = 10,
+        multipart_threshold: int = 8 * 1024 * 1024,
     ):
-        """s3 reader client.
+        """s3 writer client.
 
         Args:
             bucket (str): bucket name
@@ -89,6 +106,10 @@ class S3Writer(IOWriter):
             endpoint_url (str): endpoint url of s3
             addressing_style (str, optional): Defaults to 'auto'. Other valid options here are 'path' and 'virtual'
             refer to https://boto3.amazonaws.com/v1/documentation/api/1.9.42/guide/s3.html
+            max_pool_connections (int, optional): the size of the keep-alive connection pool shared by concurrent
+            uploads. Defaults to 10.
+            multipart_threshold (int, optional): objects not smaller than this size are uploaded with multipart
+            upload. Defaults to 8MB.
         """
         self._bucket = bucket
         self._ak = ak
@@ -101,8 +122,14 @@ class S3Writer(IOWriter):
             config=Config(
                 s3={'addressing_style': addressing_style},
                 retries={'max_attempts': 5, 'mode': 'standard'},
+                max_pool_connections=max_pool_connections,
             ),
         )
+        self._multipart_threshold = multipart_threshold
+        self._transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            max_concurrency=max(1, max_pool_connections // 2),
+        )
 
     def write(self, key: str, data: bytes):
         """Write file with data.
@@ -111,4 +138,7 @@ class S3Writer(IOWriter):
             path (str): the path of file, if the path is relative path, it will be joined with parent_dir.
             data (bytes): the data want to write
         """
-        self._s3_client.put_object(Bucket=self._bucket, Key=key, Body=data)
+        if len(data) >= self._multipart_threshold:
+            self._s3_client.upload_fileobj(io.BytesIO(data), self._bucket, key, Config=self._transfer_config)
+        else:
+            self._s3_client.put_object(Bucket=self._bucket, Key=key, Body=data)
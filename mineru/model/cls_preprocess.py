@@ -0,0 +1,61 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import cv2
+import numpy as np
+
+
+class ClsPreprocessor:
+    """224x224分类模型共用的批量预处理：短边缩放到resize_short后中心裁剪，归一化后写入NCHW float32 batch。
+
+    归一化按通道预先合并为x * alpha + beta(alpha = scale / std, beta = -mean / std)，
+    整个batch只做一次乘加，不再逐图逐通道split/merge。
+    返回的batch复用同一块预分配内存，下一次调用会覆盖上一次的结果。
+    """
+
+    def __init__(
+            self,
+            crop_size: int = 224,
+            resize_short: int = 256,
+            mean=(0.485, 0.456, 0.406),
+            std=(0.229, 0.224, 0.225),
+            scale: float = 0.00392156862745098,
+    ):
+        self.crop_size = crop_size
+        self.resize_short = resize_short
+        self.alpha = np.array([scale / s for s in std], dtype=np.float32).reshape(1, -1, 1, 1)
+        self.beta = np.array([-m / s for m, s in zip(mean, std)], dtype=np.float32).reshape(1, -1, 1, 1)
+        self._crop_buffer = None
+        self._batch_buffer = None
+
+    def _get_buffers(self, batch_size: int):
+        if self._batch_buffer is None or self._batch_buffer.shape[0] < batch_size:
+            channels = self.alpha.shape[1]
+            self._crop_buffer = np.empty((batch_size, self.crop_size, self.crop_size, channels), dtype=np.uint8)
+            self._batch_buffer = np.empty((batch_size, channels, self.crop_size, self.crop_size), dtype=np.float32)
+        return self._crop_buffer[:batch_size], self._batch_buffer[:batch_size]
+
+    def resize_and_crop(self, img: np.ndarray, out: np.ndarray):
+        # 放大图片，使其最短边长为resize_short
+        h, w = img.shape[:2]
+        scale = self.resize_short / min(h, w)
+        h_resize = round(h * scale)
+        w_resize = round(w * scale)
+        img = cv2.resize(img, (w_resize, h_resize), interpolation=cv2.INTER_LINEAR)
+        # 中心裁剪为crop_size*crop_size的正方形
+        h, w = img.shape[:2]
+        cw = ch = self.crop_size
+        if w < cw or h < ch:
+            raise ValueError(
+                f"Input image ({w}, {h}) smaller than the target size ({cw}, {ch})."
+            )
+        x1 = (w - cw) // 2
+        y1 = (h - ch) // 2
+        out[...] = img[y1:y1 + ch, x1:x1 + cw, ...]
+
+    def __call__(self, imgs) -> np.ndarray:
+        crops, batch = self._get_buffers(len(imgs))
+        for i, img in enumerate(imgs):
+            self.resize_and_crop(np.asarray(img), crops[i])
+        # HWC uint8 -> CHW float32，并完成归一化
+        np.multiply(crops.transpose(0, 3, 1, 2), self.alpha, out=batch)
+        batch += self.beta
+        return batch
@@ -1,7 +1,65 @@
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import torch
 from torch.utils.data import DataLoader, Dataset
 from tqdm import tqdm
 
+from mineru.model.quantization import quantize_dynamic_int8
+from mineru.utils.config_reader import get_quantize_enable
+
+
+def get_mfr_continuous_batching_enable() -> bool:
+    """MINERU_MFR_CONTINUOUS_BATCHING=false时回退到按batch整体generate"""
+    return os.getenv('MINERU_MFR_CONTINUOUS_BATCHING', 'true').lower() == 'true'
+
+
+def get_mfr_preprocess_workers() -> int:
+    workers_env = os.getenv('MINERU_MFR_PREPROCESS_WORKERS')
+    if workers_env:
+        return max(int(workers_env), 0)
+    return min(4, os.cpu_count() or 1)
+
+
+def estimate_formula_token_lengths(images: list) -> list:
+    """
+    根据公式图片的尺寸预估解码长度。
+
+    以所有公式高度的中位数近似单行公式的行高，单行公式的长度与宽高比成正比，
+    多行公式再乘以行数。
+    """
+    if not images:
+        return []
+    line_height = max(float(np.median([img.shape[0] for img in images])), 1.0)
+    return [img.shape[1] * max(img.shape[0], line_height) / line_height ** 2 for img in images]
+
+
+def iter_preprocessed_images(images: list, transform, num_workers: int = None):
+    """
+    按顺序产出transform后的图片。
+
+    预处理(裁边、缩放、归一化)由线程池并行执行，最多提前处理num_workers*8张，
+    避免公式较多时一次性占用大量内存。num_workers为0时在当前线程串行处理。
+    """
+    num_workers = get_mfr_preprocess_workers() if num_workers is None else num_workers
+    if num_workers <= 0:
+        for image in images:
+            yield transform(image)
+        return
+
+    prefetch = num_workers * 8
+    image_iter = iter(images)
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = deque(executor.submit(transform, image) for image in itertools.islice(image_iter, prefetch))
+        while futures:
+            result = futures.popleft().result()
+            for image in itertools.islice(image_iter, 1):
+                futures.append(executor.submit(transform, image))
+            yield result
+
 
 class MathDataset(Dataset):
     def __init__(self, image_paths, transform=None):
@@ -29,6 +87,9 @@ class UnimernetModel(object):
         self.model.to(_device_)
         if not _device_.startswith("cpu"):
             self.model = self.model.to(dtype=torch.float16)
+        elif get_quantize_enable(_device_):
+            # 自回归解码是cpu上公式识别的主要耗时，对decoder做int8动态量化
+            self.model.decoder = quantize_dynamic_int8(self.model.decoder)
         self.model.eval()
 
     def predict(self, mfd_res, image):
@@ -65,7 +126,6 @@ class UnimernetModel(object):
         images_formula_list = []
         mf_image_list = []
         backfill_list = []
-        image_info = []  # Store (area, original_index, image) tuples
 
         # Collect images with their original indices
         for image_index in range(len(images_mfd_res)):
@@ -85,52 +145,41 @@ class UnimernetModel(object):
                 }
                 formula_list.append(new_item)
                 bbox_img = image[ymin:ymax, xmin:xmax]
-                area = (xmax - xmin) * (ymax - ymin)
-
-                curr_idx = len(mf_image_list)
-                image_info.append((area, curr_idx, bbox_img))
                 mf_image_list.append(bbox_img)
 
             images_formula_list.append(formula_list)
             backfill_list += formula_list
 
-        # Stable sort by area
-        image_info.sort(key=lambda x: x[0])  # sort by area
-        sorted_indices = [x[1] for x in image_info]
-        sorted_images = [x[2] for x in image_info]
-
-        # Create mapping for results
-        index_mapping = {new_idx: old_idx for new_idx, old_idx in enumerate(sorted_indices)}
-
-        # Create dataset with sorted images
-        dataset = MathDataset(sorted_images, transform=self.model.transform)
-
-        # 如果batch_size > len(sorted_images)，则设置为不超过len(sorted_images)的2的幂
-        batch_size = min(batch_size, max(1, 2 ** (len(sorted_images).bit_length() - 1))) if sorted_images else 1
-
-        dataloader = DataLoader(dataset, batch_size=batch_size, num_workers=0)
-
-        # Process batches and store results
-        mfr_res = []
-        # for mf_img in dataloader:
-
-        with tqdm(total=len(sorted_images), desc="MFR Predict") as pbar:
-            for index, mf_img in enumerate(dataloader):
-                mf_img = mf_img.to(dtype=self.model.dtype)
-                mf_img = mf_img.to(self.device)
-                with torch.no_grad():
-                    output = self.model.generate({"image": mf_img}, batch_size=batch_size)
-                mfr_res.extend(output["fixed_str"])
-
-                # 更新进度条，每次增加batch_size，但要注意最后一个batch可能不足batch_size
-                current_batch_size = min(batch_size, len(sorted_images) - index * batch_size)
-                pbar.update(current_batch_size)
+        # 按预估的token长度排序，长度相近的公式放在一起
+        predicted_lengths = estimate_formula_token_lengths(mf_image_list)
+        # 如果batch_size > len(mf_image_list)，则设置为不超过len(mf_image_list)的2的幂
+        batch_size = min(batch_size, max(1, 2 ** (len(mf_image_list).bit_length() - 1))) if mf_image_list else 1
+
+        continuous_batching = get_mfr_continuous_batching_enable() and self.model.can_continuous_generate()
+        # 连续批处理时先解码长公式，避免最后只剩少量长公式拖慢整体；整批generate时按长度升序组batch
+        sorted_indices = sorted(range(len(mf_image_list)), key=lambda i: predicted_lengths[i], reverse=continuous_batching)
+        sorted_images = iter_preprocessed_images([mf_image_list[i] for i in sorted_indices], self.model.transform)
+
+        with tqdm(total=len(mf_image_list), desc="MFR Predict") as pbar:
+            if continuous_batching:
+                mfr_res = self.model.continuous_generate(sorted_images, batch_size=batch_size, progress_callback=pbar.update)
+            else:
+                mfr_res = []
+                while True:
+                    batch_images = list(itertools.islice(sorted_images, batch_size))
+                    if not batch_images:
+                        break
+                    mf_img = torch.stack(batch_images).to(dtype=self.model.dtype)
+                    mf_img = mf_img.to(self.device)
+                    with torch.no_grad():
+                        output = self.model.generate({"image": mf_img}, batch_size=batch_size)
+                    mfr_res.extend(output["fixed_str"])
+                    pbar.update(len(batch_images))
 
         # Restore original order
         unsorted_results = [""] * len(mfr_res)
         for new_idx, latex in enumerate(mfr_res):
-            original_idx = index_mapping[new_idx]
-            unsorted_results[original_idx] = latex
+            unsorted_results[sorted_indices[new_idx]] = latex
 
         # Fill results back
         for res, latex in zip(backfill_list, unsorted_results):
@@ -1,3 +1,4 @@
+import itertools
 import os
 import re
 import warnings
@@ -382,6 +383,93 @@ def latex_rm_whitespace(s: str):
     return s
 
 
+class _ContinuousBatch:
+    """continuous_generate中正在解码的序列，kv cache左侧padding对齐到当前最长的序列"""
+
+    def __init__(self):
+        self.row_ids = []
+        self.past_key_values = None
+        self.encoder_hidden_states = None
+        self.attention_mask = None
+        self.position_ids = None
+        self.next_tokens = None
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def add(self, row_ids, past_key_values, encoder_hidden_states, next_tokens):
+        """加入只输入了bos的新序列，past_key_values中self-attention的长度为1"""
+        new_size = len(row_ids)
+        device = next_tokens.device
+        position_ids = torch.ones(new_size, dtype=torch.long, device=device)
+        if len(self) == 0:
+            self.past_key_values = tuple(tuple(layer_past) for layer_past in past_key_values)
+            self.encoder_hidden_states = encoder_hidden_states
+            self.attention_mask = torch.ones((new_size, 1), dtype=torch.long, device=device)
+            self.position_ids = position_ids
+            self.next_tokens = next_tokens
+            self.row_ids = list(row_ids)
+            return
+
+        pad_len = self.attention_mask.shape[1] - 1
+        merged_past_key_values = []
+        for layer_past, new_layer_past in zip(self.past_key_values, past_key_values):
+            self_k, self_v, cross_k, cross_v = layer_past
+            new_self_k, new_self_v, new_cross_k, new_cross_v = new_layer_past
+            merged_past_key_values.append((
+                torch.cat([self_k, self._left_pad(new_self_k, pad_len)], dim=0),
+                torch.cat([self_v, self._left_pad(new_self_v, pad_len)], dim=0),
+                torch.cat([cross_k, new_cross_k], dim=0),
+                torch.cat([cross_v, new_cross_v], dim=0),
+            ))
+        self.past_key_values = tuple(merged_past_key_values)
+        self.encoder_hidden_states = torch.cat([self.encoder_hidden_states, encoder_hidden_states], dim=0)
+        new_attention_mask = torch.cat([
+            self.attention_mask.new_zeros((new_size, pad_len)),
+            self.attention_mask.new_ones((new_size, 1)),
+        ], dim=1)
+        self.attention_mask = torch.cat([self.attention_mask, new_attention_mask], dim=0)
+        self.position_ids = torch.cat([self.position_ids, position_ids], dim=0)
+        self.next_tokens = torch.cat([self.next_tokens, next_tokens], dim=0)
+        self.row_ids.extend(row_ids)
+
+    @staticmethod
+    def _left_pad(states, pad_len):
+        if pad_len == 0:
+            return states
+        padding = states.new_zeros(states.shape[:2] + (pad_len,) + states.shape[3:])
+        return torch.cat([padding, states], dim=2)
+
+    def step(self, past_key_values, attention_mask, next_tokens):
+        self.past_key_values = tuple(tuple(layer_past) for layer_past in past_key_values)
+        self.attention_mask = attention_mask
+        self.position_ids = self.position_ids + 1
+        self.next_tokens = next_tokens
+
+    def keep(self, indices):
+        """只保留indices对应的序列，并裁掉所有序列都是padding的左侧kv cache"""
+        if len(indices) == 0:
+            self.__init__()
+            return
+        index = torch.tensor(indices, dtype=torch.long, device=self.next_tokens.device)
+        attention_mask = self.attention_mask.index_select(0, index)
+        start = int(attention_mask.any(dim=0).nonzero()[0])
+        self.past_key_values = tuple(
+            (
+                self_k.index_select(0, index)[:, :, start:],
+                self_v.index_select(0, index)[:, :, start:],
+                cross_k.index_select(0, index),
+                cross_v.index_select(0, index),
+            )
+            for self_k, self_v, cross_k, cross_v in self.past_key_values
+        )
+        self.encoder_hidden_states = self.encoder_hidden_states.index_select(0, index)
+        self.attention_mask = attention_mask[:, start:]
+        self.position_ids = self.position_ids.index_select(0, index)
+        self.next_tokens = self.next_tokens.index_select(0, index)
+        self.row_ids = [self.row_ids[i] for i in indices]
+
+
 class UnimernetModel(VisionEncoderDecoderModel):
     def __init__(
         self,
@@ -468,6 +556,133 @@ class UnimernetModel(VisionEncoderDecoderModel):
         ).loss
         return {"loss": loss}
 
+    def get_max_new_tokens(self, batch_size):
+        if self.tokenizer.tokenizer.model_max_length > 1152:
+            if batch_size <= 32:
+                self.tokenizer.tokenizer.model_max_length = 1152  # 6g
+            else:
+                self.tokenizer.tokenizer.model_max_length = 1344  # 8g
+        return self.tokenizer.tokenizer.model_max_length
+
+    def can_continuous_generate(self) -> bool:
+        """generation_config中没有束搜索、重复惩罚等需要generate处理的设置时，才能使用continuous_generate的贪心解码"""
+        gen_config = self.generation_config
+        return (
+            (gen_config.num_beams or 1) == 1
+            and not gen_config.do_sample
+            and (gen_config.repetition_penalty or 1.0) == 1.0
+            and not gen_config.no_repeat_ngram_size
+            and not gen_config.bad_words_ids
+            and not gen_config.suppress_tokens
+            and not gen_config.begin_suppress_tokens
+            and (gen_config.min_length or 0) <= 1
+            and not gen_config.min_new_tokens
+        )
+
+    def encode_images(self, pixel_values):
+        num_channels = pixel_values.shape[1]
+        if num_channels == 1:
+            pixel_values = pixel_values.repeat(1, 3, 1, 1)
+        encoder_hidden_states = self.encoder(pixel_values=pixel_values)[0]
+        if (
+            self.encoder.config.hidden_size != self.decoder.config.hidden_size
+            and self.decoder.config.cross_attention_hidden_size is None
+        ):
+            encoder_hidden_states = self.enc_to_dec_proj(encoder_hidden_states)
+        return encoder_hidden_states
+
+    @torch.no_grad()
+    def continuous_generate(self, images, batch_size=64, progress_callback=None):
+        """
+        连续批处理的贪心解码。
+
+        images按顺序产出预处理后的单张图片(C,H,W)。batch中的序列生成eos后立即移出batch，
+        空位由后续图片补上，不再等待batch中最长的公式生成结束；kv cache按当前batch中最长的序列裁剪。
+        batch中各序列长度不同，左侧padding对齐，通过attention_mask和position_ids区分。
+        返回与images顺序一致的fixed_str列表。
+        """
+        max_new_tokens = self.get_max_new_tokens(batch_size)
+        eos_token_id = self.generation_config.eos_token_id
+        if eos_token_id is None:
+            eos_token_id = self.tokenizer.eos_token_id
+        eos_token_ids = set(eos_token_id) if isinstance(eos_token_id, (list, tuple)) else {eos_token_id}
+        # 空位达到batch的1/4时才补充新图片，避免频繁地以很小的batch调用encoder
+        refill_size = max(1, batch_size // 4)
+
+        decoder = self.decoder.model.decoder
+        lm_head = self.decoder.lm_head
+        image_iter = iter(images)
+        exhausted = False
+        pred_tokens = []
+        batch = _ContinuousBatch()
+
+        while True:
+            free_size = batch_size - len(batch)
+            if not exhausted and (free_size >= refill_size or len(batch) == 0):
+                new_images = list(itertools.islice(image_iter, free_size))
+                exhausted = len(new_images) < free_size
+                if new_images:
+                    pixel_values = torch.stack(new_images).to(device=self.device, dtype=self.dtype)
+                    encoder_hidden_states = self.encode_images(pixel_values)
+                    input_ids = torch.full(
+                        (len(new_images), 1), self.tokenizer.bos_token_id, dtype=torch.long, device=self.device
+                    )
+                    outputs = decoder(
+                        input_ids=input_ids,
+                        encoder_hidden_states=encoder_hidden_states,
+                        use_cache=True,
+                        return_dict=True,
+                    )
+                    next_tokens = lm_head(outputs.last_hidden_state[:, -1]).argmax(-1)
+                    row_ids = list(range(len(pred_tokens), len(pred_tokens) + len(new_images)))
+                    pred_tokens.extend([] for _ in new_images)
+                    start = len(batch)
+                    batch.add(row_ids, outputs.past_key_values, encoder_hidden_states, next_tokens)
+                    # batch中原有序列的next_tokens在上一步解码后已经处理过，只检查新加入的序列
+                    self._evict_finished(batch, pred_tokens, eos_token_ids, max_new_tokens, progress_callback, start)
+            if len(batch) == 0:
+                if exhausted:
+                    break
+                continue
+
+            attention_mask = torch.cat([batch.attention_mask, batch.attention_mask.new_ones((len(batch), 1))], dim=1)
+            outputs = decoder(
+                input_ids=batch.next_tokens[:, None],
+                attention_mask=attention_mask,
+                encoder_hidden_states=batch.encoder_hidden_states,
+                past_key_values=batch.past_key_values,
+                use_cache=True,
+                position_ids=batch.position_ids[:, None],
+                return_dict=True,
+            )
+            batch.step(
+                outputs.past_key_values,
+                attention_mask,
+                lm_head(outputs.last_hidden_state[:, -1]).argmax(-1),
+            )
+            self._evict_finished(batch, pred_tokens, eos_token_ids, max_new_tokens, progress_callback)
+
+        pred_str = self.tokenizer.token2str(pred_tokens)
+        return [latex_rm_whitespace(s) for s in pred_str]
+
+    @staticmethod
+    def _evict_finished(batch, pred_tokens, eos_token_ids, max_new_tokens, progress_callback, start=0):
+        """记录batch中从start开始的序列新生成的token，生成eos或达到最大长度的序列移出batch"""
+        keep = list(range(start))
+        next_tokens = batch.next_tokens.tolist()
+        for index in range(start, len(batch)):
+            row_id, token = batch.row_ids[index], next_tokens[index]
+            if token in eos_token_ids:
+                continue
+            pred_tokens[row_id].append(token)
+            if len(pred_tokens[row_id]) < max_new_tokens:
+                keep.append(index)
+        finished = len(batch) - len(keep)
+        if finished > 0:
+            batch.keep(keep)
+            if progress_callback is not None:
+                progress_callback(finished)
+
     def generate(self, samples, do_sample: bool = False, temperature: float = 0.2, top_p: float = 0.95, batch_size=64):
         pixel_values = samples["image"]
         num_channels = pixel_values.shape[1]
@@ -479,15 +694,9 @@ class UnimernetModel(VisionEncoderDecoderModel):
             kwargs["temperature"] = temperature
             kwargs["top_p"] = top_p
 
-        if self.tokenizer.tokenizer.model_max_length > 1152:
-            if batch_size <= 32:
-                self.tokenizer.tokenizer.model_max_length = 1152  # 6g
-            else:
-                self.tokenizer.tokenizer.model_max_length = 1344  # 8g
-
         outputs = super().generate(
             pixel_values=pixel_values,
-            max_new_tokens=self.tokenizer.tokenizer.model_max_length, # required
+            max_new_tokens=self.get_max_new_tokens(batch_size), # required
             decoder_start_token_id=self.tokenizer.tokenizer.bos_token_id,
             do_sample=do_sample,
             **kwargs,
@@ -152,9 +152,13 @@ class UnimerMBartLearnedPositionalEmbedding(nn.Embedding):
         self.offset = 2
         super().__init__(num_embeddings + self.offset, embedding_dim)
 
-    def forward(self, input_ids: torch.Tensor, past_key_values_length: int = 0):
+    def forward(self, input_ids: torch.Tensor, past_key_values_length: int = 0, position_ids: Optional[torch.LongTensor] = None):
         """`input_ids' shape is expected to be [bsz x seqlen]."""
 
+        if position_ids is not None:
+            # 连续批处理时batch内每条序列的位置各不相同
+            return super().forward(position_ids.to(self.weight.device) + self.offset)
+
         bsz, seq_len = input_ids.shape[:2]
         positions = torch.arange(
             past_key_values_length, past_key_values_length + seq_len, dtype=torch.long, device=self.weight.device
@@ -1329,6 +1333,7 @@ class UnimerMBartDecoder(UnimerMBartPreTrainedModel):
         output_attentions: Optional[bool] = None,
         output_hidden_states: Optional[bool] = None,
         return_dict: Optional[bool] = None,
+        position_ids: Optional[torch.LongTensor] = None,
     ) -> Union[Tuple, BaseModelOutputWithPastAndCrossAttentions]:
         r"""
         Args:
@@ -1347,6 +1352,9 @@ class UnimerMBartDecoder(UnimerMBartPreTrainedModel):
                 - 0 for tokens that are **masked**.
 
                 [What are attention masks?](../glossary#attention-mask)
+            position_ids (`torch.LongTensor` of shape `(batch_size, sequence_length)`, *optional*):
+                Position of each input token. Defaults to consecutive positions starting at the past key values length,
+                continuous batching passes it explicitly since the sequences in a batch have different lengths.
             encoder_hidden_states (`torch.FloatTensor` of shape `(batch_size, encoder_sequence_length, hidden_size)`, *optional*):
                 Sequence of hidden-states at the output of the last layer of the encoder. Used in the cross-attention
                 of the decoder.
@@ -1463,7 +1471,7 @@ class UnimerMBartDecoder(UnimerMBartPreTrainedModel):
                 )
 
         # embed positions
-        positions = self.embed_positions(input, past_key_values_length)
+        positions = self.embed_positions(input, past_key_values_length, position_ids)
 
         hidden_states = inputs_embeds + positions.to(inputs_embeds.device)
 
@@ -0,0 +1,129 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import os
+import threading
+from pathlib import Path
+
+import torch
+from loguru import logger
+
+from mineru.model.onnx_session import create_onnx_session
+
+# det导出时的示例输入，batch、高、宽均为动态维度
+DET_DUMMY_SHAPE = (1, 3, 640, 640)
+DET_DYNAMIC_AXES = {'x': {0: 'batch', 2: 'height', 3: 'width'}, 'maps': {0: 'batch', 2: 'height', 3: 'width'}}
+# rec/cls的输入高度固定，batch和宽度为动态维度
+REC_DYNAMIC_AXES = {'x': {0: 'batch', 3: 'width'}, 'preds': {0: 'batch', 1: 'length'}}
+CLS_DYNAMIC_AXES = {'x': {0: 'batch', 3: 'width'}, 'probs': {0: 'batch'}}
+
+# 导出后的onnx session按(onnx路径, 设备)共享
+_onnx_session_cache = {}
+_onnx_session_lock = threading.Lock()
+
+
+def get_onnx_path(weights_path: str) -> str:
+    """onnx文件与下载的pth权重放在同一目录，仅后缀不同"""
+    return str(Path(weights_path).with_suffix('.onnx'))
+
+
+def is_onnx_outdated(weights_path: str) -> bool:
+    onnx_path = get_onnx_path(weights_path)
+    if not os.path.exists(onnx_path):
+        return True
+    # 权重更新后重新导出
+    return os.path.getmtime(onnx_path) < os.path.getmtime(weights_path)
+
+
+class _DetExportWrapper(torch.nn.Module):
+    """DB系列检测网络输出dict，导出时只保留概率图maps"""
+
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+
+    def forward(self, x):
+        return self.net(x)['maps']
+
+
+class _RecExportWrapper(torch.nn.Module):
+    """多头识别网络输出list时，与CTCLabelDecode一致只保留最后一个输出"""
+
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+
+    def forward(self, x):
+        out = self.net(x)
+        if isinstance(out, (list, tuple)):
+            out = out[-1]
+        return out
+
+
+def _export(module, dummy_input, onnx_path, output_name, dynamic_axes):
+    # 先写临时文件再改名，避免多进程同时导出时读到不完整的文件
+    tmp_path = f'{onnx_path}.{os.getpid()}.tmp'
+    module.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            module,
+            dummy_input,
+            tmp_path,
+            input_names=['x'],
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            do_constant_folding=True,
+            # 新版本torch默认使用dynamo导出，依赖onnxscript且不支持dynamic_axes
+            dynamo=False,
+        )
+    os.replace(tmp_path, onnx_path)
+    logger.info(f'onnx model exported to {onnx_path}')
+    return onnx_path
+
+
+def export_det_onnx(text_detector, force=False) -> str:
+    onnx_path = get_onnx_path(text_detector.weights_path)
+    if not force and not is_onnx_outdated(text_detector.weights_path):
+        return onnx_path
+    dummy_input = torch.zeros(DET_DUMMY_SHAPE, dtype=torch.float32, device=text_detector.device)
+    return _export(_DetExportWrapper(text_detector.net), dummy_input, onnx_path, 'maps', DET_DYNAMIC_AXES)
+
+
+def export_rec_onnx(text_recognizer, force=False) -> str:
+    onnx_path = get_onnx_path(text_recognizer.weights_path)
+    if not force and not is_onnx_outdated(text_recognizer.weights_path):
+        return onnx_path
+    img_c, img_h, img_w = text_recognizer.rec_image_shape
+    dummy_input = torch.zeros((1, img_c, img_h, img_w), dtype=torch.float32, device=text_recognizer.device)
+    return _export(_RecExportWrapper(text_recognizer.net), dummy_input, onnx_path, 'preds', REC_DYNAMIC_AXES)
+
+
+def export_cls_onnx(text_classifier, force=False) -> str:
+    onnx_path = get_onnx_path(text_classifier.weights_path)
+    if not force and not is_onnx_outdated(text_classifier.weights_path):
+        return onnx_path
+    img_c, img_h, img_w = text_classifier.cls_image_shape
+    dummy_input = torch.zeros((1, img_c, img_h, img_w), dtype=torch.float32, device=text_classifier.device)
+    return _export(text_classifier.net, dummy_input, onnx_path, 'probs', CLS_DYNAMIC_AXES)
+
+
+def get_ocr_onnx_session(name, export_fn, model):
+    """
+    返回model对应的onnx session，onnx文件不存在或已过期时先调用export_fn导出。
+
+    导出或加载失败时返回None，调用方继续使用torch推理。
+    """
+    onnx_path = get_onnx_path(model.weights_path)
+    session_key = (onnx_path, str(model.device))
+    with _onnx_session_lock:
+        if session_key not in _onnx_session_cache:
+            try:
+                export_fn(model)
+                _onnx_session_cache[session_key] = create_onnx_session(
+                    onnx_path,
+                    name=f'{name}_{Path(onnx_path).stem}',
+                    use_cuda=str(model.device).startswith('cuda'),
+                )
+            except Exception as e:
+                logger.warning(f'failed to load onnx {name} model from {onnx_path}: {e}, fallback to torch')
+                _onnx_session_cache[session_key] = None
+        return _onnx_session_cache[session_key]
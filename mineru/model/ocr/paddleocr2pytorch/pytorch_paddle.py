@@ -11,6 +11,7 @@ from loguru import logger
 
 from mineru.utils.config_reader import get_device
 from mineru.utils.enum_class import ModelPath
+from mineru.utils.model_utils import get_vram
 from mineru.utils.models_download_utils import auto_download_and_get_model_root_path
 from ....utils.ocr_utils import check_img, preprocess_image, sorted_boxes, merge_det_boxes, update_det_boxes, get_rotate_crop_image
 from .tools.infer.predict_system import TextSystem
@@ -49,6 +50,23 @@ def get_model_params(lang, config):
 
 root_dir = Path(__file__).resolve().parent
 
+# rec每个batch padding后的像素预算基数，相当于16条48x320的文本行
+OCR_REC_BASE_BATCH_PIXELS = 16 * 48 * 320
+
+
+def get_rec_batch_pixels(device) -> int:
+    """MINERU_OCR_REC_BATCH_PIXELS优先，否则cpu使用基数，gpu/npu按显存每4GB放大一倍，最多8倍"""
+    batch_pixels_env = os.getenv('MINERU_OCR_REC_BATCH_PIXELS')
+    if batch_pixels_env:
+        return int(batch_pixels_env)
+    scale = 1
+    if str(device).startswith('npu') or str(device).startswith('cuda'):
+        vram = get_vram(device)
+        if vram is not None:
+            gpu_memory = int(os.getenv('MINERU_VIRTUAL_VRAM_SIZE', round(vram)))
+            scale = min(max(gpu_memory // 4, 1), 8)
+    return OCR_REC_BASE_BATCH_PIXELS * scale
+
 
 class PytorchPaddleOCR(TextSystem):
     def __init__(self, *args, **kwargs):
@@ -90,6 +108,7 @@ class PytorchPaddleOCR(TextSystem):
         kwargs['rec_model_path'] = rec_model_path
         kwargs['rec_char_dict_path'] = os.path.join(root_dir, 'pytorchocr', 'utils', 'resources', 'dict', dict_file)
         kwargs['rec_batch_num'] = 8
+        kwargs['rec_batch_pixels'] = get_rec_batch_pixels(device)
 
         kwargs['device'] = device
 
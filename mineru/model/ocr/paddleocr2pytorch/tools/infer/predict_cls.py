@@ -4,6 +4,8 @@ import numpy as np
 import math
 import time
 import torch
+from mineru.utils.config_reader import get_ocr_onnx_enable
+from ...onnx_export import export_cls_onnx, get_ocr_onnx_session
 from ...pytorchocr.base_ocr_v20 import BaseOCRV20
 from . import pytorchocr_utility as utility
 from ...pytorchocr.postprocess import build_post_process
@@ -35,6 +37,10 @@ class TextClassifier(BaseOCRV20):
         self.net.eval()
         self.net.to(self.device)
 
+        self.onnx_sess = None
+        if get_ocr_onnx_enable():
+            self.onnx_sess = get_ocr_onnx_session('ocr_cls', export_cls_onnx, self)
+
     def resize_norm_img(self, img):
         imgC, imgH, imgW = self.cls_image_shape
         h = img.shape[0]
@@ -89,11 +95,14 @@ class TextClassifier(BaseOCRV20):
             norm_img_batch = norm_img_batch.copy()
             starttime = time.time()
 
-            with torch.no_grad():
-                inp = torch.from_numpy(norm_img_batch)
-                inp = inp.to(self.device)
-                prob_out = self.net(inp)
-            prob_out = prob_out.cpu().numpy()
+            if self.onnx_sess is not None:
+                (prob_out,) = self.onnx_sess.run(None, {'x': norm_img_batch})
+            else:
+                with torch.no_grad():
+                    inp = torch.from_numpy(norm_img_batch)
+                    inp = inp.to(self.device)
+                    prob_out = self.net(inp)
+                prob_out = prob_out.cpu().numpy()
 
             cls_result = self.postprocess_op(prob_out)
             elapse += time.time() - starttime
@@ -1,13 +1,22 @@
 import sys
+import threading
+from collections import defaultdict
 
 import numpy as np
 import time
 import torch
+from tqdm import tqdm
+from mineru.utils.config_reader import get_ocr_onnx_enable
+from ...onnx_export import export_det_onnx, get_ocr_onnx_session
 from ...pytorchocr.base_ocr_v20 import BaseOCRV20
 from . import pytorchocr_utility as utility
 from ...pytorchocr.data import create_operators, transform
 from ...pytorchocr.postprocess import build_post_process
 
+# 检测网络只与权重和设备有关，不同语言、不同后处理阈值的TextDetector共享同一份网络
+_det_net_cache = {}
+_det_net_lock = threading.Lock()
+
 
 class TextDetector(BaseOCRV20):
     def __init__(self, args, **kwargs):
@@ -111,11 +120,31 @@ class TextDetector(BaseOCRV20):
 
         self.weights_path = args.det_model_path
         self.yaml_path = args.det_yaml_path
-        network_config = utility.get_arch_config(self.weights_path)
-        super(TextDetector, self).__init__(network_config, **kwargs)
-        self.load_pytorch_weights(self.weights_path)
-        self.net.eval()
-        self.net.to(self.device)
+        net_key = (self.weights_path, str(self.device))
+        with _det_net_lock:
+            if net_key in _det_net_cache:
+                self.config, self.net = _det_net_cache[net_key]
+            else:
+                network_config = utility.get_arch_config(self.weights_path)
+                super(TextDetector, self).__init__(network_config, **kwargs)
+                self.load_pytorch_weights(self.weights_path)
+                self.net.eval()
+                self.net.to(self.device)
+                _det_net_cache[net_key] = (self.config, self.net)
+
+        self.onnx_sess = None
+        if get_ocr_onnx_enable() and self.det_algorithm in ['DB', 'PSE', 'DB++']:
+            self.onnx_sess = get_ocr_onnx_session('ocr_det', export_det_onnx, self)
+
+    def forward_net(self, batch):
+        """onnx session可用时使用onnxruntime推理，输出的概率图转为tensor，与torch网络的输出格式保持一致"""
+        if self.onnx_sess is not None:
+            (maps,) = self.onnx_sess.run(None, {'x': batch})
+            return {'maps': torch.from_numpy(maps)}
+        with torch.no_grad():
+            inp = torch.from_numpy(batch)
+            inp = inp.to(self.device)
+            return self.net(inp)
 
     def _batch_process_same_size(self, img_list):
         """
@@ -162,10 +191,7 @@ class TextDetector(BaseOCRV20):
             return batch_results, time.time() - starttime
 
         # 批处理推理
-        with torch.no_grad():
-            inp = torch.from_numpy(batch_tensor)
-            inp = inp.to(self.device)
-            outputs = self.net(inp)
+        outputs = self.forward_net(batch_tensor)
 
         # 处理输出
         preds = {}
@@ -203,12 +229,7 @@ class TextDetector(BaseOCRV20):
             dt_boxes = post_result[0]['points']
 
             # 过滤和裁剪检测框
-            if (self.det_algorithm == "SAST" and
-                self.det_sast_polygon) or (self.det_algorithm in ["PSE", "FCE"] and
-                                           self.postprocess_op.box_type == 'poly'):
-                dt_boxes = self.filter_tag_det_res_only_clip(dt_boxes, ori_imgs[i].shape)
-            else:
-                dt_boxes = self.filter_tag_det_res(dt_boxes, ori_imgs[i].shape)
+            dt_boxes = self.filter_det_res(dt_boxes, ori_imgs[i].shape)
 
             batch_results.append((dt_boxes, total_elapse / len(img_list)))
 
@@ -239,6 +260,53 @@ class TextDetector(BaseOCRV20):
 
         return batch_results
 
+    def batch_predict_by_resolution(
+            self, img_list, max_batch_size=8, resolution_group_stride=64,
+            tqdm_enable=False, tqdm_desc="OCR-det Predict",
+    ):
+        """
+        尺寸不一的图像按分辨率分组，组内用白色padding到相同尺寸后批处理检测
+
+        Args:
+            img_list: BGR图像列表，尺寸可以不同
+            max_batch_size: 最大批处理大小
+            resolution_group_stride: 分辨率分组的步进值
+
+        Returns:
+            batch_results: 与img_list顺序一致的结果列表，每个元素为(dt_boxes, elapse)，
+                dt_boxes已按原图尺寸裁剪，不会落在padding区域
+        """
+        stride = resolution_group_stride
+        resolution_groups = defaultdict(list)
+        for index, img in enumerate(img_list):
+            h, w = img.shape[:2]
+            group_key = ((h + stride) // stride * stride, (w + stride) // stride * stride)
+            resolution_groups[group_key].append(index)
+
+        batch_results = [None] * len(img_list)
+        for group_indices in tqdm(resolution_groups.values(), desc=tqdm_desc, disable=not tqdm_enable):
+            # 目标尺寸为组内最大尺寸向上取整到stride的倍数
+            max_h = max(img_list[index].shape[0] for index in group_indices)
+            max_w = max(img_list[index].shape[1] for index in group_indices)
+            target_h = (max_h + stride - 1) // stride * stride
+            target_w = (max_w + stride - 1) // stride * stride
+
+            padded_imgs = []
+            for index in group_indices:
+                img = img_list[index]
+                h, w = img.shape[:2]
+                padded_img = np.full((target_h, target_w, 3), 255, dtype=np.uint8)
+                padded_img[:h, :w] = img
+                padded_imgs.append(padded_img)
+
+            group_results = self.batch_predict(padded_imgs, min(len(padded_imgs), max_batch_size))
+            for index, (dt_boxes, elapse) in zip(group_indices, group_results):
+                if dt_boxes is not None and len(dt_boxes) > 0:
+                    dt_boxes = self.filter_det_res(dt_boxes, img_list[index].shape)
+                batch_results[index] = (dt_boxes, elapse)
+
+        return batch_results
+
     def order_points_clockwise(self, pts):
         """
         reference from: https://github.com/jrosebr1/imutils/blob/master/imutils/perspective.py
@@ -292,6 +360,13 @@ class TextDetector(BaseOCRV20):
         dt_boxes = np.array(dt_boxes_new)
         return dt_boxes
 
+    def filter_det_res(self, dt_boxes, image_shape):
+        if (self.det_algorithm == "SAST" and
+            self.det_sast_polygon) or (self.det_algorithm in ["PSE", "FCE"] and
+                                       self.postprocess_op.box_type == 'poly'):
+            return self.filter_tag_det_res_only_clip(dt_boxes, image_shape)
+        return self.filter_tag_det_res(dt_boxes, image_shape)
+
     def __call__(self, img):
         ori_im = img.copy()
         data = {'image': img}
@@ -304,10 +379,7 @@ class TextDetector(BaseOCRV20):
         img = img.copy()
         starttime = time.time()
 
-        with torch.no_grad():
-            inp = torch.from_numpy(img)
-            inp = inp.to(self.device)
-            outputs = self.net(inp)
+        outputs = self.forward_net(img)
 
         preds = {}
         if self.det_algorithm == "EAST":
@@ -328,12 +400,7 @@ class TextDetector(BaseOCRV20):
 
         post_result = self.postprocess_op(preds, shape_list)
         dt_boxes = post_result[0]['points']
-        if (self.det_algorithm == "SAST" and
-            self.det_sast_polygon) or (self.det_algorithm in ["PSE", "FCE"] and
-                                       self.postprocess_op.box_type == 'poly'):
-            dt_boxes = self.filter_tag_det_res_only_clip(dt_boxes, ori_im.shape)
-        else:
-            dt_boxes = self.filter_tag_det_res(dt_boxes, ori_im.shape)
+        dt_boxes = self.filter_det_res(dt_boxes, ori_im.shape)
 
         elapse = time.time() - starttime
         return dt_boxes, elapse
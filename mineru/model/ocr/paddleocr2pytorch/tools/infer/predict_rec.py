@@ -2,14 +2,78 @@ from PIL import Image
 import cv2
 import numpy as np
 import math
+import threading
 import time
 import torch
+from loguru import logger
 from tqdm import tqdm
 
+from mineru.model.quantization import quantize_dynamic_int8
+from mineru.utils.config_reader import get_ocr_onnx_enable, get_quantize_enable
+from ...onnx_export import export_rec_onnx, get_ocr_onnx_session
 from ...pytorchocr.base_ocr_v20 import BaseOCRV20
 from . import pytorchocr_utility as utility
 from ...pytorchocr.postprocess import build_post_process
 
+# 识别网络只与权重和设备有关，同一语言不同检测阈值的TextRecognizer共享同一份网络
+_rec_net_cache = {}
+_rec_net_lock = threading.Lock()
+
+# 这些算法输入尺寸固定或预处理不同，不按padding后的像素预算组batch
+FIXED_BATCH_REC_ALGORITHMS = ["SAR", "SVTR", "SRN", "CAN", "NRTR", "ViTSTR", "RFL"]
+
+
+class OcrRecPaddingStats:
+    """统计rec batch中padding后的总像素与文本行实际占用像素，衡量padding浪费"""
+
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.padded_pixels = 0
+        self.content_pixels = 0
+        self._lock = threading.Lock()
+
+    def add(self, items: int, padded_pixels: int, content_pixels: int):
+        with self._lock:
+            self.batches += 1
+            self.items += items
+            self.padded_pixels += padded_pixels
+            self.content_pixels += content_pixels
+
+    def reset(self):
+        with self._lock:
+            self.batches = 0
+            self.items = 0
+            self.padded_pixels = 0
+            self.content_pixels = 0
+
+    @property
+    def padding_waste(self) -> float:
+        if self.padded_pixels == 0:
+            return 0.0
+        return 1 - self.content_pixels / self.padded_pixels
+
+    def summary(self) -> str:
+        return (
+            f'OCR-rec: {self.items} items in {self.batches} batches, '
+            f'padding waste {round(self.padding_waste * 100, 2)}%'
+        )
+
+
+_padding_stats = OcrRecPaddingStats()
+
+
+def get_ocr_rec_padding_stats() -> OcrRecPaddingStats:
+    return _padding_stats
+
+
+def log_ocr_rec_padding_stats(reset: bool = True):
+    """输出自上次reset以来的padding浪费统计，默认输出后清零，使每次解析单独统计"""
+    if _padding_stats.batches > 0:
+        logger.info(_padding_stats.summary())
+    if reset:
+        _padding_stats.reset()
+
 
 class TextRecognizer(BaseOCRV20):
     def __init__(self, args, **kwargs):
@@ -17,6 +81,8 @@ class TextRecognizer(BaseOCRV20):
         self.rec_image_shape = [int(v) for v in args.rec_image_shape.split(",")]
         self.character_type = args.rec_char_type
         self.rec_batch_num = args.rec_batch_num
+        # 每个batch padding后的像素上限，大于0时按像素预算组batch，短文本行一批多放，长文本行一批少放
+        self.rec_batch_pixels = getattr(args, "rec_batch_pixels", 0)
         self.rec_algorithm = args.rec_algorithm
         self.max_text_length = args.max_text_length
         postprocess_params = {
@@ -78,21 +144,77 @@ class TextRecognizer(BaseOCRV20):
         self.weights_path = args.rec_model_path
         self.yaml_path = args.rec_yaml_path
 
+        net_key = (self.weights_path, str(self.device))
+        with _rec_net_lock:
+            if net_key not in _rec_net_cache:
+                net = self.build_rec_net(**kwargs)
+                # 使用onnx推理时不做量化，量化后的网络无法导出onnx
+                if get_quantize_enable(self.device) and not get_ocr_onnx_enable():
+                    # cpu上可选int8动态量化
+                    net = quantize_dynamic_int8(net)
+                _rec_net_cache[net_key] = (self.config, net)
+            self.config, self.net = _rec_net_cache[net_key]
+
+        # 只有默认的CTC类算法支持onnx推理
+        self.onnx_sess = None
+        if get_ocr_onnx_enable() and self.rec_algorithm not in FIXED_BATCH_REC_ALGORITHMS + ["RARE"]:
+            self.onnx_sess = get_ocr_onnx_session('ocr_rec', export_rec_onnx, self)
+
+    def build_rec_net(self, **kwargs):
         network_config = utility.get_arch_config(self.weights_path)
         weights = self.read_pytorch_weights(self.weights_path)
 
-        self.out_channels = self.get_out_channels(weights)
+        out_channels = self.get_out_channels(weights)
         if self.rec_algorithm == 'NRTR':
-            self.out_channels = list(weights.values())[-1].numpy().shape[0]
+            out_channels = list(weights.values())[-1].numpy().shape[0]
         elif self.rec_algorithm == 'SAR':
-            self.out_channels = list(weights.values())[-3].numpy().shape[0]
+            out_channels = list(weights.values())[-3].numpy().shape[0]
 
-        kwargs['out_channels'] = self.out_channels
+        kwargs['out_channels'] = out_channels
         super(TextRecognizer, self).__init__(network_config, **kwargs)
 
         self.load_state_dict(weights)
         self.net.eval()
         self.net.to(self.device)
+        return self.net
+
+    def get_padded_width(self, max_wh_ratio):
+        """与resize_norm_img一致，batch内所有图片padding到的宽度"""
+        imgC, imgH, imgW = self.rec_image_shape
+        max_wh_ratio = max(max_wh_ratio, imgW / imgH)
+        imgW = int((imgH * max_wh_ratio))
+        return max(min(imgW, self.limited_max_width), self.limited_min_width)
+
+    def get_content_width(self, wh_ratio, padded_width):
+        """与resize_norm_img一致，单张图片缩放后实际占用的宽度"""
+        imgH = self.rec_image_shape[1]
+        return min(max(math.ceil(imgH * wh_ratio), self.limited_min_width), padded_width)
+
+    def get_batch_ranges(self, sorted_wh_ratios):
+        """
+        按宽高比升序排列的图片划分batch，返回[(beg, end), ...]
+
+        设置了rec_batch_pixels时，batch内图片数 * padding后的宽 * 高不超过该预算(每个batch至少一张)，
+        否则每个batch固定rec_batch_num张
+        """
+        img_num = len(sorted_wh_ratios)
+        if self.rec_batch_pixels <= 0 or self.rec_algorithm in FIXED_BATCH_REC_ALGORITHMS:
+            return [
+                (beg, min(img_num, beg + self.rec_batch_num))
+                for beg in range(0, img_num, self.rec_batch_num)
+            ]
+        imgH = self.rec_image_shape[1]
+        batch_ranges = []
+        beg = 0
+        for end in range(1, img_num + 1):
+            # 升序排列，batch的padding宽度由最后一张决定
+            padded_pixels = (end - beg) * self.get_padded_width(sorted_wh_ratios[end - 1]) * imgH
+            if end - beg > 1 and padded_pixels > self.rec_batch_pixels:
+                batch_ranges.append((beg, end - 1))
+                beg = end - 1
+        if beg < img_num:
+            batch_ranges.append((beg, img_num))
+        return batch_ranges
 
     def resize_norm_img(self, img, max_wh_ratio):
         imgC, imgH, imgW = self.rec_image_shape
@@ -296,16 +418,13 @@ class TextRecognizer(BaseOCRV20):
             width_list.append(img.shape[1] / float(img.shape[0]))
         # Sorting can speed up the recognition process
         indices = np.argsort(np.array(width_list))
+        sorted_wh_ratios = [width_list[ino] for ino in indices]
 
         # rec_res = []
         rec_res = [['', 0.0]] * img_num
-        batch_num = self.rec_batch_num
         elapse = 0
-        # for beg_img_no in range(0, img_num, batch_num):
         with tqdm(total=img_num, desc=tqdm_desc, disable=not tqdm_enable) as pbar:
-            index = 0
-            for beg_img_no in range(0, img_num, batch_num):
-                end_img_no = min(img_num, beg_img_no + batch_num)
+            for beg_img_no, end_img_no in self.get_batch_ranges(sorted_wh_ratios):
                 norm_img_batch = []
                 max_wh_ratio = 0
                 for ino in range(beg_img_no, end_img_no):
@@ -417,10 +536,14 @@ class TextRecognizer(BaseOCRV20):
                 else:
                     starttime = time.time()
 
-                    with torch.no_grad():
-                        inp = torch.from_numpy(norm_img_batch)
-                        inp = inp.to(self.device)
-                        prob_out = self.net(inp)
+                    if self.onnx_sess is not None:
+                        (prob_out,) = self.onnx_sess.run(None, {'x': norm_img_batch})
+                        prob_out = torch.from_numpy(prob_out)
+                    else:
+                        with torch.no_grad():
+                            inp = torch.from_numpy(norm_img_batch)
+                            inp = inp.to(self.device)
+                            prob_out = self.net(inp)
 
                     if isinstance(prob_out, list):
                         preds = [v.cpu().numpy() for v in prob_out]
@@ -432,10 +555,20 @@ class TextRecognizer(BaseOCRV20):
                     rec_res[indices[beg_img_no + rno]] = rec_result[rno]
                 elapse += time.time() - starttime
 
-                # 更新进度条，每次增加batch_size，但要注意最后一个batch可能不足batch_size
-                current_batch_size = min(batch_num, img_num - index * batch_num)
-                index += 1
-                pbar.update(current_batch_size)
+                if self.rec_algorithm not in FIXED_BATCH_REC_ALGORITHMS:
+                    imgH = self.rec_image_shape[1]
+                    padded_width = norm_img_batch.shape[-1]
+                    content_width = sum(
+                        self.get_content_width(sorted_wh_ratios[ino], padded_width)
+                        for ino in range(beg_img_no, end_img_no)
+                    )
+                    _padding_stats.add(
+                        end_img_no - beg_img_no,
+                        (end_img_no - beg_img_no) * padded_width * imgH,
+                        content_width * imgH,
+                    )
+
+                pbar.update(end_img_no - beg_img_no)
 
         # Fix NaN values in recognition results
         for i in range(len(rec_res)):
@@ -0,0 +1,192 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from loguru import logger
+from onnxruntime import (
+    GraphOptimizationLevel,
+    InferenceSession,
+    SessionOptions,
+    get_available_providers,
+)
+
+CPU_PROVIDER = "CPUExecutionProvider"
+CUDA_PROVIDER = "CUDAExecutionProvider"
+# io binding时每个session最多缓存的输出buffer组数(按输入形状区分)
+MAX_OUTPUT_BUFFER_SHAPES = 8
+
+
+def _get_env_int(name, default=None):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+def _get_env_bool(name, default=None):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.lower() == "true"
+
+
+class OnnxSessionStats:
+    """记录单个onnx session的调用次数、样本数和累计耗时"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.items = 0
+        self.total_time = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items: int, elapsed: float):
+        with self._lock:
+            self.calls += 1
+            self.items += items
+            self.total_time += elapsed
+
+    def summary(self) -> str:
+        avg_latency = self.total_time / self.calls * 1000 if self.calls > 0 else 0.0
+        return (
+            f'{self.name}: {self.calls} calls, {self.items} items, '
+            f'total {round(self.total_time, 2)}s, avg {round(avg_latency, 2)}ms/call'
+        )
+
+
+_session_stats = {}
+_session_stats_lock = threading.Lock()
+
+
+def _get_session_stats(name: str) -> OnnxSessionStats:
+    with _session_stats_lock:
+        stats = _session_stats.get(name)
+        if stats is None:
+            stats = OnnxSessionStats(name)
+            _session_stats[name] = stats
+        return stats
+
+
+def get_onnx_session_stats() -> list[OnnxSessionStats]:
+    with _session_stats_lock:
+        return list(_session_stats.values())
+
+
+def log_onnx_session_stats():
+    for stats in get_onnx_session_stats():
+        if stats.calls > 0:
+            logger.info(stats.summary())
+
+
+class OnnxSession:
+    """InferenceSession的包装，与InferenceSession.run接口一致，统计每次调用的耗时。
+
+    开启io binding时输出写入按输入形状预分配的buffer，相同形状的下一次调用会覆盖上一次的结果，
+    调用方需要在下一次run之前用完或复制输出。
+    """
+
+    def __init__(self, session: InferenceSession, name: str, io_binding: bool = False):
+        self.session = session
+        self.name = name
+        self.io_binding = io_binding
+        self.stats = _get_session_stats(name)
+        self._output_names = [output.name for output in session.get_outputs()]
+        self._output_buffers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(self, output_names, input_feed, run_options=None):
+        start_time = time.perf_counter()
+        if self.io_binding and run_options is None:
+            with self._lock:
+                results = self._run_with_io_binding(output_names, input_feed)
+        else:
+            results = self.session.run(output_names, input_feed, run_options)
+        first_input = next(iter(input_feed.values()), None)
+        items = first_input.shape[0] if isinstance(first_input, np.ndarray) and first_input.ndim > 0 else 1
+        self.stats.add(items, time.perf_counter() - start_time)
+        return results
+
+    def _run_with_io_binding(self, output_names, input_feed):
+        output_names = list(output_names) if output_names else self._output_names
+        key = (
+            tuple(output_names),
+            tuple((name, value.shape, value.dtype.str) for name, value in input_feed.items()),
+        )
+        output_buffers = self._output_buffers.get(key)
+        if output_buffers is None:
+            # 第一次遇到该形状时正常推理，输出数组留作后续同形状调用的buffer
+            results = self.session.run(output_names, input_feed)
+            self._output_buffers[key] = results
+            if len(self._output_buffers) > MAX_OUTPUT_BUFFER_SHAPES:
+                self._output_buffers.popitem(last=False)
+            return results
+        self._output_buffers.move_to_end(key)
+        binding = self.session.io_binding()
+        for name, value in input_feed.items():
+            binding.bind_cpu_input(name, np.ascontiguousarray(value))
+        for name, buffer in zip(output_names, output_buffers):
+            binding.bind_output(name, "cpu", 0, buffer.dtype.type, buffer.shape, buffer.ctypes.data)
+        self.session.run_with_iobinding(binding)
+        return output_buffers
+
+    def __getattr__(self, item):
+        # get_inputs、get_outputs、get_modelmeta、get_providers等直接使用原session
+        return getattr(self.session, item)
+
+
+def get_onnx_providers(use_cuda: bool = False) -> list:
+    """MINERU_ONNX_PROVIDERS(逗号分隔)优先，否则默认只用CPU，use_cuda且cuda可用时优先使用cuda"""
+    providers_env = os.getenv("MINERU_ONNX_PROVIDERS")
+    if providers_env:
+        return [provider.strip() for provider in providers_env.split(",") if provider.strip()]
+    providers = [CPU_PROVIDER]
+    if use_cuda and CUDA_PROVIDER in get_available_providers():
+        providers.insert(0, CUDA_PROVIDER)
+    return providers
+
+
+def create_onnx_session(
+        model_path: str,
+        name: str = None,
+        providers: list = None,
+        use_cuda: bool = False,
+        intra_op_num_threads: int = -1,
+        inter_op_num_threads: int = -1,
+        enable_cpu_mem_arena: bool = True,
+        io_binding: bool = False,
+) -> OnnxSession:
+    """创建onnx session，线程数、内存池、io binding等统一由环境变量控制：
+
+        MINERU_ONNX_INTRA_OP_THREADS / MINERU_ONNX_INTER_OP_THREADS：线程数，覆盖调用方传入的值；
+        MINERU_ONNX_ALLOW_SPINNING：空闲线程是否自旋等待，默认false，避免推理结束后继续占用cpu与torch争抢；
+        MINERU_ONNX_CPU_MEM_ARENA：是否启用cpu内存池，覆盖调用方传入的值；
+        MINERU_ONNX_IO_BINDING：是否对支持的session启用io binding，默认false；
+        MINERU_ONNX_PROVIDERS：execution provider列表。
+    """
+    name = name or os.path.basename(str(model_path))
+    sess_opt = SessionOptions()
+    sess_opt.log_severity_level = 4
+    sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_opt.enable_cpu_mem_arena = _get_env_bool("MINERU_ONNX_CPU_MEM_ARENA", enable_cpu_mem_arena)
+
+    cpu_nums = os.cpu_count() or 1
+    intra_op_num_threads = _get_env_int("MINERU_ONNX_INTRA_OP_THREADS", intra_op_num_threads)
+    if intra_op_num_threads is not None and 1 <= intra_op_num_threads <= cpu_nums:
+        sess_opt.intra_op_num_threads = intra_op_num_threads
+    inter_op_num_threads = _get_env_int("MINERU_ONNX_INTER_OP_THREADS", inter_op_num_threads)
+    if inter_op_num_threads is not None and 1 <= inter_op_num_threads <= cpu_nums:
+        sess_opt.inter_op_num_threads = inter_op_num_threads
+
+    if not _get_env_bool("MINERU_ONNX_ALLOW_SPINNING", False):
+        sess_opt.add_session_config_entry("session.intra_op.allow_spinning", "0")
+        sess_opt.add_session_config_entry("session.inter_op.allow_spinning", "0")
+
+    if providers is None or os.getenv("MINERU_ONNX_PROVIDERS"):
+        providers = get_onnx_providers(use_cuda)
+
+    session = InferenceSession(str(model_path), sess_options=sess_opt, providers=providers)
+    io_binding = io_binding and _get_env_bool("MINERU_ONNX_IO_BINDING", False)
+    return OnnxSession(session, name, io_binding=io_binding)
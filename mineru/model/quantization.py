@@ -0,0 +1,8 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import torch
+
+
+def quantize_dynamic_int8(module: torch.nn.Module) -> torch.nn.Module:
+    """nn.Linear的权重量化为int8，激活在推理时动态量化，卷积层保持fp32"""
+    module.eval()
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
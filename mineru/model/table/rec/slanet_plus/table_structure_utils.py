@@ -11,7 +11,6 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import os
 import platform
 import traceback
 from enum import Enum
@@ -21,15 +20,14 @@ from typing import Any, Dict, List, Tuple, Union
 import cv2
 import numpy as np
 from onnxruntime import (
-    GraphOptimizationLevel,
-    InferenceSession,
-    SessionOptions,
     get_available_providers,
     get_device,
 )
 
 from loguru import logger
 
+from mineru.model.onnx_session import create_onnx_session
+
 
 class EP(Enum):
     CPU_EP = "CPUExecutionProvider"
@@ -50,32 +48,16 @@ class OrtInferSession:
         self.had_providers: List[str] = get_available_providers()
         EP_list = self._get_ep_list()
 
-        sess_opt = self._init_sess_opts(config)
-        self.session = InferenceSession(
+        self.session = create_onnx_session(
             model_path,
-            sess_options=sess_opt,
+            name="slanet_plus",
             providers=EP_list,
+            intra_op_num_threads=config.get("intra_op_num_threads", -1),
+            inter_op_num_threads=config.get("inter_op_num_threads", -1),
+            enable_cpu_mem_arena=False,
         )
         self._verify_providers()
 
-    @staticmethod
-    def _init_sess_opts(config: Dict[str, Any]) -> SessionOptions:
-        sess_opt = SessionOptions()
-        sess_opt.log_severity_level = 4
-        sess_opt.enable_cpu_mem_arena = False
-        sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
-
-        cpu_nums = os.cpu_count()
-        intra_op_num_threads = config.get("intra_op_num_threads", -1)
-        if intra_op_num_threads != -1 and 1 <= intra_op_num_threads <= cpu_nums:
-            sess_opt.intra_op_num_threads = intra_op_num_threads
-
-        inter_op_num_threads = config.get("inter_op_num_threads", -1)
-        if inter_op_num_threads != -1 and 1 <= inter_op_num_threads <= cpu_nums:
-            sess_opt.inter_op_num_threads = inter_op_num_threads
-
-        return sess_opt
-
     def get_metadata(self, key: str = "character") -> list:
         meta_dict = self.session.get_modelmeta().custom_metadata_map
         content_list = meta_dict[key].splitlines()
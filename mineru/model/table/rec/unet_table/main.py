@@ -5,7 +5,7 @@ import time
 import traceback
 from dataclasses import dataclass, asdict
 
-from typing import List, Optional, Union, Dict, Any
+from typing import List, Optional, Union, Dict, Any, Tuple
 import numpy as np
 import cv2
 from PIL import Image
@@ -55,6 +55,83 @@ class WiredTableRecognition:
         ocr_result: Optional[List[Union[List[List[float]], str, str]]] = None,
         **kwargs,
     ) -> WiredTableOutput:
+        img = self.load_img(img)
+        polygons, rotated_polygons = self.table_structure(img, **kwargs)
+        state = self.recover_structure(img, polygons, rotated_polygons, ocr_result, **kwargs)
+        if isinstance(state, WiredTableOutput):
+            return state
+        if state["blank_crops"]:
+            state["blank_ocr_res"] = self.rec_blank_crops(state["blank_crops"])
+        return self.build_output(state)
+
+    def batch_predict(
+        self,
+        imgs: List[InputType],
+        ocr_results: List[Optional[List[Union[List[List[float]], str, str]]]],
+        batch_size: int = 8,
+        **kwargs,
+    ) -> List[Optional[WiredTableOutput]]:
+        """
+        批量识别有线表格：表格线检测按分辨率分组批量推理，所有表格的空单元格合并为一次ocr-rec。
+        每张表格的读图、后处理、结构恢复和html生成单独捕获异常，失败的表格结果为None，不影响其他表格。
+        """
+        loaded_imgs = []
+        for img in imgs:
+            try:
+                loaded_imgs.append(self.load_img(img))
+            except Exception as e:
+                logger.warning(e)
+                loaded_imgs.append(None)
+        valid_indices = [idx for idx, img in enumerate(loaded_imgs) if img is not None]
+        structure_results = [None] * len(imgs)
+        if valid_indices:
+            valid_results = self.table_structure.batch_predict(
+                [loaded_imgs[idx] for idx in valid_indices], batch_size, **kwargs
+            )
+            for idx, structure_result in zip(valid_indices, valid_results):
+                structure_results[idx] = structure_result
+
+        states = []
+        all_blank_crops = []
+        for img, structure_result, ocr_result in zip(loaded_imgs, structure_results, ocr_results):
+            state = None
+            if structure_result is not None:
+                try:
+                    state = self.recover_structure(img, *structure_result, ocr_result, **kwargs)
+                except Exception as e:
+                    logger.warning(e)
+            states.append(state)
+            if isinstance(state, dict):
+                all_blank_crops.extend(state["blank_crops"])
+
+        all_blank_ocr_res = self.rec_blank_crops(all_blank_crops) if all_blank_crops else []
+
+        outputs = []
+        offset = 0
+        for state in states:
+            if not isinstance(state, dict):
+                outputs.append(state)
+                continue
+            crop_num = len(state["blank_crops"])
+            if all_blank_ocr_res is not None:
+                state["blank_ocr_res"] = all_blank_ocr_res[offset:offset + crop_num]
+            offset += crop_num
+            try:
+                outputs.append(self.build_output(state))
+            except Exception as e:
+                logger.warning(e)
+                outputs.append(None)
+        return outputs
+
+    def recover_structure(
+        self,
+        img: np.ndarray,
+        polygons: Optional[np.ndarray],
+        rotated_polygons: Optional[np.ndarray],
+        ocr_result: Optional[List[Union[List[List[float]], str, str]]] = None,
+        **kwargs,
+    ) -> Union[WiredTableOutput, Dict[str, Any]]:
+        """恢复表格逻辑结构并匹配ocr结果，返回待补充识别的中间状态，无需继续处理时直接返回WiredTableOutput"""
         s = time.perf_counter()
         need_ocr = True
         col_threshold = 15
@@ -63,8 +140,6 @@ class WiredTableRecognition:
             need_ocr = kwargs.get("need_ocr", True)
             col_threshold = kwargs.get("col_threshold", 15)
             row_threshold = kwargs.get("row_threshold", 10)
-        img = self.load_img(img)
-        polygons, rotated_polygons = self.table_structure(img, **kwargs)
         if polygons is None:
             # logging.warning("polygons is None.")
             return WiredTableOutput("", None, None, 0.0)
@@ -89,8 +164,31 @@ class WiredTableRecognition:
                     time.perf_counter() - s,
                 )
             cell_box_det_map, not_match_orc_boxes = match_ocr_cell(ocr_result, polygons)
-            # 如果有识别框没有ocr结果，直接进行rec补充
-            cell_box_det_map = self.fill_blank_rec(img, polygons, cell_box_det_map)
+            # 如果有识别框没有ocr结果，收集需要直接进行rec补充的单元格
+            blank_crops, blank_crop_infos = self.collect_blank_crops(img, polygons, cell_box_det_map)
+        except Exception:
+            logging.warning(traceback.format_exc())
+            return WiredTableOutput("", None, None, 0.0)
+        return {
+            "polygons": polygons,
+            "logi_points": logi_points,
+            "cell_box_det_map": cell_box_det_map,
+            "blank_crops": blank_crops,
+            "blank_crop_infos": blank_crop_infos,
+            "blank_ocr_res": None,
+        }
+
+    def build_output(self, state: Dict[str, Any]) -> WiredTableOutput:
+        """填入空单元格的识别结果并生成html"""
+        s = time.perf_counter()
+        try:
+            polygons = state["polygons"]
+            logi_points = state["logi_points"]
+            cell_box_det_map = state["cell_box_det_map"]
+            if state["blank_ocr_res"] is not None:
+                cell_box_det_map = self.fill_blank_rec_result(
+                    polygons, cell_box_det_map, state["blank_crop_infos"], state["blank_ocr_res"]
+                )
             # 转换为中间格式，修正识别框坐标,将物理识别框，逻辑识别框，ocr识别框整合为dict，方便后续处理
             t_rec_ocr_list = self.transform_res(cell_box_det_map, polygons, logi_points)
             # 将每个单元格中的ocr识别结果排序和同行合并，输出的html能完整保留文字的换行格式
@@ -172,6 +270,22 @@ class WiredTableRecognition:
         cell_box_map: Dict[int, List[str]],
     ) -> Dict[int, List[Any]]:
         """找到poly对应为空的框，尝试将直接将poly框直接送到识别中"""
+        img_crop_list, img_crop_info_list = self.collect_blank_crops(img, sorted_polygons, cell_box_map)
+        if len(img_crop_list) > 0:
+            ocr_res_list = self.rec_blank_crops(img_crop_list)
+            if ocr_res_list is not None:
+                cell_box_map = self.fill_blank_rec_result(
+                    sorted_polygons, cell_box_map, img_crop_info_list, ocr_res_list
+                )
+        return cell_box_map
+
+    def collect_blank_crops(
+        self,
+        img: np.ndarray,
+        sorted_polygons: np.ndarray,
+        cell_box_map: Dict[int, List[str]],
+    ) -> Tuple[List[np.ndarray], List[List[Any]]]:
+        """截取没有ocr结果的单元格，返回(img_crop_list, img_crop_info_list)，低对比度的单元格直接填空"""
         bgr_img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
         img_crop_info_list = []
         img_crop_list = []
@@ -201,39 +315,41 @@ class WiredTableRecognition:
 
             img_crop_list.append(img_crop)
             img_crop_info_list.append([i, box])
+        return img_crop_list, img_crop_info_list
 
-        if len(img_crop_list) > 0:
-            # 进行ocr识别
+    def rec_blank_crops(self, img_crop_list: List[np.ndarray]) -> Optional[List[Any]]:
+        """对单元格截图进行ocr识别，结果无效时返回None"""
+        try:
             ocr_result = self.ocr_engine.ocr(img_crop_list, det=False)
-            # ocr_result = [[]]
-            # for crop_img in img_crop_list:
-            #     tmp_ocr_result = self.ocr_engine.ocr(crop_img)
-            #     if tmp_ocr_result[0] and len(tmp_ocr_result[0]) > 0 and isinstance(tmp_ocr_result[0], list) and len(tmp_ocr_result[0][0]) == 2:
-            #         ocr_result[0].append(tmp_ocr_result[0][0][1])
-            #     else:
-            #         ocr_result[0].append(("", 0.0))
-
-            if not ocr_result or not isinstance(ocr_result, list) or len(ocr_result) == 0:
-                logger.warning("OCR engine returned no results or invalid result for image crops.")
-                return cell_box_map
-            ocr_res_list = ocr_result[0]
-            if not isinstance(ocr_res_list, list) or len(ocr_res_list) != len(img_crop_list):
-                logger.warning("OCR result list length does not match image crop list length.")
-                return cell_box_map
-            for j, ocr_res in enumerate(ocr_res_list):
-                img_crop_info_list[j].append(ocr_res)
-
-            for i, box, ocr_res in img_crop_info_list:
-                # 处理ocr结果
-                ocr_text, ocr_score = ocr_res
-                # logger.debug(f"OCR result for box {i}: {ocr_text} with score {ocr_score}")
-                if ocr_score < 0.6 or ocr_text in ['1','口','■','（204号', '（20', '（2', '（2号', '（20号', '号', '（204']:
-                    # logger.warning(f"Low confidence OCR result for box {i}: {ocr_text} with score {ocr_score}")
-                    box = sorted_polygons[i]
-                    cell_box_map[i] = [[box, "", 0.1]]
-                    continue
-                cell_box_map[i] = [[box, ocr_text, ocr_score]]
-
+        except Exception:
+            logging.warning(traceback.format_exc())
+            return None
+        if not ocr_result or not isinstance(ocr_result, list) or len(ocr_result) == 0:
+            logger.warning("OCR engine returned no results or invalid result for image crops.")
+            return None
+        ocr_res_list = ocr_result[0]
+        if not isinstance(ocr_res_list, list) or len(ocr_res_list) != len(img_crop_list):
+            logger.warning("OCR result list length does not match image crop list length.")
+            return None
+        return ocr_res_list
+
+    def fill_blank_rec_result(
+        self,
+        sorted_polygons: np.ndarray,
+        cell_box_map: Dict[int, List[str]],
+        img_crop_info_list: List[List[Any]],
+        ocr_res_list: List[Any],
+    ) -> Dict[int, List[Any]]:
+        for (i, box), ocr_res in zip(img_crop_info_list, ocr_res_list):
+            # 处理ocr结果
+            ocr_text, ocr_score = ocr_res
+            # logger.debug(f"OCR result for box {i}: {ocr_text} with score {ocr_score}")
+            if ocr_score < 0.6 or ocr_text in ['1','口','■','（204号', '（20', '（2', '（2号', '（20号', '号', '（204']:
+                # logger.warning(f"Low confidence OCR result for box {i}: {ocr_text} with score {ocr_score}")
+                box = sorted_polygons[i]
+                cell_box_map[i] = [[box, "", 0.1]]
+                continue
+            cell_box_map[i] = [[box, ocr_text, ocr_score]]
         return cell_box_map
 
 
@@ -291,59 +407,99 @@ class UnetTableModel:
             #     np_img, wired_table_results, save_html_path, save_drawed_path, save_logic_path
             # )
 
-            wired_html_code = wired_table_results.pred_html
-            wired_len = count_table_cells_physical(wired_html_code)
-            wireless_len = count_table_cells_physical(wireless_html_code)
-            # 计算两种模型检测的单元格数量差异
-            gap_of_len = wireless_len - wired_len
-            # logger.debug(f"wired table cell bboxes: {wired_len}, wireless table cell bboxes: {wireless_len}")
-
-            # 使用OCR结果计算两种模型填入的文字数量
-            wireless_text_count = 0
-            wired_text_count = 0
-            for ocr_res in ocr_result:
-                if ocr_res[1] in wireless_html_code:
-                    wireless_text_count += 1
-                if ocr_res[1] in wired_html_code:
-                    wired_text_count += 1
-            # logger.debug(f"wireless table ocr text count: {wireless_text_count}, wired table ocr text count: {wired_text_count}")
-
-            # 使用HTML解析器计算空单元格数量
-            wireless_soup = BeautifulSoup(wireless_html_code, 'html.parser') if wireless_html_code else BeautifulSoup("", 'html.parser')
-            wired_soup = BeautifulSoup(wired_html_code, 'html.parser') if wired_html_code else BeautifulSoup("", 'html.parser')
-            # 计算空单元格数量(没有文本内容或只有空白字符)
-            wireless_blank_count = sum(1 for cell in wireless_soup.find_all(['td', 'th']) if not cell.text.strip())
-            wired_blank_count = sum(1 for cell in wired_soup.find_all(['td', 'th']) if not cell.text.strip())
-            # logger.debug(f"wireless table blank cell count: {wireless_blank_count}, wired table blank cell count: {wired_blank_count}")
-
-            # 计算非空单元格数量
-            wireless_non_blank_count = wireless_len - wireless_blank_count
-            wired_non_blank_count = wired_len - wired_blank_count
-            # 无线表非空格数量大于有线表非空格数量时，才考虑切换
-            switch_flag = False
-            if wireless_non_blank_count > wired_non_blank_count:
-                # 假设非空表格是接近正方表，使用非空单元格数量开平方作为表格规模的估计
-                wired_table_scale = round(wired_non_blank_count ** 0.5)
-                # logger.debug(f"wireless non-blank cell count: {wireless_non_blank_count}, wired non-blank cell count: {wired_non_blank_count}, wired table scale: {wired_table_scale}")
-                # 如果无线表非空格的数量比有线表多一列或以上，需要切换到无线表
-                wired_scale_plus_2_cols = wired_non_blank_count + (wired_table_scale * 2)
-                wired_scale_squared_plus_2_rows = wired_table_scale * (wired_table_scale + 2)
-                if (wireless_non_blank_count + 3) >= max(wired_scale_plus_2_cols, wired_scale_squared_plus_2_rows):
-                    switch_flag = True
-
-            # 判断是否使用无线表格模型的结果
-            if (
-                switch_flag
-                or (0 <= gap_of_len <= 5 and wired_len <= round(wireless_len * 0.75))  # 两者相差不大但有线模型结果较少
-                or (gap_of_len == 0 and wired_len <= 4)  # 单元格数量完全相等且总量小于等于4
-                or (wired_text_count <= wireless_text_count * 0.6 and  wireless_text_count >=10) # 有线模型填入的文字明显少于无线模型
-            ):
-                # logger.debug("fall back to wireless table model")
-                html_code = wireless_html_code
+            return self.select_html(wired_table_results.pred_html, ocr_result, wireless_html_code)
+        except Exception as e:
+            logger.warning(e)
+            return wireless_html_code
+
+    def batch_predict(self, table_res_list: List[dict], batch_size: int = 4):
+        """批量预测有线表格，结果写回table_res_list中每项的table_res['html']，识别失败的表格保留无线表格的结果"""
+        not_none_table_res_list = [
+            table_res for table_res in table_res_list if table_res.get("ocr_result", None)
+        ]
+        if not not_none_table_res_list:
+            return
+
+        np_imgs = []
+        for table_res in not_none_table_res_list:
+            input_img = table_res["wired_table_img"]
+            if isinstance(input_img, Image.Image):
+                np_imgs.append(np.asarray(input_img))
+            elif isinstance(input_img, np.ndarray):
+                np_imgs.append(input_img)
             else:
-                html_code = wired_html_code
+                raise ValueError("Input must be a pillow object or a numpy array.")
+        ocr_results = [table_res["ocr_result"] for table_res in not_none_table_res_list]
 
-            return html_code
+        try:
+            wired_table_results_list = self.wired_table_model.batch_predict(np_imgs, ocr_results, batch_size)
         except Exception as e:
             logger.warning(e)
-            return wireless_html_code
+            return
+
+        for table_res, wired_table_results in zip(not_none_table_res_list, wired_table_results_list):
+            if wired_table_results is None:
+                continue
+            wireless_html_code = table_res["table_res"].get("html", None)
+            try:
+                table_res["table_res"]["html"] = self.select_html(
+                    wired_table_results.pred_html, table_res["ocr_result"], wireless_html_code
+                )
+            except Exception as e:
+                logger.warning(e)
+
+    @staticmethod
+    def select_html(wired_html_code, ocr_result, wireless_html_code):
+        """比较有线和无线表格模型的结果，返回更可信的html"""
+        wired_len = count_table_cells_physical(wired_html_code)
+        wireless_len = count_table_cells_physical(wireless_html_code)
+        # 计算两种模型检测的单元格数量差异
+        gap_of_len = wireless_len - wired_len
+        # logger.debug(f"wired table cell bboxes: {wired_len}, wireless table cell bboxes: {wireless_len}")
+
+        # 使用OCR结果计算两种模型填入的文字数量
+        wireless_text_count = 0
+        wired_text_count = 0
+        for ocr_res in ocr_result:
+            if ocr_res[1] in wireless_html_code:
+                wireless_text_count += 1
+            if ocr_res[1] in wired_html_code:
+                wired_text_count += 1
+        # logger.debug(f"wireless table ocr text count: {wireless_text_count}, wired table ocr text count: {wired_text_count}")
+
+        # 使用HTML解析器计算空单元格数量
+        wireless_soup = BeautifulSoup(wireless_html_code, 'html.parser') if wireless_html_code else BeautifulSoup("", 'html.parser')
+        wired_soup = BeautifulSoup(wired_html_code, 'html.parser') if wired_html_code else BeautifulSoup("", 'html.parser')
+        # 计算空单元格数量(没有文本内容或只有空白字符)
+        wireless_blank_count = sum(1 for cell in wireless_soup.find_all(['td', 'th']) if not cell.text.strip())
+        wired_blank_count = sum(1 for cell in wired_soup.find_all(['td', 'th']) if not cell.text.strip())
+        # logger.debug(f"wireless table blank cell count: {wireless_blank_count}, wired table blank cell count: {wired_blank_count}")
+
+        # 计算非空单元格数量
+        wireless_non_blank_count = wireless_len - wireless_blank_count
+        wired_non_blank_count = wired_len - wired_blank_count
+        # 无线表非空格数量大于有线表非空格数量时，才考虑切换
+        switch_flag = False
+        if wireless_non_blank_count > wired_non_blank_count:
+            # 假设非空表格是接近正方表，使用非空单元格数量开平方作为表格规模的估计
+            wired_table_scale = round(wired_non_blank_count ** 0.5)
+            # logger.debug(f"wireless non-blank cell count: {wireless_non_blank_count}, wired non-blank cell count: {wired_non_blank_count}, wired table scale: {wired_table_scale}")
+            # 如果无线表非空格的数量比有线表多一列或以上，需要切换到无线表
+            wired_scale_plus_2_cols = wired_non_blank_count + (wired_table_scale * 2)
+            wired_scale_squared_plus_2_rows = wired_table_scale * (wired_table_scale + 2)
+            if (wireless_non_blank_count + 3) >= max(wired_scale_plus_2_cols, wired_scale_squared_plus_2_rows):
+                switch_flag = True
+
+        # 判断是否使用无线表格模型的结果
+        if (
+            switch_flag
+            or (0 <= gap_of_len <= 5 and wired_len <= round(wireless_len * 0.75))  # 两者相差不大但有线模型结果较少
+            or (gap_of_len == 0 and wired_len <= 4)  # 单元格数量完全相等且总量小于等于4
+            or (wired_text_count <= wireless_text_count * 0.6 and  wireless_text_count >=10) # 有线模型填入的文字明显少于无线模型
+        ):
+            # logger.debug("fall back to wireless table model")
+            html_code = wireless_html_code
+        else:
+            html_code = wired_html_code
+
+        return html_code
@@ -1,11 +1,13 @@
 import copy
 import math
-from typing import Optional, Dict, Any, Tuple
+from collections import defaultdict
+from typing import Optional, Dict, Any, Tuple, List
 
 import cv2
 import numpy as np
+from loguru import logger
 from skimage import measure
-from .utils import OrtInferSession, resize_img
+from .utils import OrtInferSession, ONNXRuntimeError, resize_img
 from .utils_table_line_rec import (
     get_table_line,
     final_adjust_lines,
@@ -27,6 +29,8 @@ class TSRUnet:
         self.std = np.array([58.395, 57.12, 57.375], dtype=np.float32)
         self.inp_height = 1024
         self.inp_width = 1024
+        # batch推理时按该步长向上取整padding，尺寸相近的表格合并为一次推理
+        self.pad_stride = 32
 
         self.session = OrtInferSession(config)
 
@@ -35,7 +39,71 @@ class TSRUnet:
     ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         img_info = self.preprocess(img)
         pred = self.infer(img_info)
-        polygons, rotated_polygons = self.postprocess(img, pred, **kwargs)
+        return self.format_polygons(*self.postprocess(img, pred, **kwargs))
+
+    def batch_predict(
+        self, imgs: List[np.ndarray], batch_size: int = 8, **kwargs
+    ) -> List[Tuple[Optional[np.ndarray], Optional[np.ndarray]]]:
+        """
+        批量预测表格线，缩放后尺寸完全相同的表格直接合并为一次推理；
+        剩下尺寸各不相同的表格按pad_stride向上取整的尺寸分组，组内用白色padding到相同尺寸后一次推理，
+        分组后仍只有一张的表格不做padding，与逐张推理的输入一致。
+        每张表格单独后处理，后处理失败的表格结果为None，不影响同一批次的其他表格。
+        """
+        resized_imgs = [
+            resize_img(img, (self.inp_height, self.inp_width), True)[0] for img in imgs
+        ]
+        shape_groups = defaultdict(list)
+        for idx, resized_img in enumerate(resized_imgs):
+            shape_groups[resized_img.shape[:2]].append(idx)
+
+        batch_groups = []
+        leftover_groups = defaultdict(list)
+        for (h, w), group_indices in shape_groups.items():
+            if len(group_indices) > 1:
+                batch_groups.append(((h, w), group_indices))
+            else:
+                pad_key = (
+                    -(-h // self.pad_stride) * self.pad_stride,
+                    -(-w // self.pad_stride) * self.pad_stride,
+                )
+                leftover_groups[pad_key].append(group_indices[0])
+        for pad_shape, group_indices in leftover_groups.items():
+            if len(group_indices) == 1:
+                batch_groups.append((resized_imgs[group_indices[0]].shape[:2], group_indices))
+            else:
+                batch_groups.append((pad_shape, group_indices))
+
+        preds = [None] * len(imgs)
+        for (target_h, target_w), group_indices in batch_groups:
+            for start in range(0, len(group_indices), batch_size):
+                batch_indices = group_indices[start:start + batch_size]
+                batch_images = []
+                for idx in batch_indices:
+                    resized_img = resized_imgs[idx]
+                    h, w = resized_img.shape[:2]
+                    if (h, w) != (target_h, target_w):
+                        padded_img = np.full((target_h, target_w, 3), 255, dtype=resized_img.dtype)
+                        padded_img[:h, :w] = resized_img
+                        resized_img = padded_img
+                    batch_images.append(self.normalize(resized_img))
+                batch_preds = self.infer_batch(np.stack(batch_images))
+                for idx, pred in zip(batch_indices, batch_preds):
+                    h, w = resized_imgs[idx].shape[:2]
+                    preds[idx] = pred[:h, :w]
+
+        results = []
+        for img, pred in zip(imgs, preds):
+            try:
+                results.append(self.format_polygons(*self.postprocess(img, pred, **kwargs)))
+            except Exception as e:
+                logger.warning(e)
+                results.append(None)
+        return results
+
+    def format_polygons(
+        self, polygons: np.ndarray, rotated_polygons: np.ndarray
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         if polygons.size == 0:
             return None, None
         polygons = polygons.reshape(polygons.shape[0], 4, 2)
@@ -59,6 +127,11 @@ class TSRUnet:
     def preprocess(self, img) -> Dict[str, Any]:
         scale = (self.inp_height, self.inp_width)
         img, _, _ = resize_img(img, scale, True)
+        images = self.normalize(img)[None, :]
+        return {"img": images}
+
+    def normalize(self, img) -> np.ndarray:
+        """BGR uint8图片归一化为CHW float32"""
         img = img.copy().astype(np.float32)
         assert img.dtype != np.uint8
         mean = np.float64(self.mean.reshape(1, -1))
@@ -66,15 +139,22 @@ class TSRUnet:
         cv2.cvtColor(img, cv2.COLOR_BGR2RGB, img)  # inplace
         cv2.subtract(img, mean, img)  # inplace
         cv2.multiply(img, stdinv, img)  # inplace
-        img = img.transpose(2, 0, 1)
-        images = img[None, :]
-        return {"img": images}
+        return img.transpose(2, 0, 1)
 
     def infer(self, input):
         result = self.session(input["img"][None, ...])[0][0]
         result = result[0].astype(np.uint8)
         return result
 
+    def infer_batch(self, images: np.ndarray) -> List[np.ndarray]:
+        """images为NCHW，返回每张图片的预测结果"""
+        try:
+            outputs = self.session([images])[0]
+        except ONNXRuntimeError:
+            # 模型不支持动态batch时退回逐张推理
+            return [self.infer({"img": image[None, :]}) for image in images]
+        return [output[0].astype(np.uint8) for output in outputs]
+
     def postprocess(self, img, pred, **kwargs):
         row = kwargs.get("row", 50) if kwargs else 50
         col = kwargs.get("col", 30) if kwargs else 30
@@ -8,14 +8,11 @@ from typing import List, Union, Dict, Any, Tuple, Optional
 import cv2
 import loguru
 import numpy as np
-from onnxruntime import (
-    GraphOptimizationLevel,
-    InferenceSession,
-    SessionOptions,
-    get_available_providers,
-)
+from onnxruntime import get_available_providers
 from PIL import Image, UnidentifiedImageError
 
+from mineru.model.onnx_session import create_onnx_session
+
 
 root_dir = Path(__file__).resolve().parent
 InputType = Union[str, np.ndarray, bytes, Path]
@@ -34,31 +31,17 @@ class OrtInferSession:
         self.had_providers: List[str] = get_available_providers()
         EP_list = self._get_ep_list()
 
-        sess_opt = self._init_sess_opts(config)
-        self.session = InferenceSession(
+        # 输出在infer中会被立即复制，可以使用io binding复用输出buffer
+        self.session = create_onnx_session(
             model_path,
-            sess_options=sess_opt,
+            name="unet_table",
             providers=EP_list,
+            intra_op_num_threads=config.get("intra_op_num_threads", -1),
+            inter_op_num_threads=config.get("inter_op_num_threads", -1),
+            enable_cpu_mem_arena=False,
+            io_binding=True,
         )
 
-    @staticmethod
-    def _init_sess_opts(config: Dict[str, Any]) -> SessionOptions:
-        sess_opt = SessionOptions()
-        sess_opt.log_severity_level = 4
-        sess_opt.enable_cpu_mem_arena = False
-        sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
-
-        cpu_nums = os.cpu_count()
-        intra_op_num_threads = config.get("intra_op_num_threads", -1)
-        if intra_op_num_threads != -1 and 1 <= intra_op_num_threads <= cpu_nums:
-            sess_opt.intra_op_num_threads = intra_op_num_threads
-
-        inter_op_num_threads = config.get("inter_op_num_threads", -1)
-        if inter_op_num_threads != -1 and 1 <= inter_op_num_threads <= cpu_nums:
-            sess_opt.inter_op_num_threads = inter_op_num_threads
-
-        return sess_opt
-
     def _get_ep_list(self) -> List[Tuple[str, Dict[str, Any]]]:
         cpu_provider_opts = {
             "arena_extend_strategy": "kSameAsRequested",
@@ -1,9 +1,12 @@
 # Copyright (c) Opendatalab. All rights reserved.
+import numpy as np
+
 from mineru.utils.boxbase import (
-    calculate_iou,
-    calculate_overlap_area_in_bbox1_area_ratio,
+    bboxes_to_array,
     calculate_vertical_projection_overlap_ratio,
-    get_minbox_if_overlap_by_ratio
+    pairwise_iou,
+    pairwise_overlap_area_in_bbox1_area_ratio,
+    pairwise_overlap_area_2_minbox_area_ratio,
 )
 from mineru.utils.enum_class import BlockType
 
@@ -125,13 +128,11 @@ def fix_text_overlap_title_blocks(all_bboxes):
 
     need_remove = []
 
-    for text_block in text_blocks:
-        for title_block in title_blocks:
-            text_block_bbox = text_block[:4]
-            title_block_bbox = title_block[:4]
-            if calculate_iou(text_block_bbox, title_block_bbox) > 0.8:
-                if title_block not in need_remove:
-                    need_remove.append(title_block)
+    iou_matrix = pairwise_iou(bboxes_to_array(text_blocks), bboxes_to_array(title_blocks))
+    for text_idx, title_idx in np.argwhere(iou_matrix > 0.8).tolist():
+        title_block = title_blocks[title_idx]
+        if title_block not in need_remove:
+            need_remove.append(title_block)
 
     if len(need_remove) > 0:
         for block in need_remove:
@@ -142,18 +143,13 @@ def fix_text_overlap_title_blocks(all_bboxes):
 
 def remove_need_drop_blocks(all_bboxes, discarded_blocks):
     need_remove = []
-    for block in all_bboxes:
-        for discarded_block in discarded_blocks:
-            block_bbox = block[:4]
-            if (
-                calculate_overlap_area_in_bbox1_area_ratio(
-                    block_bbox, discarded_block['bbox']
-                )
-                > 0.6
-            ):
-                if block not in need_remove:
-                    need_remove.append(block)
-                    break
+    overlap_matrix = pairwise_overlap_area_in_bbox1_area_ratio(
+        bboxes_to_array(all_bboxes), bboxes_to_array([discarded_block['bbox'] for discarded_block in discarded_blocks])
+    )
+    for block_idx in np.flatnonzero((overlap_matrix > 0.6).any(axis=1)).tolist():
+        block = all_bboxes[block_idx]
+        if block not in need_remove:
+            need_remove.append(block)
 
     if len(need_remove) > 0:
         for block in need_remove:
@@ -174,13 +170,11 @@ def fix_interline_equation_overlap_text_blocks_with_hi_iou(all_bboxes):
 
     need_remove = []
 
-    for interline_equation_block in interline_equation_blocks:
-        for text_block in text_blocks:
-            interline_equation_block_bbox = interline_equation_block[:4]
-            text_block_bbox = text_block[:4]
-            if calculate_iou(interline_equation_block_bbox, text_block_bbox) > 0.8:
-                if text_block not in need_remove:
-                    need_remove.append(text_block)
+    iou_matrix = pairwise_iou(bboxes_to_array(interline_equation_blocks), bboxes_to_array(text_blocks))
+    for interline_equation_idx, text_idx in np.argwhere(iou_matrix > 0.8).tolist():
+        text_block = text_blocks[text_idx]
+        if text_block not in need_remove:
+            need_remove.append(text_block)
 
     if len(need_remove) > 0:
         for block in need_remove:
@@ -213,36 +207,44 @@ def remove_overlaps_min_blocks(all_bboxes):
     #  重叠block，小的不能直接删除，需要和大的那个合并成一个更大的。
     #  删除重叠blocks中较小的那些
     need_remove = []
+    bboxes = bboxes_to_array(all_bboxes)
+    overlap_matrix = pairwise_overlap_area_2_minbox_area_ratio(bboxes, bboxes)
     for i in range(len(all_bboxes)):
-        for j in range(i + 1, len(all_bboxes)):
+        j = i + 1
+        while j < len(all_bboxes):
+            # 只有重叠比例超过阈值的块对才需要处理，直接跳到下一个这样的块
+            hits = np.flatnonzero(overlap_matrix[i, j:] > 0.8)
+            if len(hits) == 0:
+                break
+            j += int(hits[0])
             block1 = all_bboxes[i]
             block2 = all_bboxes[j]
-            block1_bbox = block1[:4]
-            block2_bbox = block2[:4]
-            overlap_box = get_minbox_if_overlap_by_ratio(
-                block1_bbox, block2_bbox, 0.8
-            )
-            if overlap_box is not None:
-                # 判断哪个区块的面积更小，移除较小的区块
-                area1 = (block1[2] - block1[0]) * (block1[3] - block1[1])
-                area2 = (block2[2] - block2[0]) * (block2[3] - block2[1])
-
-                if area1 <= area2:
-                    block_to_remove = block1
-                    large_block = block2
-                else:
-                    block_to_remove = block2
-                    large_block = block1
-
-                if block_to_remove not in need_remove:
-                    x1, y1, x2, y2 = large_block[:4]
-                    sx1, sy1, sx2, sy2 = block_to_remove[:4]
-                    x1 = min(x1, sx1)
-                    y1 = min(y1, sy1)
-                    x2 = max(x2, sx2)
-                    y2 = max(y2, sy2)
-                    large_block[:4] = [x1, y1, x2, y2]
-                    need_remove.append(block_to_remove)
+            # 判断哪个区块的面积更小，移除较小的区块
+            area1 = (block1[2] - block1[0]) * (block1[3] - block1[1])
+            area2 = (block2[2] - block2[0]) * (block2[3] - block2[1])
+
+            if area1 <= area2:
+                block_to_remove = block1
+                large_block, large_idx = block2, j
+            else:
+                block_to_remove = block2
+                large_block, large_idx = block1, i
+
+            if block_to_remove not in need_remove:
+                x1, y1, x2, y2 = large_block[:4]
+                sx1, sy1, sx2, sy2 = block_to_remove[:4]
+                x1 = min(x1, sx1)
+                y1 = min(y1, sy1)
+                x2 = max(x2, sx2)
+                y2 = max(y2, sy2)
+                large_block[:4] = [x1, y1, x2, y2]
+                need_remove.append(block_to_remove)
+                # 大块边界变化后，更新它与其他块的重叠比例
+                bboxes[large_idx] = large_block[:4]
+                large_overlap = pairwise_overlap_area_2_minbox_area_ratio(bboxes[large_idx:large_idx + 1], bboxes)[0]
+                overlap_matrix[large_idx, :] = large_overlap
+                overlap_matrix[:, large_idx] = large_overlap
+            j += 1
 
     for block in need_remove:
         if block in all_bboxes:
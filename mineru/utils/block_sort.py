@@ -12,6 +12,10 @@ from mineru.utils.enum_class import BlockType, ModelPath
 from mineru.utils.models_download_utils import auto_download_and_get_model_root_path
 
 
+# 跨页批量执行layoutreader时每个batch的页数
+LAYOUT_READER_BATCH_SIZE = 16
+
+
 def sort_blocks_by_bbox(blocks, page_w, page_h, footnote_blocks):
 
     """获取所有line并计算正文line的高度"""
@@ -20,6 +24,40 @@ def sort_blocks_by_bbox(blocks, page_w, page_h, footnote_blocks):
     """获取所有line并对line排序"""
     sorted_bboxes = sort_lines_by_model(blocks, page_w, page_h, line_height, footnote_blocks)
 
+    return sort_blocks_by_line_order(blocks, sorted_bboxes)
+
+
+def batch_sort_blocks_by_bbox(pages_blocks, batch_size=LAYOUT_READER_BATCH_SIZE):
+    """多页一起排序，所有页面的line序列合并成batch执行layoutreader，减少逐页推理的开销
+
+    Args:
+        pages_blocks (list): 每页的(blocks, page_w, page_h, footnote_blocks)
+
+    Returns:
+        list: 每页排序后的blocks
+    """
+    pages_line_list = []
+    pages_boxes = []
+    for blocks, page_w, page_h, footnote_blocks in pages_blocks:
+        line_height = get_line_height(blocks)
+        page_line_list, boxes = prepare_lines_for_model(blocks, page_w, page_h, line_height, footnote_blocks)
+        pages_line_list.append(page_line_list)
+        pages_boxes.append(boxes)
+
+    pages_orders = batch_predict_line_orders(pages_boxes, batch_size)
+
+    sorted_blocks_list = []
+    for (blocks, _, _, _), page_line_list, orders in zip(pages_blocks, pages_line_list, pages_orders):
+        if orders is None:
+            sorted_bboxes = None
+        else:
+            sorted_bboxes = [page_line_list[i] for i in orders]
+        sorted_blocks_list.append(sort_blocks_by_line_order(blocks, sorted_bboxes))
+    return sorted_blocks_list
+
+
+def sort_blocks_by_line_order(blocks, sorted_bboxes):
+
     """根据line的中位数算block的序列关系"""
     blocks = cal_block_index(blocks, sorted_bboxes)
 
@@ -55,6 +93,21 @@ def get_line_height(blocks):
 
 
 def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, footnote_blocks):
+    page_line_list, boxes = prepare_lines_for_model(fix_blocks, page_w, page_h, line_height, footnote_blocks)
+    if boxes is None:
+        return None
+
+    model_manager = ModelSingleton()
+    model = model_manager.get_model('layoutreader')
+    with torch.no_grad():
+        orders = do_predict(boxes, model)
+    sorted_bboxes = [page_line_list[i] for i in orders]
+
+    return sorted_bboxes
+
+
+def prepare_lines_for_model(fix_blocks, page_w, page_h, line_height, footnote_blocks):
+    """收集页面中所有line并转换为layoutreader的输入坐标，line数超过上限时boxes返回None（退回xycut排序）"""
     page_line_list = []
 
     def add_lines_to_block(b):
@@ -88,7 +141,7 @@ def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, footnote_blocks
         add_lines_to_block(footnote_block)
 
     if len(page_line_list) > 200:  # layoutreader最高支持512line
-        return None
+        return page_line_list, None
 
     # 使用layoutreader排序
     x_scale = 1000.0 / page_w
@@ -125,13 +178,8 @@ def sort_lines_by_model(fix_blocks, page_w, page_h, line_height, footnote_blocks
             1000 >= right >= left >= 0 and 1000 >= bottom >= top >= 0
         ), f'Invalid box. right: {right}, left: {left}, bottom: {bottom}, top: {top}'  # noqa: E126, E121
         boxes.append([left, top, right, bottom])
-    model_manager = ModelSingleton()
-    model = model_manager.get_model('layoutreader')
-    with torch.no_grad():
-        orders = do_predict(boxes, model)
-    sorted_bboxes = [page_line_list[i] for i in orders]
 
-    return sorted_bboxes
+    return page_line_list, boxes
 
 
 def insert_lines_into_block(block_bbox, line_height, page_w, page_h):
@@ -238,6 +286,42 @@ def do_predict(boxes: List[List[int]], model) -> List[int]:
     return parse_logits(logits, len(boxes))
 
 
+def batch_predict_line_orders(pages_boxes, batch_size=LAYOUT_READER_BATCH_SIZE):
+    """对多页的line序列批量推理阅读顺序，boxes为None的页面返回None"""
+    from mineru.model.reading_order.layout_reader import (
+        batch_boxes2inputs, parse_logits, prepare_inputs)
+
+    pages_orders = [None] * len(pages_boxes)
+    valid_indices = []
+    for index, boxes in enumerate(pages_boxes):
+        if boxes is None:
+            continue
+        if len(boxes) == 0:
+            pages_orders[index] = []
+        else:
+            valid_indices.append(index)
+    if not valid_indices:
+        return pages_orders
+
+    # 按line数排序后组batch，减少padding
+    valid_indices.sort(key=lambda i: len(pages_boxes[i]))
+
+    model_manager = ModelSingleton()
+    model = model_manager.get_model('layoutreader')
+    for start in range(0, len(valid_indices), batch_size):
+        batch_indices = valid_indices[start:start + batch_size]
+        batch_boxes = [pages_boxes[i] for i in batch_indices]
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", category=FutureWarning, module="transformers")
+            inputs = prepare_inputs(batch_boxes2inputs(batch_boxes), model)
+            with torch.no_grad():
+                logits = model(**inputs).logits.cpu()
+        for batch_index, page_index in enumerate(batch_indices):
+            pages_orders[page_index] = parse_logits(logits[batch_index], len(pages_boxes[page_index]))
+
+    return pages_orders
+
+
 def cal_block_index(fix_blocks, sorted_bboxes):
 
     if sorted_bboxes is not None:
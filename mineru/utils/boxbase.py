@@ -1,4 +1,7 @@
 import math
+from collections import defaultdict
+
+import numpy as np
 
 
 def is_in(box1, box2) -> bool:
@@ -200,4 +203,138 @@ def calculate_vertical_projection_overlap_ratio(block1, block2):
 
     # Proportion of the x-axis covered by the intersection
     # logger.info(f"intersection_length: {intersection_length}, block1_length: {block1_length}")
-    return intersection_length / block1_length
\ No newline at end of file
+    return intersection_length / block1_length
+
+def bboxes_to_array(bboxes, dtype=np.float64) -> np.ndarray:
+    """把bbox列表转换为 (N, 4) 的数组，多余的列(如面积、类型)会被忽略."""
+    if isinstance(bboxes, np.ndarray) and bboxes.ndim == 2:
+        return bboxes[:, :4].astype(dtype, copy=False)
+    array = np.empty((len(bboxes), 4), dtype=dtype)
+    for idx, bbox in enumerate(bboxes):
+        array[idx] = bbox[0:4]
+    return array
+
+
+def pairwise_intersection_area(bboxes1, bboxes2) -> np.ndarray:
+    """计算两组bbox两两之间的重叠面积，返回 (N, M) 矩阵，不相交时为0.
+
+    与标量函数采用相同的运算顺序，float64输入时结果与calculate_iou等函数逐位一致；
+    float32输入速度更快，但阈值附近的比较结果可能与标量函数不同。
+    """
+    bboxes1 = bboxes_to_array(bboxes1) if not isinstance(bboxes1, np.ndarray) else bboxes1
+    bboxes2 = bboxes_to_array(bboxes2) if not isinstance(bboxes2, np.ndarray) else bboxes2
+    x_left = np.maximum(bboxes1[:, None, 0], bboxes2[None, :, 0])
+    y_top = np.maximum(bboxes1[:, None, 1], bboxes2[None, :, 1])
+    x_right = np.minimum(bboxes1[:, None, 2], bboxes2[None, :, 2])
+    y_bottom = np.minimum(bboxes1[:, None, 3], bboxes2[None, :, 3])
+    width = x_right - x_left
+    height = y_bottom - y_top
+    return np.where((width > 0) & (height > 0), width * height, 0)
+
+
+def bboxes_area(bboxes) -> np.ndarray:
+    bboxes = bboxes_to_array(bboxes) if not isinstance(bboxes, np.ndarray) else bboxes
+    return (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+
+
+def _safe_divide(numerator, denominator):
+    # 只有重叠面积大于0时两个bbox才都是合法的，分母必然大于0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(numerator > 0, numerator / denominator, 0)
+
+
+def pairwise_iou(bboxes1, bboxes2) -> np.ndarray:
+    """批量版本的calculate_iou，返回 (N, M) 的交并比矩阵."""
+    bboxes1 = bboxes_to_array(bboxes1) if not isinstance(bboxes1, np.ndarray) else bboxes1
+    bboxes2 = bboxes_to_array(bboxes2) if not isinstance(bboxes2, np.ndarray) else bboxes2
+    intersection_area = pairwise_intersection_area(bboxes1, bboxes2)
+    union_area = bboxes_area(bboxes1)[:, None] + bboxes_area(bboxes2)[None, :] - intersection_area
+    return _safe_divide(intersection_area, union_area)
+
+
+def pairwise_overlap_area_in_bbox1_area_ratio(bboxes1, bboxes2) -> np.ndarray:
+    """批量版本的calculate_overlap_area_in_bbox1_area_ratio，返回 (N, M) 矩阵，[i, j]为重叠面积占bboxes1[i]面积的比例."""
+    bboxes1 = bboxes_to_array(bboxes1) if not isinstance(bboxes1, np.ndarray) else bboxes1
+    intersection_area = pairwise_intersection_area(bboxes1, bboxes2)
+    return _safe_divide(intersection_area, bboxes_area(bboxes1)[:, None])
+
+
+def pairwise_overlap_area_2_minbox_area_ratio(bboxes1, bboxes2) -> np.ndarray:
+    """批量版本的calculate_overlap_area_2_minbox_area_ratio，返回 (N, M) 矩阵，[i, j]为重叠面积占较小bbox面积的比例."""
+    bboxes1 = bboxes_to_array(bboxes1) if not isinstance(bboxes1, np.ndarray) else bboxes1
+    bboxes2 = bboxes_to_array(bboxes2) if not isinstance(bboxes2, np.ndarray) else bboxes2
+    intersection_area = pairwise_intersection_area(bboxes1, bboxes2)
+    min_box_area = np.minimum(bboxes_area(bboxes1)[:, None], bboxes_area(bboxes2)[None, :])
+    return _safe_divide(intersection_area, min_box_area)
+
+
+class BboxGridIndex:
+    """基于均匀网格的bbox空间索引，用于在大量bbox中快速找出与给定bbox相交的候选项.
+
+    每个bbox登记到它覆盖的所有网格中，查询时只需检查查询框覆盖的网格，
+    把页面内两两比较的O(n^2)开销降到接近O(n)。x0>x1或y0>y1的非法bbox与任何bbox的重叠面积都为0，不会被登记。
+
+    Args:
+        bboxes (list): bbox列表，格式为 [x0, y0, x1, y1]。
+        cell_size (float): 网格边长，默认取所有bbox宽高的平均值。
+    """
+
+    # 覆盖网格数超过该值的大bbox不登记到网格中，每次查询都直接参与精确判断
+    MAX_CELLS_PER_BBOX = 64
+
+    def __init__(self, bboxes, cell_size=None):
+        self.bboxes = [bbox[0:4] for bbox in bboxes]
+        valid_bboxes = [bbox for bbox in self.bboxes if bbox[0] <= bbox[2] and bbox[1] <= bbox[3]]
+        if cell_size is None:
+            if valid_bboxes:
+                cell_size = sum(
+                    (bbox[2] - bbox[0]) + (bbox[3] - bbox[1]) for bbox in valid_bboxes
+                ) / (2 * len(valid_bboxes))
+            else:
+                cell_size = 1
+        self.cell_size = max(float(cell_size), 1.0)
+        self._cells = defaultdict(list)
+        self._large_indices = []
+        for idx, bbox in enumerate(self.bboxes):
+            if bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+                continue
+            x_start, y_start, x_end, y_end = self._cell_range(bbox)
+            if (x_end - x_start + 1) * (y_end - y_start + 1) > self.MAX_CELLS_PER_BBOX:
+                self._large_indices.append(idx)
+                continue
+            for cx in range(x_start, x_end + 1):
+                for cy in range(y_start, y_end + 1):
+                    self._cells[(cx, cy)].append(idx)
+
+    def _cell_range(self, bbox):
+        return (
+            math.floor(bbox[0] / self.cell_size),
+            math.floor(bbox[1] / self.cell_size),
+            math.floor(bbox[2] / self.cell_size),
+            math.floor(bbox[3] / self.cell_size),
+        )
+
+    def __len__(self):
+        return len(self.bboxes)
+
+    def query(self, bbox):
+        """返回与bbox相交(含边界接触)的bbox下标，按下标升序排列."""
+        if bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            return []
+        x_start, y_start, x_end, y_end = self._cell_range(bbox)
+        if (x_end - x_start + 1) * (y_end - y_start + 1) > len(self.bboxes):
+            # 查询框覆盖的网格比bbox总数还多时，直接遍历更快
+            candidates = range(len(self.bboxes))
+        else:
+            candidates = set(self._large_indices)
+            for cx in range(x_start, x_end + 1):
+                for cy in range(y_start, y_end + 1):
+                    candidates.update(self._cells.get((cx, cy), ()))
+            candidates = sorted(candidates)
+        x0, y0, x1, y1 = bbox[0:4]
+        result = []
+        for idx in candidates:
+            other = self.bboxes[idx]
+            if max(x0, other[0]) <= min(x1, other[2]) and max(y0, other[1]) <= min(y1, other[3]):
+                result.append(idx)
+        return result
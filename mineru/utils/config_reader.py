@@ -102,6 +102,41 @@ def get_table_enable(table_enable):
     return table_enable
 
 
+def get_pipeline_streaming_enable(streaming_enable=False):
+    streaming_enable_env = os.getenv('MINERU_PIPELINE_STREAMING_ENABLE')
+    streaming_enable = streaming_enable if streaming_enable_env is None else streaming_enable_env.lower() == 'true'
+    return streaming_enable
+
+
+def get_pipeline_overlap_enable(overlap_enable=False):
+    overlap_enable_env = os.getenv('MINERU_PIPELINE_OVERLAP_ENABLE')
+    overlap_enable = overlap_enable if overlap_enable_env is None else overlap_enable_env.lower() == 'true'
+    return overlap_enable
+
+
+def get_page_classify_enable(page_classify_enable=True):
+    page_classify_enable_env = os.getenv('MINERU_PAGE_CLASSIFY_ENABLE')
+    page_classify_enable = page_classify_enable if page_classify_enable_env is None else page_classify_enable_env.lower() == 'true'
+    return page_classify_enable
+
+
+def get_quantize_enable(device) -> bool:
+    """MINERU_CPU_QUANTIZE=true时在cpu上对模型做int8动态量化，默认关闭，gpu/npu/mps上不生效"""
+    quantize_env = os.getenv('MINERU_CPU_QUANTIZE', 'false')
+    return quantize_env.lower() == 'true' and str(device).startswith('cpu')
+
+
+def get_ocr_onnx_enable() -> bool:
+    """MINERU_OCR_BACKEND=onnx时det/rec/cls使用onnxruntime推理，默认torch"""
+    return os.getenv('MINERU_OCR_BACKEND', 'torch').lower() == 'onnx'
+
+
+def get_s3_write_workers() -> int:
+    """S3DataWriter异步上传的线程数，读取MINERU_S3_WRITE_WORKERS，未设置时为0（同步上传）。
+    MinerU自身创建的writer不读取该值，只在调用方显式传入max_workers=get_s3_write_workers()时生效"""
+    return int(os.getenv('MINERU_S3_WRITE_WORKERS', 0))
+
+
 def get_latex_delimiter_config():
     config = read_config()
     if config is None:
@@ -1,6 +1,101 @@
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
 from loguru import logger
 
-from .pdf_image_tools import cut_image
+from .pdf_image_tools import cut_image, get_cut_image_path, crop_and_encode_jpeg
+
+
+class ImageCutQueue:
+    """
+    延迟执行的截图任务。
+
+    submit时只计算图片路径并立即返回，裁剪、jpg编码和写入在线程池中执行，与后续页面的处理重叠；
+    PIL编码时会释放GIL，多线程可以并行编码。
+    排队中的任务数有上限，任务会持有整页图片的引用，上限避免编码慢于生产时页面图片堆积在内存中。
+    flush(image_writer)等待该writer的所有截图写完，并抛出其中第一个错误；出错退出时用discard(image_writer)
+    等待截图结束并丢弃其错误。两者都会移除该writer的记录。
+    """
+
+    def __init__(self, max_workers: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image_cut')
+        self._slots = threading.BoundedSemaphore(max_workers * 8)
+        self._lock = threading.Lock()
+        # image_writer -> 自上次flush/discard以来提交的future，writer被回收时记录随之删除
+        self._jobs = weakref.WeakKeyDictionary()
+
+    def submit(self, bbox, page_id, page_pil_img, return_path, image_writer, scale=2) -> str:
+        img_path = get_cut_image_path(bbox, page_id, return_path)
+        self._slots.acquire()
+        with self._lock:
+            future = self._executor.submit(
+                self._cut, bbox, page_pil_img, img_path, image_writer, scale
+            )
+            self._jobs.setdefault(image_writer, []).append(future)
+        future.add_done_callback(lambda f: self._slots.release())
+        return img_path
+
+    def _cut(self, bbox, page_pil_img, img_path, image_writer, scale):
+        """
+        返回截图时的错误而不是抛出。错误保存到flush时才上报，去掉traceback，
+        避免经由栈帧引用image_writer和整页图片，使writer和页面图片无法被回收
+        """
+        try:
+            img_bytes = crop_and_encode_jpeg(bbox, page_pil_img, scale=scale)
+            image_writer.write(img_path, img_bytes)
+        except Exception as e:
+            logger.error(f'failed to cut image {img_path}: {e}')
+            return e.with_traceback(None)
+        return None
+
+    def _pop_jobs(self, image_writer) -> list:
+        """移除image_writer的记录并等待其截图结束，返回其中的错误"""
+        with self._lock:
+            futures = self._jobs.pop(image_writer, [])
+        return [error for error in (future.result() for future in futures) if error is not None]
+
+    def flush(self, image_writer) -> None:
+        errors = self._pop_jobs(image_writer)
+        if errors:
+            raise errors[0]
+
+    def discard(self, image_writer) -> None:
+        self._pop_jobs(image_writer)
+
+
+_image_cut_queue = None
+_image_cut_queue_lock = threading.Lock()
+
+
+def get_image_cut_workers() -> int:
+    """截图编码的线程数，可通过环境变量MINERU_IMAGE_CUT_WORKERS设置，默认为min(4, cpu核数)，0表示在主线程中同步执行"""
+    return max(0, int(os.getenv('MINERU_IMAGE_CUT_WORKERS', min(4, os.cpu_count() or 1))))
+
+
+def get_image_cut_queue():
+    global _image_cut_queue
+    max_workers = get_image_cut_workers()
+    if max_workers == 0:
+        return None
+    with _image_cut_queue_lock:
+        if _image_cut_queue is None:
+            _image_cut_queue = ImageCutQueue(max_workers)
+        return _image_cut_queue
+
+
+def flush_image_cut_jobs(image_writer) -> None:
+    """等待image_writer的所有延迟截图写完，middle_json输出之前需要调用"""
+    # 不受MINERU_IMAGE_CUT_WORKERS后续变化的影响，已提交的截图总是需要等待
+    if _image_cut_queue is not None and image_writer:
+        _image_cut_queue.flush(image_writer)
+
+
+def discard_image_cut_jobs(image_writer) -> None:
+    """等待image_writer的延迟截图结束并丢弃其错误，middle_json构造出错退出时调用，避免错误残留到该writer的下一次flush"""
+    if _image_cut_queue is not None and image_writer:
+        _image_cut_queue.discard(image_writer)
 
 
 def cut_image_and_table(span, page_pil_img, page_img_md5, page_id, image_writer, scale=2):
@@ -13,9 +108,15 @@ def cut_image_and_table(span, page_pil_img, page_img_md5, page_id, image_writer,
     if not check_img_bbox(span["bbox"]) or not image_writer:
         span["image_path"] = ""
     else:
-        span["image_path"] = cut_image(
-            span["bbox"], page_id, page_pil_img, return_path=return_path(span_type), image_writer=image_writer, scale=scale
-        )
+        image_cut_queue = get_image_cut_queue()
+        if image_cut_queue is None:
+            span["image_path"] = cut_image(
+                span["bbox"], page_id, page_pil_img, return_path=return_path(span_type), image_writer=image_writer, scale=scale
+            )
+        else:
+            span["image_path"] = image_cut_queue.submit(
+                span["bbox"], page_id, page_pil_img, return_path(span_type), image_writer, scale=scale
+            )
 
     return span
 
@@ -5,7 +5,8 @@ from PIL import Image
 from loguru import logger
 import numpy as np
 
-from mineru.utils.boxbase import get_minbox_if_overlap_by_ratio
+from mineru.utils.boxbase import bboxes_to_array, bboxes_area, pairwise_intersection_area, pairwise_iou, \
+    pairwise_overlap_area_2_minbox_area_ratio
 
 try:
     import torch
@@ -55,53 +56,12 @@ def get_coords_and_area(block_with_poly):
     return xmin, ymin, xmax, ymax, area
 
 
-def calculate_intersection(box1, box2):
-    """Calculate intersection coordinates between two boxes."""
-    intersection_xmin = max(box1[0], box2[0])
-    intersection_ymin = max(box1[1], box2[1])
-    intersection_xmax = min(box1[2], box2[2])
-    intersection_ymax = min(box1[3], box2[3])
-
-    # Check if intersection is valid
-    if intersection_xmax <= intersection_xmin or intersection_ymax <= intersection_ymin:
-        return None
-
-    return intersection_xmin, intersection_ymin, intersection_xmax, intersection_ymax
-
-
-def calculate_iou(box1, box2):
-    """Calculate IoU between two boxes."""
-    intersection = calculate_intersection(box1[:4], box2[:4])
-
-    if not intersection:
-        return 0
-
-    intersection_xmin, intersection_ymin, intersection_xmax, intersection_ymax = intersection
-    intersection_area = (intersection_xmax - intersection_xmin) * (intersection_ymax - intersection_ymin)
-
-    area1, area2 = box1[4], box2[4]
-    union_area = area1 + area2 - intersection_area
-
-    return intersection_area / union_area if union_area > 0 else 0
-
-
-def is_inside(small_box, big_box, overlap_threshold=0.8):
-    """Check if small_box is inside big_box by at least overlap_threshold."""
-    intersection = calculate_intersection(small_box[:4], big_box[:4])
-
-    if not intersection:
-        return False
-
-    intersection_xmin, intersection_ymin, intersection_xmax, intersection_ymax = intersection
-    intersection_area = (intersection_xmax - intersection_xmin) * (intersection_ymax - intersection_ymin)
-
-    # Check if overlap exceeds threshold
-    return intersection_area >= overlap_threshold * small_box[4]
-
-
-def do_overlap(box1, box2):
-    """Check if two boxes overlap."""
-    return calculate_intersection(box1[:4], box2[:4]) is not None
+def is_inside_matrix(box_info, overlap_threshold=0.8):
+    """Check all pairs of boxes, [i, j] means box_info[i] is inside box_info[j] by at least overlap_threshold."""
+    boxes = bboxes_to_array(box_info)
+    intersection_area = pairwise_intersection_area(boxes, boxes)
+    small_area = np.array([box[4] for box in box_info], dtype=np.float64)
+    return (intersection_area > 0) & (intersection_area >= overlap_threshold * small_area[:, None])
 
 
 def merge_high_iou_tables(table_res_list, layout_res, table_indices, iou_threshold=0.7):
@@ -114,58 +74,51 @@ def merge_high_iou_tables(table_res_list, layout_res, table_indices, iou_thresho
 
     while merged:
         merged = False
-        i = 0
-        while i < len(table_res_list) - 1:
-            j = i + 1
-            while j < len(table_res_list):
-                iou = calculate_iou(table_info[i], table_info[j])
-
-                if iou > iou_threshold:
-                    # Merge tables by taking their union
-                    x1_min, y1_min, x1_max, y1_max, _ = table_info[i]
-                    x2_min, y2_min, x2_max, y2_max, _ = table_info[j]
-
-                    union_xmin = min(x1_min, x2_min)
-                    union_ymin = min(y1_min, y2_min)
-                    union_xmax = max(x1_max, x2_max)
-                    union_ymax = max(y1_max, y2_max)
-
-                    # Create merged table
-                    merged_table = table_res_list[i].copy()
-                    merged_table['poly'] = [
-                        union_xmin, union_ymin, union_xmax, union_ymin,
-                        union_xmax, union_ymax, union_xmin, union_ymax
-                    ]
-                    # Update layout_res
-                    to_remove = [table_indices[j], table_indices[i]]
-                    for idx in sorted(to_remove, reverse=True):
-                        del layout_res[idx]
-                    layout_res.append(merged_table)
-
-                    # Update tracking lists
-                    table_indices = [k if k < min(to_remove) else
-                                     k - 1 if k < max(to_remove) else
-                                     k - 2 if k > max(to_remove) else
-                                     len(layout_res) - 1
-                                     for k in table_indices
-                                     if k not in to_remove]
-                    table_indices.append(len(layout_res) - 1)
-
-                    # Update table lists
-                    table_res_list.pop(j)
-                    table_res_list.pop(i)
-                    table_res_list.append(merged_table)
-
-                    # Update table_info
-                    table_info = [get_coords_and_area(table) for table in table_res_list]
-
-                    merged = True
-                    break
-                j += 1
-
-            if merged:
-                break
-            i += 1
+        # 按原先的遍历顺序找到第一对IoU超过阈值的表格
+        table_boxes = bboxes_to_array(table_info)
+        candidates = np.argwhere(np.triu(pairwise_iou(table_boxes, table_boxes) > iou_threshold, k=1))
+        if len(candidates) > 0:
+            i, j = (int(idx) for idx in candidates[0])
+
+            # Merge tables by taking their union
+            x1_min, y1_min, x1_max, y1_max, _ = table_info[i]
+            x2_min, y2_min, x2_max, y2_max, _ = table_info[j]
+
+            union_xmin = min(x1_min, x2_min)
+            union_ymin = min(y1_min, y2_min)
+            union_xmax = max(x1_max, x2_max)
+            union_ymax = max(y1_max, y2_max)
+
+            # Create merged table
+            merged_table = table_res_list[i].copy()
+            merged_table['poly'] = [
+                union_xmin, union_ymin, union_xmax, union_ymin,
+                union_xmax, union_ymax, union_xmin, union_ymax
+            ]
+            # Update layout_res
+            to_remove = [table_indices[j], table_indices[i]]
+            for idx in sorted(to_remove, reverse=True):
+                del layout_res[idx]
+            layout_res.append(merged_table)
+
+            # Update tracking lists
+            table_indices = [k if k < min(to_remove) else
+                             k - 1 if k < max(to_remove) else
+                             k - 2 if k > max(to_remove) else
+                             len(layout_res) - 1
+                             for k in table_indices
+                             if k not in to_remove]
+            table_indices.append(len(layout_res) - 1)
+
+            # Update table lists
+            table_res_list.pop(j)
+            table_res_list.pop(i)
+            table_res_list.append(merged_table)
+
+            # Update table_info
+            table_info = [get_coords_and_area(table) for table in table_res_list]
+
+            merged = True
 
     return table_res_list, table_indices
 
@@ -176,19 +129,19 @@ def filter_nested_tables(table_res_list, overlap_threshold=0.8, area_threshold=0
         return table_res_list
 
     table_info = [get_coords_and_area(table) for table in table_res_list]
+    table_boxes = bboxes_to_array(table_info)
+    inside_matrix = is_inside_matrix(table_info, overlap_threshold)
+    overlap_matrix = pairwise_intersection_area(table_boxes, table_boxes) > 0
     big_tables_idx = []
 
     for i in range(len(table_res_list)):
         # Find tables inside this one
-        tables_inside = [j for j in range(len(table_res_list))
-                         if i != j and is_inside(table_info[j], table_info[i], overlap_threshold)]
+        tables_inside = [j for j in np.flatnonzero(inside_matrix[:, i]).tolist() if i != j]
 
         # Continue if there are at least 3 tables inside
         if len(tables_inside) >= 3:
             # Check if inside tables overlap with each other
-            tables_overlap = any(do_overlap(table_info[tables_inside[idx1]], table_info[tables_inside[idx2]])
-                                 for idx1 in range(len(tables_inside))
-                                 for idx2 in range(idx1 + 1, len(tables_inside)))
+            tables_overlap = bool(np.triu(overlap_matrix[np.ix_(tables_inside, tables_inside)], k=1).any())
 
             # If no overlaps, check area condition
             if not tables_overlap:
@@ -209,46 +162,57 @@ def remove_overlaps_min_blocks(res_list):
     # 重叠block，小的不能直接删除，需要和大的那个合并成一个更大的。
     # 删除重叠blocks中较小的那些
     need_remove = []
+    bboxes = bboxes_to_array([res['bbox'] for res in res_list])
+    overlap_matrix = pairwise_overlap_area_2_minbox_area_ratio(bboxes, bboxes)
     for i in range(len(res_list)):
         # 如果当前元素已在需要移除列表中，则跳过
         if res_list[i] in need_remove:
             continue
 
-        for j in range(i + 1, len(res_list)):
+        j = i + 1
+        while j < len(res_list):
+            # 只有重叠比例超过阈值的块对才需要处理，直接跳到下一个这样的块
+            hits = np.flatnonzero(overlap_matrix[i, j:] > 0.8)
+            if len(hits) == 0:
+                break
+            j += int(hits[0])
+
             # 如果比较对象已在需要移除列表中，则跳过
             if res_list[j] in need_remove:
+                j += 1
                 continue
 
-            overlap_box = get_minbox_if_overlap_by_ratio(
-                res_list[i]['bbox'], res_list[j]['bbox'], 0.8
-            )
-
-            if overlap_box is not None:
-
-                # 根据重叠框确定哪个是小块，哪个是大块
-                if overlap_box == res_list[i]['bbox']:
-                    small_res, large_res = res_list[i], res_list[j]
-                elif overlap_box == res_list[j]['bbox']:
-                    small_res, large_res = res_list[j], res_list[i]
-                else:
-                    continue  # 如果重叠框与任一块都不匹配，跳过处理
-
-                if small_res['score'] <= large_res['score']:
-                    # 如果小块的分数低于大块，则小块为需要移除的块
-                    if small_res is not None and small_res not in need_remove:
-                        # 更新大块的边界为两者的并集
-                        x1, y1, x2, y2 = large_res['bbox']
-                        sx1, sy1, sx2, sy2 = small_res['bbox']
-                        x1 = min(x1, sx1)
-                        y1 = min(y1, sy1)
-                        x2 = max(x2, sx2)
-                        y2 = max(y2, sy2)
-                        large_res['bbox'] = [x1, y1, x2, y2]
-                        need_remove.append(small_res)
-                else:
-                    # 如果大块的分数低于小块，则大块为需要移除的块, 这时不需要更新小块的边界
-                    if large_res is not None and large_res not in need_remove:
-                        need_remove.append(large_res)
+            # 根据面积确定哪个是小块，哪个是大块，面积相同时前一个为小块
+            area_i, area_j = bboxes_area(bboxes[[i, j]]).tolist()
+            if area_i <= area_j:
+                small_res, large_res, large_idx = res_list[i], res_list[j], j
+            else:
+                small_res, large_res, large_idx = res_list[j], res_list[i], i
+
+            if small_res['score'] <= large_res['score']:
+                # 如果小块的分数低于大块，则小块为需要移除的块
+                if small_res is not None and small_res not in need_remove:
+                    # 更新大块的边界为两者的并集
+                    x1, y1, x2, y2 = large_res['bbox']
+                    sx1, sy1, sx2, sy2 = small_res['bbox']
+                    x1 = min(x1, sx1)
+                    y1 = min(y1, sy1)
+                    x2 = max(x2, sx2)
+                    y2 = max(y2, sy2)
+                    large_res['bbox'] = [x1, y1, x2, y2]
+                    need_remove.append(small_res)
+                    # 大块边界变化后，更新它与其他块的重叠比例
+                    bboxes[large_idx] = large_res['bbox']
+                    large_overlap = pairwise_overlap_area_2_minbox_area_ratio(
+                        bboxes[large_idx:large_idx + 1], bboxes
+                    )[0]
+                    overlap_matrix[large_idx, :] = large_overlap
+                    overlap_matrix[:, large_idx] = large_overlap
+            else:
+                # 如果大块的分数低于小块，则大块为需要移除的块, 这时不需要更新小块的边界
+                if large_res is not None and large_res not in need_remove:
+                    need_remove.append(large_res)
+            j += 1
 
     # 从列表中移除标记的元素
     for res in need_remove:
@@ -293,6 +257,8 @@ def remove_overlaps_low_confidence_blocks(combined_res_list, overlap_threshold=0
 
     blocks_to_remove = []
     marked_indices = set()  # 跟踪已标记为删除的block索引
+    # block_info在处理过程中不会更新，可以一次算出所有block之间的包含关系
+    inside_matrix = is_inside_matrix(block_info, overlap_threshold)
 
     # 检查每个block内部是否有3个及以上的小block
     for i, (xmin, ymin, xmax, ymax, area, score, block) in enumerate(block_info):
@@ -301,10 +267,8 @@ def remove_overlaps_low_confidence_blocks(combined_res_list, overlap_threshold=0
             continue
 
         # 查找内部的小block (仅考虑尚未被标记为删除的block)
-        blocks_inside = [(j, j_score, j_block) for j, (xj_min, yj_min, xj_max, yj_max, j_area, j_score, j_block) in
-                         enumerate(block_info)
-                         if i != j and j not in marked_indices and is_inside(block_info[j], block_info[i],
-                                                                             overlap_threshold)]
+        blocks_inside = [(j, block_info[j][5], block_info[j][6]) for j in np.flatnonzero(inside_matrix[:, i]).tolist()
+                         if i != j and j not in marked_indices]
 
         # 如果内部有3个及以上的小block
         if len(blocks_inside) >= 2:
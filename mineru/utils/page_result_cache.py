@@ -0,0 +1,248 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from loguru import logger
+
+from mineru.data.data_reader_writer import DataReader, DataWriter, FileBasedDataReader, FileBasedDataWriter
+from mineru.utils.config_reader import get_device, get_ocr_onnx_enable, get_quantize_enable
+from mineru.utils.enum_class import ModelPath
+from mineru.utils.hash_utils import bytes_md5, dict_md5
+from mineru.version import __version__
+
+
+class PageResultCache:
+    """按页面内容寻址的推理结果缓存，value为单页的layout_dets。
+
+    缓存内容通过DataReader/DataWriter读写，因此可以落在本地目录或s3上；
+    索引文件记录每个条目的大小和访问顺序，总大小超过max_size时按LRU淘汰。
+    多个进程可以共享同一个缓存目录：flush时重新读取磁盘上的索引，与本进程新增、访问和删除的条目合并后再写回，
+    并在合并后的索引上淘汰，其他进程写入的条目同样计入大小上限。
+    lock_path不为None时合并过程持有该文件上的进程间锁，否则多个进程同时flush可能丢失部分索引更新。
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, reader: DataReader, writer: DataWriter, max_size: int = 1024 * 1024 * 1024,
+                 lock_path: str = None):
+        self._reader = reader
+        self._writer = writer
+        self._max_size = max_size
+        self._lock_path = lock_path
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> entry bytes, 按访问时间从旧到新排列
+        self._total_size = 0
+        # 上次flush之后本进程新增或访问的条目(按访问时间从旧到新)和删除的条目，flush时合并到磁盘上的索引
+        self._touched = OrderedDict()
+        self._removed = set()
+        self.hits = 0
+        self.misses = 0
+        self._index.update(self._read_index())
+        self._total_size = sum(self._index.values())
+
+    def _read_index(self) -> OrderedDict:
+        try:
+            index = json.loads(self._reader.read(self.INDEX_FILE))
+        except Exception:
+            return OrderedDict()
+        return OrderedDict((key, size) for key, size in index)
+
+    @staticmethod
+    def _entry_path(key: str) -> str:
+        return f'{key[:2]}/{key}.json'
+
+    def _touch(self, key: str, size: int) -> None:
+        # 调用方需持有self._lock
+        self._touched.pop(key, None)
+        self._touched[key] = size
+        self._removed.discard(key)
+
+    def get(self, key: str) -> list | None:
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self._touch(key, self._index[key])
+        try:
+            layout_dets = json.loads(self._reader.read(self._entry_path(key)))
+        except Exception as e:
+            # 条目可能已被其他进程淘汰
+            logger.debug(f'page cache entry {key} is unavailable, ignore it: {e}')
+            with self._lock:
+                self._total_size -= self._index.pop(key, 0)
+                self._touched.pop(key, None)
+                self._removed.add(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return layout_dets
+
+    def put(self, key: str, layout_dets: list) -> None:
+        try:
+            data = json.dumps(layout_dets, ensure_ascii=False).encode('utf-8')
+        except (TypeError, ValueError) as e:
+            logger.warning(f'page result is not serializable, skip caching: {e}')
+            return
+        if len(data) > self._max_size:
+            return
+        self._writer.write(self._entry_path(key), data)
+        with self._lock:
+            self._total_size += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._touch(key, len(data))
+
+    def _remove_entry(self, key: str) -> None:
+        # DataWriter没有统一的删除接口，不支持删除的后端用空内容覆盖
+        delete = getattr(self._writer, 'delete', None)
+        try:
+            if delete is not None:
+                delete(self._entry_path(key))
+            else:
+                self._writer.write(self._entry_path(key), b'')
+        except Exception as e:
+            logger.warning(f'failed to evict page cache entry {key}: {e}')
+
+    @contextmanager
+    def _index_file_lock(self):
+        if self._lock_path is None:
+            yield
+            return
+        with open(self._lock_path, 'a+b') as lock_file:
+            if os.name == 'nt':
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._touched and not self._removed:
+                return
+            touched = self._touched
+            removed = self._removed
+            self._touched = OrderedDict()
+            self._removed = set()
+        # 后台写入的writer在这里等待条目写完，之后索引才能引用它们
+        self._writer.flush()
+        with self._index_file_lock():
+            index = self._read_index()
+            for key in removed:
+                index.pop(key, None)
+            for key, size in touched.items():
+                index.pop(key, None)
+                index[key] = size
+            total_size = sum(index.values())
+            evicted_keys = []
+            while total_size > self._max_size and index:
+                evicted_key, size = index.popitem(last=False)
+                total_size -= size
+                evicted_keys.append(evicted_key)
+            self._writer.write(self.INDEX_FILE, json.dumps(list(index.items())).encode('utf-8'))
+            self._writer.flush()
+            for evicted_key in evicted_keys:
+                self._remove_entry(evicted_key)
+        with self._lock:
+            # flush之后本进程又新增或访问的条目保持在最新的位置
+            for key, size in self._touched.items():
+                index.pop(key, None)
+                index[key] = size
+            for key in self._removed:
+                index.pop(key, None)
+            self._index = index
+            self._total_size = sum(index.values())
+
+
+PIPELINE_MODEL_PATHS = [
+    ModelPath.doclayout_yolo, ModelPath.yolo_v8_mfd, ModelPath.unimernet_small,
+    ModelPath.pytorch_paddle, ModelPath.slanet_plus, ModelPath.unet_structure,
+    ModelPath.paddle_table_cls, ModelPath.paddle_orientation_classification,
+]
+
+
+def get_pipeline_models_root() -> str:
+    """pipeline模型所在的根目录，与模型初始化时的解析方式相同，layout模型总会被用到，下载它不会浪费"""
+    from mineru.utils.models_download_utils import auto_download_and_get_model_root_path
+    return auto_download_and_get_model_root_path(ModelPath.doclayout_yolo)
+
+
+@lru_cache(maxsize=None)
+def get_models_fingerprint(model_source: str) -> list:
+    """
+    当前使用的模型权重的指纹，由权重文件的路径、大小和修改时间组成，
+    重新下载或更新权重、切换模型源或models-dir后缓存键随之改变。
+    每个进程只计算一次；尚未下载的权重不计入，下载后下一个进程的缓存键会变化，相当于缓存失效一次。
+    """
+    root = get_pipeline_models_root()
+    fingerprint = [model_source, os.path.abspath(root)]
+    for model_path in PIPELINE_MODEL_PATHS:
+        full_path = os.path.join(root, model_path)
+        if os.path.isdir(full_path):
+            file_paths = sorted(
+                os.path.join(dir_path, file_name)
+                for dir_path, _, file_names in os.walk(full_path) for file_name in file_names
+            )
+        elif os.path.isfile(full_path):
+            file_paths = [full_path]
+        else:
+            file_paths = []
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            fingerprint.append([os.path.relpath(file_path, root), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def get_page_cache_key(pil_img, lang, ocr_enable, formula_enable, table_enable, backend='pipeline') -> str:
+    """缓存键由页面像素哈希和所有影响推理结果的配置共同决定"""
+    device = get_device()
+    config = {
+        'backend': backend,
+        'version': __version__,
+        'models': get_models_fingerprint(os.getenv('MINERU_MODEL_SOURCE', 'huggingface')),
+        # cuda上模型以fp16推理，cpu上为fp32，结果不完全一致
+        'device': str(device).split(':')[0],
+        'lang': lang,
+        'ocr': bool(ocr_enable),
+        'formula': bool(formula_enable),
+        'table': bool(table_enable),
+        # int8量化和onnx推理的结果与fp32 torch推理不完全一致，不能互相复用
+        'quantize': get_quantize_enable(device),
+        'ocr_onnx': get_ocr_onnx_enable(),
+        'size': list(pil_img.size),
+    }
+    return f'{bytes_md5(pil_img.tobytes())}_{dict_md5(config)}'
+
+
+_page_result_cache = None
+
+
+def get_page_result_cache() -> PageResultCache | None:
+    """通过环境变量MINERU_PAGE_CACHE_DIR启用本地磁盘缓存，MINERU_PAGE_CACHE_MAX_SIZE设置缓存上限(MB)，默认1024"""
+    global _page_result_cache
+    cache_dir = os.getenv('MINERU_PAGE_CACHE_DIR')
+    if not cache_dir:
+        return None
+    if _page_result_cache is None:
+        max_size = int(os.getenv('MINERU_PAGE_CACHE_MAX_SIZE', 1024)) * 1024 * 1024
+        os.makedirs(cache_dir, exist_ok=True)
+        _page_result_cache = PageResultCache(
+            FileBasedDataReader(cache_dir), FileBasedDataWriter(cache_dir), max_size=max_size,
+            lock_path=os.path.join(cache_dir, 'index.lock'),
+        )
+    return _page_result_cache
@@ -1,8 +1,10 @@
 # Copyright (c) Opendatalab. All rights reserved.
+import ctypes
 import re
 from io import BytesIO
 import numpy as np
 import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
 from loguru import logger
 from pdfminer.high_level import extract_text
 from pdfminer.pdfparser import PDFParser
@@ -14,10 +16,206 @@ from pdfminer.layout import LAParams, LTImage, LTFigure
 from pdfminer.converter import PDFPageAggregator
 
 
+# 每页平均少于50个有效字符时认为需要OCR
+CHARS_THRESHOLD = 50
+# 乱码字符超过5%时认为是乱码文档
+INVALID_CHARS_RATIO_THRESHOLD = 0.05
+# 图片覆盖80%以上的页面算作高覆盖率页面，高覆盖率页面占80%以上时需要OCR
+IMAGE_COVERAGE_THRESHOLD = 0.8
+# pdf权限位中的"复制或提取文本"
+PDF_PERM_EXTRACT = 0x10
+
+
 def classify(pdf_bytes):
     """
     判断PDF文件是可以直接提取文本还是需要OCR
 
+    随机抽取最多10页，在pypdfium2的页面上一次遍历完成有效字符数、乱码字符比例和图片覆盖率三项检查，
+    判断规则与classify_legacy一致，不再构建抽样pdf，也不再使用pdfminer重复解析。
+
+    Args:
+        pdf_bytes: PDF文件的字节数据
+
+    Returns:
+        str: 'txt' 表示可以直接提取文本，'ocr' 表示需要OCR
+    """
+    try:
+        pdf = pdfium.PdfDocument(pdf_bytes)
+    except Exception as e:
+        logger.error(f"判断PDF类型时出错: {e}")
+        return 'ocr'
+
+    try:
+        page_count = len(pdf)
+        if page_count == 0:
+            return 'ocr'
+
+        # 文档不允许提取文本时与pdfminer的处理一致，按需要OCR处理
+        if not pdfium_c.FPDF_GetDocPermissions(pdf.raw) & PDF_PERM_EXTRACT:
+            return 'ocr'
+
+        page_indices = sample_page_indices(page_count)
+        cleaned_chars = 0
+        valid_chars = 0
+        invalid_chars = 0
+        high_image_coverage_pages = 0
+        for page_index in page_indices:
+            page = pdf[page_index]
+            try:
+                page_stats = get_page_classify_stats(page)
+            finally:
+                page.close()
+            cleaned_chars += page_stats['cleaned_chars']
+            valid_chars += page_stats['valid_chars']
+            invalid_chars += page_stats['invalid_chars']
+            if page_stats['image_coverage_ratio'] >= IMAGE_COVERAGE_THRESHOLD:
+                high_image_coverage_pages += 1
+
+        if cleaned_chars / len(page_indices) < CHARS_THRESHOLD:
+            return 'ocr'
+
+        if valid_chars > 0 and invalid_chars / valid_chars > INVALID_CHARS_RATIO_THRESHOLD:
+            return 'ocr'
+
+        if high_image_coverage_pages / len(page_indices) >= IMAGE_COVERAGE_THRESHOLD:
+            return 'ocr'
+
+        return 'txt'
+
+    except Exception as e:
+        logger.error(f"判断PDF类型时出错: {e}")
+        # 出错时默认使用OCR
+        return 'ocr'
+
+    finally:
+        pdf.close()
+
+
+def classify_pages(pdf_bytes) -> list:
+    """
+    逐页判断PDF的每一页是可以直接提取文本还是需要OCR
+
+    对所有页面使用与classify相同的统计指标，按单页判断：乱码字符比例超过INVALID_CHARS_RATIO_THRESHOLD、
+    图片覆盖率达到IMAGE_COVERAGE_THRESHOLD或没有字符但有图片/路径内容的页面需要OCR。
+    与classify不同，有效字符少于CHARS_THRESHOLD的单页不会仅因字符少而判为OCR，见is_page_need_ocr。
+    文档无法打开或不允许提取文本时所有页面都需要OCR。
+
+    Args:
+        pdf_bytes: PDF文件的字节数据
+
+    Returns:
+        list: 每页对应的'txt'或'ocr'，无法打开时返回空列表
+    """
+    try:
+        pdf = pdfium.PdfDocument(pdf_bytes)
+    except Exception as e:
+        logger.error(f"判断PDF类型时出错: {e}")
+        return []
+
+    try:
+        page_count = len(pdf)
+        if not pdfium_c.FPDF_GetDocPermissions(pdf.raw) & PDF_PERM_EXTRACT:
+            return ['ocr'] * page_count
+
+        page_types = []
+        for page_index in range(page_count):
+            page = pdf[page_index]
+            try:
+                page_stats = get_page_classify_stats(page)
+            except Exception as e:
+                logger.warning(f"判断第{page_index}页类型时出错: {e}")
+                page_types.append('ocr')
+                continue
+            finally:
+                page.close()
+            page_types.append('ocr' if is_page_need_ocr(page_stats) else 'txt')
+        return page_types
+
+    finally:
+        pdf.close()
+
+
+def is_page_need_ocr(page_stats) -> bool:
+    """
+    按get_page_classify_stats的单页统计结果判断该页是否需要OCR
+
+    只有存在扫描证据时才需要OCR：乱码字符比例超过阈值，图片覆盖率达到阈值，
+    或页面没有任何可提取的字符但有图片或路径内容（文字转为曲线、裁剪到内容区域的扫描图等）。
+    单页字符少本身不是扫描证据（章节页、图表页等），这类页面没有大图覆盖时保留文本层，空白页也不需要OCR。
+    """
+    if page_stats['cleaned_chars'] == 0 and page_stats['graphic_objects'] > 0:
+        return True
+    valid_chars = page_stats['valid_chars']
+    if valid_chars > 0 and page_stats['invalid_chars'] / valid_chars > INVALID_CHARS_RATIO_THRESHOLD:
+        return True
+    return page_stats['image_coverage_ratio'] >= IMAGE_COVERAGE_THRESHOLD
+
+
+def sample_page_indices(page_count, max_pages=10) -> list:
+    """与extract_pages相同的方式随机选择最多max_pages页"""
+    select_page_cnt = min(max_pages, page_count)
+    return np.random.choice(page_count, select_page_cnt, replace=False).tolist()
+
+
+def get_page_classify_stats(page) -> dict:
+    """
+    统计单页的分类指标：
+
+        cleaned_chars：去除空白后的字符数；
+        valid_chars / invalid_chars：内容流中的字符数和其中unicode映射失败(pdfminer中表现为(cid:x))的字符数；
+        image_coverage_ratio：顶层图片和表单对象(对应pdfminer的LTImage/LTFigure)的面积之和占页面面积的比例；
+        graphic_objects：顶层图片、表单和路径对象的个数。
+    """
+    text_page = page.get_textpage()
+    try:
+        text = text_page.get_text_bounded()
+        cleaned_chars = len(re.sub(r'\s+', '', text))
+
+        valid_chars = 0
+        invalid_chars = 0
+        for char_index in range(text_page.count_chars()):
+            # 跳过pdfium自动补充的空格和换行
+            if pdfium_c.FPDFText_IsGenerated(text_page.raw, char_index) == 1:
+                continue
+            if pdfium_c.FPDFText_GetUnicode(text_page.raw, char_index) in (0x0A, 0x0D):
+                continue
+            valid_chars += 1
+            if pdfium_c.FPDFText_HasUnicodeMapError(text_page.raw, char_index) == 1:
+                invalid_chars += 1
+    finally:
+        text_page.close()
+
+    left, bottom, right, top = page.get_mediabox()
+    page_area = (right - left) * (top - bottom)
+    image_area = 0
+    graphic_objects = 0
+    obj_left, obj_bottom, obj_right, obj_top = (ctypes.c_float() for _ in range(4))
+    for obj_index in range(pdfium_c.FPDFPage_CountObjects(page.raw)):
+        page_obj = pdfium_c.FPDFPage_GetObject(page.raw, obj_index)
+        obj_type = pdfium_c.FPDFPageObj_GetType(page_obj)
+        if obj_type == pdfium_c.FPDF_PAGEOBJ_PATH:
+            graphic_objects += 1
+            continue
+        if obj_type not in (pdfium_c.FPDF_PAGEOBJ_IMAGE, pdfium_c.FPDF_PAGEOBJ_FORM):
+            continue
+        graphic_objects += 1
+        if pdfium_c.FPDFPageObj_GetBounds(page_obj, obj_left, obj_bottom, obj_right, obj_top):
+            image_area += (obj_right.value - obj_left.value) * (obj_top.value - obj_bottom.value)
+    image_coverage_ratio = min(image_area / page_area, 1.0) if page_area > 0 else 0
+
+    return {
+        'cleaned_chars': cleaned_chars,
+        'valid_chars': valid_chars,
+        'invalid_chars': invalid_chars,
+        'image_coverage_ratio': image_coverage_ratio,
+        'graphic_objects': graphic_objects,
+    }
+
+
+def classify_legacy(pdf_bytes):
+    """
+    判断PDF文件是可以直接提取文本还是需要OCR，基于pdfminer的旧实现，保留用于对比新实现的分类结果和耗时
+
     Args:
         pdf_bytes: PDF文件的字节数据
 
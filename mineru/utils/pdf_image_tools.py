@@ -1,4 +1,5 @@
 # Copyright (c) Opendatalab. All rights reserved.
+import os
 from io import BytesIO
 
 import numpy as np
@@ -8,6 +9,7 @@ from PIL import Image
 
 from mineru.data.data_reader_writer import FileBasedDataWriter
 from mineru.utils.pdf_reader import image_to_b64str, image_to_bytes, page_to_image
+from mineru.utils.pdf_rasterizer import get_pdf_rasterizer
 from .enum_class import ImageType
 from .hash_utils import str_sha256
 
@@ -50,6 +52,14 @@ def load_images_from_pdf(
         logger.warning("end_page_id is out of range, use images length")
         end_page_id = pdf_page_num - 1
 
+    # 页数较多时使用多进程渲染，渲染进程数可通过环境变量MINERU_PDF_RENDER_WORKERS设置，默认为1（单进程）
+    render_workers = int(os.getenv('MINERU_PDF_RENDER_WORKERS', 1))
+    if render_workers > 1 and end_page_id - start_page_id + 1 >= render_workers * 2:
+        images_list = get_pdf_rasterizer(render_workers).render(
+            pdf_bytes, start_page_id, end_page_id, dpi=dpi, image_type=image_type
+        )
+        return images_list, pdf_doc
+
     for index in range(0, pdf_page_num):
         if start_page_id <= index <= end_page_id:
             page = pdf_doc[index]
@@ -59,11 +69,44 @@ def load_images_from_pdf(
     return images_list, pdf_doc
 
 
+def iter_image_windows_from_pdf(
+    pdf_doc: pdfium.PdfDocument,
+    window_size: int,
+    dpi=200,
+    image_type=ImageType.PIL,  # PIL or BASE64
+):
+    """按窗口惰性渲染页面，每次只产出window_size页的图片，调用方处理完一个窗口后即可释放对应的位图。
+
+    Yields:
+        tuple: (窗口起始页索引, 该窗口内页面的image_dict列表)
+    """
+    window_size = max(1, int(window_size))
+    pdf_page_num = len(pdf_doc)
+    for window_start in range(0, pdf_page_num, window_size):
+        window_end = min(window_start + window_size, pdf_page_num)
+        images_list = [
+            pdf_page_to_image(pdf_doc[index], dpi=dpi, image_type=image_type)
+            for index in range(window_start, window_end)
+        ]
+        yield window_start, images_list
+
+
 def cut_image(bbox: tuple, page_num: int, page_pil_img, return_path, image_writer: FileBasedDataWriter, scale=2):
     """从第page_num页的page中，根据bbox进行裁剪出一张jpg图片，返回图片路径 save_path：需要同时支持s3和本地,
     图片存放在save_path下，文件名是:
     {page_num}_{bbox[0]}_{bbox[1]}_{bbox[2]}_{bbox[3]}.jpg , bbox内数字取整。"""
 
+    img_hash256_path = get_cut_image_path(bbox, page_num, return_path)
+
+    img_bytes = crop_and_encode_jpeg(bbox, page_pil_img, scale=scale)
+
+    image_writer.write(img_hash256_path, img_bytes)
+    return img_hash256_path
+
+
+def get_cut_image_path(bbox: tuple, page_num: int, return_path) -> str:
+    """截图的保存路径只由页码、bbox和return_path决定，可以在截图之前算出"""
+
     # 拼接文件名
     filename = f"{page_num}_{int(bbox[0])}_{int(bbox[1])}_{int(bbox[2])}_{int(bbox[3])}"
 
@@ -73,13 +116,12 @@ def cut_image(bbox: tuple, page_num: int, page_pil_img, return_path, image_write
     # 新版本生成平铺路径
     img_hash256_path = f"{str_sha256(img_path)}.jpg"
     # img_hash256_path = f'{img_path}.jpg'
+    return img_hash256_path
 
-    crop_img = get_crop_img(bbox, page_pil_img, scale=scale)
-
-    img_bytes = image_to_bytes(crop_img, image_format="JPEG")
 
-    image_writer.write(img_hash256_path, img_bytes)
-    return img_hash256_path
+def crop_and_encode_jpeg(bbox: tuple, page_pil_img, scale=2) -> bytes:
+    crop_img = get_crop_img(bbox, page_pil_img, scale=scale)
+    return image_to_bytes(crop_img, image_format="JPEG")
 
 
 def get_crop_img(bbox: tuple, pil_img, scale=2):
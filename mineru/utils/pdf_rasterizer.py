@@ -0,0 +1,168 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pypdfium2 as pdfium
+from loguru import logger
+from PIL import Image
+
+from .enum_class import ImageType
+from .pdf_reader import get_page_render_scale, image_to_b64str
+
+
+def render_page_to_shared_memory(page: pdfium.PdfPage, dpi=200, max_width_or_height=3500) -> dict:
+    """把页面渲染为RGB像素并写入一块新建的共享内存，返回共享内存名、图像形状和scale。
+
+    共享内存由接收方通过load_shared_page_image读取并释放。
+    """
+    scale = get_page_render_scale(page, dpi, max_width_or_height)
+    bitmap = page.render(scale=scale, rev_byteorder=True)
+    try:
+        np_bitmap = bitmap.to_numpy()
+        shape = (np_bitmap.shape[0], np_bitmap.shape[1], 3)
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        try:
+            np.copyto(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf), np_bitmap[:, :, :3])
+        finally:
+            shm.close()
+        # 共享内存的生命周期交给接收方管理，不再由渲染进程的resource_tracker跟踪
+        resource_tracker.unregister(shm._name, 'shared_memory')  # noqa
+    finally:
+        bitmap.close()
+    return {'shm_name': shm.name, 'shape': shape, 'scale': scale}
+
+
+def load_shared_page_image(page_meta: dict, image_type=ImageType.PIL) -> dict:
+    """读取render_page_to_shared_memory产出的页面，像素直接映射为numpy数组，转换完成后释放共享内存。
+
+    Returns:
+        dict:  {'img_base64': str, 'img_pil': pil_img, 'scale': float }，与pdf_page_to_image一致
+    """
+    shm = shared_memory.SharedMemory(name=page_meta['shm_name'])
+    try:
+        np_img = np.ndarray(page_meta['shape'], dtype=np.uint8, buffer=shm.buf)
+        pil_img = Image.fromarray(np_img)
+        del np_img
+    finally:
+        shm.close()
+        shm.unlink()
+
+    image_dict = {
+        "scale": page_meta['scale'],
+    }
+    if image_type == ImageType.BASE64:
+        image_dict["img_base64"] = image_to_b64str(pil_img)
+    else:
+        image_dict["img_pil"] = pil_img
+    return image_dict
+
+
+def release_shared_page_image(page_meta: dict):
+    try:
+        shm = shared_memory.SharedMemory(name=page_meta['shm_name'])
+        shm.close()
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _rasterize_page_range(pdf_bytes, start_page_id, end_page_id, dpi, max_width_or_height):
+    pdf_doc = pdfium.PdfDocument(pdf_bytes)
+    try:
+        return [
+            render_page_to_shared_memory(pdf_doc[index], dpi, max_width_or_height)
+            for index in range(start_page_id, end_page_id + 1)
+        ]
+    finally:
+        pdf_doc.close()
+
+
+class PdfRasterizer:
+    """多进程页面渲染池，每个进程渲染一段连续页面，像素通过共享内存传回主进程，避免pickle整张位图。"""
+
+    def __init__(self, workers: int | None = None):
+        self.workers = max(1, workers or min(4, os.cpu_count() or 1))
+        # spawn避免fork已初始化cuda的进程
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+
+    def render(
+        self,
+        pdf_bytes: bytes,
+        start_page_id=0,
+        end_page_id=None,
+        dpi=200,
+        max_width_or_height=3500,
+        image_type=ImageType.PIL,
+    ) -> list[dict]:
+        pdf_doc = pdfium.PdfDocument(pdf_bytes)
+        pdf_page_num = len(pdf_doc)
+        pdf_doc.close()
+
+        end_page_id = end_page_id if end_page_id is not None and end_page_id >= 0 else pdf_page_num - 1
+        if end_page_id > pdf_page_num - 1:
+            logger.warning("end_page_id is out of range, use images length")
+            end_page_id = pdf_page_num - 1
+        page_count = end_page_id - start_page_id + 1
+        if page_count <= 0:
+            return []
+
+        # 按进程数把页面切分为连续区间，每个区间只需解析一次pdf
+        chunk_size = (page_count + self.workers - 1) // self.workers
+        futures = [
+            self._executor.submit(
+                _rasterize_page_range, pdf_bytes, chunk_start,
+                min(chunk_start + chunk_size, end_page_id + 1) - 1, dpi, max_width_or_height
+            )
+            for chunk_start in range(start_page_id, end_page_id + 1, chunk_size)
+        ]
+
+        page_metas = []
+        error = None
+        for future in futures:
+            try:
+                page_metas.extend(future.result())
+            except Exception as e:
+                error = error or e
+
+        images_list = []
+        try:
+            if error is not None:
+                raise error
+            for page_meta in page_metas:
+                images_list.append(load_shared_page_image(page_meta, image_type))
+        finally:
+            # 出错时释放尚未读取的共享内存
+            for page_meta in page_metas[len(images_list):]:
+                release_shared_page_image(page_meta)
+        return images_list
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+_rasterizer = None
+
+
+def get_pdf_rasterizer(workers: int) -> PdfRasterizer:
+    """进程池创建开销较大，同一进程内复用，解释器退出时关闭进程池"""
+    global _rasterizer
+    if _rasterizer is None or _rasterizer.workers != workers:
+        if _rasterizer is not None:
+            atexit.unregister(_rasterizer.close)
+            _rasterizer.close()
+        _rasterizer = PdfRasterizer(workers)
+        atexit.register(_rasterizer.close)
+    return _rasterizer
@@ -7,16 +7,25 @@ from PIL import Image
 from pypdfium2 import PdfBitmap, PdfDocument, PdfPage
 
 
-def page_to_image(
+def get_page_render_scale(
     page: PdfPage,
     dpi: int = 200,
-    max_width_or_height: int = 3500,  # changed from 4500 to 3500
-) -> (Image.Image, float):
+    max_width_or_height: int = 3500,
+) -> float:
     scale = dpi / 72
 
     long_side_length = max(*page.get_size())
     if (long_side_length*scale) > max_width_or_height:
         scale = max_width_or_height / long_side_length
+    return scale
+
+
+def page_to_image(
+    page: PdfPage,
+    dpi: int = 200,
+    max_width_or_height: int = 3500,  # changed from 4500 to 3500
+) -> (Image.Image, float):
+    scale = get_page_render_scale(page, dpi, max_width_or_height)
 
     bitmap: PdfBitmap = page.render(scale=scale)  # type: ignore
 
@@ -1,5 +1,7 @@
 # Copyright (c) Opendatalab. All rights reserved.
-from mineru.utils.boxbase import calculate_overlap_area_in_bbox1_area_ratio
+import numpy as np
+
+from mineru.utils.boxbase import BboxGridIndex, bboxes_to_array, pairwise_overlap_area_in_bbox1_area_ratio
 from mineru.utils.enum_class import BlockType, ContentType
 from mineru.utils.ocr_utils import _is_overlaps_y_exceeds_threshold, _is_overlaps_x_exceeds_threshold
 
@@ -9,6 +11,15 @@ VERTICAL_SPAN_IN_BLOCK_THRESHOLD = 0.8
 def fill_spans_in_blocks(blocks, spans, radio):
     """将allspans中的span按位置关系，放入blocks中."""
     block_with_spans = []
+    # 只有与block相交的span才可能满足重叠比例，radio<0时不相交的span也满足条件，只能逐个比较
+    span_index = BboxGridIndex([span['bbox'] for span in spans]) if radio >= 0 else None
+    span_bboxes = bboxes_to_array([span['bbox'] for span in spans])
+    # image和table类型的span需要更高的重叠比例
+    span_radios = np.array(
+        [0.9 if span['type'] in [ContentType.IMAGE, ContentType.TABLE] else radio for span in spans],
+        dtype=np.float64
+    )
+    assigned = np.zeros(len(spans), dtype=bool)
     for block in blocks:
         block_type = block[7]
         block_bbox = block[0:4]
@@ -22,21 +33,27 @@ def fill_spans_in_blocks(blocks, spans, radio):
         ]:
             block_dict['group_id'] = block[-1]
         block_spans = []
-        for span in spans:
-            temp_radio = radio
-            span_bbox = span['bbox']
-            if span['type'] in [ContentType.IMAGE, ContentType.TABLE]:
-                temp_radio = 0.9
-            if calculate_overlap_area_in_bbox1_area_ratio(span_bbox, block_bbox) > temp_radio and span_block_type_compatible(span['type'], block_type):
-                block_spans.append(span)
+        if span_index is not None:
+            candidates = np.array(span_index.query(block_bbox), dtype=np.int64)
+        else:
+            candidates = np.arange(len(spans))
+        candidates = candidates[~assigned[candidates]]
+        if len(candidates) > 0:
+            overlap_ratios = pairwise_overlap_area_in_bbox1_area_ratio(
+                span_bboxes[candidates], bboxes_to_array([block_bbox])
+            )[:, 0]
+            for idx in candidates[overlap_ratios > span_radios[candidates]].tolist():
+                span = spans[idx]
+                if span_block_type_compatible(span['type'], block_type):
+                    block_spans.append(span)
+                    # 已经放入block_spans中的span不再参与后续block的分配
+                    assigned[idx] = True
 
         block_dict['spans'] = block_spans
         block_with_spans.append(block_dict)
 
-        # 从spans删除已经放入block_spans中的span
-        if len(block_spans) > 0:
-            for span in block_spans:
-                spans.remove(span)
+    # 从spans删除已经放入block中的span
+    spans[:] = [span for idx, span in enumerate(spans) if not assigned[idx]]
 
     return block_with_spans, spans
 
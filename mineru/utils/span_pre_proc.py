@@ -8,26 +8,32 @@ import numpy as np
 from loguru import logger
 
 from mineru.utils.boxbase import calculate_overlap_area_in_bbox1_area_ratio, calculate_iou, \
-    get_minbox_if_overlap_by_ratio
+    get_minbox_if_overlap_by_ratio, BboxGridIndex
 from mineru.utils.enum_class import BlockType, ContentType
 from mineru.utils.pdf_image_tools import get_crop_img
 from mineru.utils.pdf_text_tool import get_page
 
 
 def remove_outside_spans(spans, all_bboxes, all_discarded_blocks):
-    def get_block_bboxes(blocks, block_type_list):
-        return [block[0:4] for block in blocks if block[7] in block_type_list]
+    def get_block_index(blocks, block_type_list):
+        return BboxGridIndex([block[0:4] for block in blocks if block[7] in block_type_list])
 
-    image_bboxes = get_block_bboxes(all_bboxes, [BlockType.IMAGE_BODY])
-    table_bboxes = get_block_bboxes(all_bboxes, [BlockType.TABLE_BODY])
+    def overlap_any(span_bbox, block_index, ratio):
+        return any(
+            calculate_overlap_area_in_bbox1_area_ratio(span_bbox, block_index.bboxes[idx]) > ratio
+            for idx in block_index.query(span_bbox)
+        )
+
+    image_index = get_block_index(all_bboxes, [BlockType.IMAGE_BODY])
+    table_index = get_block_index(all_bboxes, [BlockType.TABLE_BODY])
     other_block_type = []
     for block_type in BlockType.__dict__.values():
         if not isinstance(block_type, str):
             continue
         if block_type not in [BlockType.IMAGE_BODY, BlockType.TABLE_BODY]:
             other_block_type.append(block_type)
-    other_block_bboxes = get_block_bboxes(all_bboxes, other_block_type)
-    discarded_block_bboxes = get_block_bboxes(all_discarded_blocks, [BlockType.DISCARDED])
+    other_index = get_block_index(all_bboxes, other_block_type)
+    discarded_index = get_block_index(all_discarded_blocks, [BlockType.DISCARDED])
 
     new_spans = []
 
@@ -35,73 +41,119 @@ def remove_outside_spans(spans, all_bboxes, all_discarded_blocks):
         span_bbox = span['bbox']
         span_type = span['type']
 
-        if any(calculate_overlap_area_in_bbox1_area_ratio(span_bbox, block_bbox) > 0.4 for block_bbox in
-               discarded_block_bboxes):
+        if overlap_any(span_bbox, discarded_index, 0.4):
             new_spans.append(span)
             continue
 
         if span_type == ContentType.IMAGE:
-            if any(calculate_overlap_area_in_bbox1_area_ratio(span_bbox, block_bbox) > 0.5 for block_bbox in
-                   image_bboxes):
+            if overlap_any(span_bbox, image_index, 0.5):
                 new_spans.append(span)
         elif span_type == ContentType.TABLE:
-            if any(calculate_overlap_area_in_bbox1_area_ratio(span_bbox, block_bbox) > 0.5 for block_bbox in
-                   table_bboxes):
+            if overlap_any(span_bbox, table_index, 0.5):
                 new_spans.append(span)
         else:
-            if any(calculate_overlap_area_in_bbox1_area_ratio(span_bbox, block_bbox) > 0.5 for block_bbox in
-                   other_block_bboxes):
+            if overlap_any(span_bbox, other_index, 0.5):
                 new_spans.append(span)
 
     return new_spans
 
 
+def __group_spans_by_bbox(spans):
+    """按bbox坐标分组，返回 {bbox元组: [span下标]}，组内下标升序."""
+    bbox_groups = collections.defaultdict(list)
+    for idx, span in enumerate(spans):
+        bbox_groups[tuple(span['bbox'])].append(idx)
+    return bbox_groups
+
+
+def __get_span_value_classes(spans, bbox_groups):
+    """给内容完全相等的span分配相同的编号，等价于原先逐个用 == 比较dict."""
+    value_classes = [0] * len(spans)
+    class_id = 0
+    for indices in bbox_groups.values():
+        representatives = []
+        for idx in indices:
+            for rep_idx, rep_class in representatives:
+                if spans[idx] == spans[rep_idx]:
+                    value_classes[idx] = rep_class
+                    break
+            else:
+                value_classes[idx] = class_id
+                representatives.append((idx, class_id))
+                class_id += 1
+    return value_classes
+
+
+def __remove_dropped_spans(spans, value_classes, dropped_classes):
+    """与逐个执行spans.remove(dropped_span)一致：每个被删除的值只删掉列表中第一个与之相等的span."""
+    removed_classes = set()
+    new_spans = []
+    for idx, span in enumerate(spans):
+        if value_classes[idx] in dropped_classes and value_classes[idx] not in removed_classes:
+            removed_classes.add(value_classes[idx])
+            continue
+        new_spans.append(span)
+    spans[:] = new_spans
+
+
 def remove_overlaps_low_confidence_spans(spans):
     dropped_spans = []
-    #  删除重叠spans中置信度低的的那些
-    for span1 in spans:
-        for span2 in spans:
-            if span1 != span2:
-                # span1 或 span2 任何一个都不应该在 dropped_spans 中
-                if span1 in dropped_spans or span2 in dropped_spans:
-                    continue
+    if len(spans) == 0:
+        return spans, dropped_spans
+    bbox_index = BboxGridIndex([span['bbox'] for span in spans])
+    value_classes = __get_span_value_classes(spans, __group_spans_by_bbox(spans))
+    dropped_classes = set()
+    #  删除重叠spans中置信度低的的那些，只需比较空间索引给出的相交候选
+    for i, span1 in enumerate(spans):
+        for j in bbox_index.query(span1['bbox']):
+            # span1 和 span2 内容相同时跳过
+            if value_classes[i] == value_classes[j]:
+                continue
+            # span1 或 span2 任何一个都不应该在 dropped_spans 中
+            if value_classes[i] in dropped_classes or value_classes[j] in dropped_classes:
+                continue
+            span2 = spans[j]
+            if calculate_iou(span1['bbox'], span2['bbox']) > 0.9:
+                if span1['score'] < span2['score']:
+                    remove_idx = i
                 else:
-                    if calculate_iou(span1['bbox'], span2['bbox']) > 0.9:
-                        if span1['score'] < span2['score']:
-                            span_need_remove = span1
-                        else:
-                            span_need_remove = span2
-                        if (
-                            span_need_remove is not None
-                            and span_need_remove not in dropped_spans
-                        ):
-                            dropped_spans.append(span_need_remove)
+                    remove_idx = j
+                dropped_classes.add(value_classes[remove_idx])
+                dropped_spans.append(spans[remove_idx])
 
     if len(dropped_spans) > 0:
-        for span_need_remove in dropped_spans:
-            spans.remove(span_need_remove)
+        __remove_dropped_spans(spans, value_classes, dropped_classes)
 
     return spans, dropped_spans
 
 
 def remove_overlaps_min_spans(spans):
     dropped_spans = []
-    #  删除重叠spans中较小的那些
-    for span1 in spans:
-        for span2 in spans:
-            if span1 != span2:
-                # span1 或 span2 任何一个都不应该在 dropped_spans 中
-                if span1 in dropped_spans or span2 in dropped_spans:
-                    continue
-                else:
-                    overlap_box = get_minbox_if_overlap_by_ratio(span1['bbox'], span2['bbox'], 0.65)
-                    if overlap_box is not None:
-                        span_need_remove = next((span for span in spans if span['bbox'] == overlap_box), None)
-                        if span_need_remove is not None and span_need_remove not in dropped_spans:
-                            dropped_spans.append(span_need_remove)
+    if len(spans) == 0:
+        return spans, dropped_spans
+    bbox_index = BboxGridIndex([span['bbox'] for span in spans])
+    bbox_groups = __group_spans_by_bbox(spans)
+    value_classes = __get_span_value_classes(spans, bbox_groups)
+    dropped_classes = set()
+    #  删除重叠spans中较小的那些，只需比较空间索引给出的相交候选
+    for i, span1 in enumerate(spans):
+        for j in bbox_index.query(span1['bbox']):
+            # span1 和 span2 内容相同时跳过
+            if value_classes[i] == value_classes[j]:
+                continue
+            # span1 或 span2 任何一个都不应该在 dropped_spans 中
+            if value_classes[i] in dropped_classes or value_classes[j] in dropped_classes:
+                continue
+            overlap_box = get_minbox_if_overlap_by_ratio(span1['bbox'], spans[j]['bbox'], 0.65)
+            if overlap_box is not None:
+                # 删除列表中第一个bbox与overlap_box相同的span
+                remove_idx = bbox_groups[tuple(overlap_box)][0]
+                if value_classes[remove_idx] not in dropped_classes:
+                    dropped_classes.add(value_classes[remove_idx])
+                    dropped_spans.append(spans[remove_idx])
+
     if len(dropped_spans) > 0:
-        for span_need_remove in dropped_spans:
-            spans.remove(span_need_remove)
+        __remove_dropped_spans(spans, value_classes, dropped_classes)
 
     return spans, dropped_spans
 
@@ -0,0 +1,73 @@
+# Copyright (c) Opendatalab. All rights reserved.
+"""对比表格分类模型逐图split/merge预处理与ClsPreprocessor批量预处理的耗时
+
+用法: python tests/benchmark/bench_cls_preprocess.py [表格数量] [batch_size]
+"""
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from mineru.model.cls_preprocess import ClsPreprocessor
+
+
+def reference_batch_preprocess(imgs):
+    res_imgs = []
+    for img in imgs:
+        h, w = img.shape[:2]
+        scale = 256 / min(h, w)
+        img = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=1)
+        h, w = img.shape[:2]
+        x1 = max(0, (w - 224) // 2)
+        y1 = max(0, (h - 224) // 2)
+        img = img[y1:min(h, y1 + 224), x1:min(w, x1 + 224), ...]
+        split_im = list(cv2.split(img))
+        std = [0.229, 0.224, 0.225]
+        scale = 0.00392156862745098
+        mean = [0.485, 0.456, 0.406]
+        alpha = [scale / std[i] for i in range(len(std))]
+        beta = [-mean[i] / std[i] for i in range(len(std))]
+        for c in range(img.shape[2]):
+            split_im[c] = split_im[c].astype(np.float32)
+            split_im[c] *= alpha[c]
+            split_im[c] += beta[c]
+        img = cv2.merge(split_im)
+        res_imgs.append(img.transpose((2, 0, 1)))
+    return np.stack(res_imgs, axis=0).astype(dtype=np.float32, copy=False)
+
+
+def bench(fn, batches, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for batch in batches:
+            fn(batch)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    table_num = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    rng = np.random.default_rng(0)
+    # 表格截图尺寸大致在几百像素到上千像素之间
+    imgs = [
+        rng.integers(0, 256, (int(rng.integers(150, 1200)), int(rng.integers(300, 1600)), 3), dtype=np.uint8)
+        for _ in range(table_num)
+    ]
+    batches = [imgs[i:i + batch_size] for i in range(0, table_num, batch_size)]
+
+    preprocessor = ClsPreprocessor()
+    assert np.array_equal(preprocessor(batches[0]), reference_batch_preprocess(batches[0]))
+
+    reference_time = bench(reference_batch_preprocess, batches)
+    batched_time = bench(preprocessor, batches)
+    print(f'{table_num} tables, batch_size {batch_size}')
+    print(f'split/merge per image: {reference_time / table_num * 1000:.3f} ms/table')
+    print(f'ClsPreprocessor:       {batched_time / table_num * 1000:.3f} ms/table')
+    print(f'speedup: {reference_time / batched_time:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
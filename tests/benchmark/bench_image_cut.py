@@ -0,0 +1,69 @@
+# Copyright (c) Opendatalab. All rights reserved.
+"""对比截图同步编码与延迟到线程池编码时调用方的耗时和总耗时
+
+用法: python tests/benchmark/bench_image_cut.py [pdf文件] [每页截图数]
+默认使用demo/pdfs/demo1.pdf，每页截取8张大小不同的图片。
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from mineru.data.data_reader_writer import MemoryDataWriter
+from mineru.utils.cut_image import ImageCutQueue
+from mineru.utils.enum_class import ImageType
+from mineru.utils.pdf_image_tools import cut_image, load_images_from_pdf
+
+
+def random_bboxes(page_w, page_h, count, rng):
+    bboxes = []
+    for _ in range(count):
+        w, h = rng.uniform(0.2, 0.9) * page_w, rng.uniform(0.1, 0.5) * page_h
+        x0, y0 = rng.uniform(0, page_w - w), rng.uniform(0, page_h - h)
+        bboxes.append((x0, y0, x0 + w, y0 + h))
+    return bboxes
+
+
+def run(images_list, bboxes_list, image_cut_queue=None):
+    writer = MemoryDataWriter()
+    start = time.perf_counter()
+    for page_id, (image_dict, bboxes) in enumerate(zip(images_list, bboxes_list)):
+        for bbox in bboxes:
+            if image_cut_queue is None:
+                cut_image(bbox, page_id, image_dict['img_pil'], 'images/bench', writer, scale=image_dict['scale'])
+            else:
+                image_cut_queue.submit(bbox, page_id, image_dict['img_pil'], 'images/bench', writer, scale=image_dict['scale'])
+    submit_time = time.perf_counter() - start
+    if image_cut_queue is not None:
+        image_cut_queue.flush(writer)
+    total_time = time.perf_counter() - start
+    return submit_time, total_time, sum(len(data) for data in writer.files.values())
+
+
+def main():
+    repo_root = os.path.join(os.path.dirname(__file__), '..', '..')
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(repo_root, 'demo', 'pdfs', 'demo1.pdf')
+    crops_per_page = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with open(pdf_path, 'rb') as f:
+        images_list, pdf_doc = load_images_from_pdf(f.read(), image_type=ImageType.PIL)
+    pdf_doc.close()
+
+    rng = np.random.default_rng(0)
+    bboxes_list = []
+    for image_dict in images_list:
+        page_w = image_dict['img_pil'].width / image_dict['scale']
+        page_h = image_dict['img_pil'].height / image_dict['scale']
+        bboxes_list.append(random_bboxes(page_w, page_h, crops_per_page, rng))
+    crop_count = sum(len(bboxes) for bboxes in bboxes_list)
+    workers = min(4, os.cpu_count() or 1)
+    print(f'{len(images_list)} pages, {crop_count} crops, {workers} workers')
+
+    for name, image_cut_queue in [('inline', None), ('deferred', ImageCutQueue(workers))]:
+        submit_time, total_time, total_bytes = run(images_list, bboxes_list, image_cut_queue)
+        print(f'{name:>8}: caller {submit_time * 1000:.0f}ms, total {total_time * 1000:.0f}ms, '
+              f'{total_bytes / 1024 / 1024:.1f}MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Copyright (c) Opendatalab. All rights reserved.
+"""在cpu上对比fp32与MINERU_CPU_QUANTIZE=true(int8动态量化)的pipeline耗时和OCR/公式识别结果一致性
+
+fp32和int8分别在独立的子进程中运行，避免模型单例互相影响；int8首次运行会生成量化缓存，
+因此int8先预热一次，统计第二次的耗时。
+
+用法: python tests/benchmark/bench_int8_quantization.py [pdf路径 ...]
+默认使用tests/unittest/pdfs下的所有pdf。
+"""
+import difflib
+import glob
+import multiprocessing
+import os
+import sys
+import time
+
+
+def run_pipeline(quantize, pdf_paths, result_queue):
+    os.environ['MINERU_DEVICE_MODE'] = 'cpu'
+    os.environ['MINERU_CPU_QUANTIZE'] = 'true' if quantize else 'false'
+    from mineru.backend.pipeline.pipeline_analyze import doc_analyze
+
+    pdf_bytes_list = []
+    for pdf_path in pdf_paths:
+        with open(pdf_path, 'rb') as f:
+            pdf_bytes_list.append(f.read())
+    lang_list = ['ch'] * len(pdf_bytes_list)
+
+    # 第一次运行包含模型加载(和量化缓存生成)，只统计第二次
+    doc_analyze(pdf_bytes_list, lang_list, parse_method='ocr', table_enable=False)
+    start = time.perf_counter()
+    infer_results = doc_analyze(pdf_bytes_list, lang_list, parse_method='ocr', table_enable=False)[0]
+    elapsed = time.perf_counter() - start
+
+    texts, latexes = [], []
+    for model_list in infer_results:
+        for page in model_list:
+            for det in page['layout_dets']:
+                if det.get('text'):
+                    texts.append(det['text'])
+                if det.get('latex'):
+                    latexes.append(det['latex'])
+    result_queue.put((elapsed, texts, latexes))
+
+
+def run_in_subprocess(quantize, pdf_paths):
+    ctx = multiprocessing.get_context('spawn')
+    result_queue = ctx.Queue()
+    process = ctx.Process(target=run_pipeline, args=(quantize, pdf_paths, result_queue))
+    process.start()
+    result = result_queue.get()
+    process.join()
+    return result
+
+
+def similarity(a_list, b_list):
+    return difflib.SequenceMatcher(None, '\n'.join(a_list), '\n'.join(b_list), autojunk=False).ratio()
+
+
+def main():
+    pdf_paths = sys.argv[1:] or sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'unittest', 'pdfs', '*.pdf')))
+    fp32_time, fp32_texts, fp32_latexes = run_in_subprocess(False, pdf_paths)
+    int8_time, int8_texts, int8_latexes = run_in_subprocess(True, pdf_paths)
+
+    print(f'{len(pdf_paths)} pdfs, {len(fp32_texts)} text spans, {len(fp32_latexes)} formulas')
+    print(f'fp32: {fp32_time:.2f}s')
+    print(f'int8: {int8_time:.2f}s')
+    print(f'speedup: {fp32_time / int8_time:.2f}x')
+    print(f'ocr text similarity:  {similarity(fp32_texts, int8_texts):.4f}')
+    print(f'formula similarity:   {similarity(fp32_latexes, int8_latexes):.4f}')
+
+
+if __name__ == '__main__':
+    main()
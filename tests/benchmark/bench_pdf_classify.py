@@ -0,0 +1,67 @@
+# Copyright (c) Opendatalab. All rights reserved.
+"""对比pdfium单次遍历的classify与基于pdfminer的classify_legacy的耗时和分类一致性
+
+用法: python tests/benchmark/bench_pdf_classify.py [pdf文件或目录 ...]
+默认使用demo/pdfs和tests/unittest/pdfs下的所有pdf，目录会递归查找pdf文件。
+"""
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+from mineru.utils.pdf_classify import classify, classify_legacy
+
+
+def collect_pdfs(paths):
+    pdf_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdf_paths += sorted(glob.glob(os.path.join(path, '**', '*.pdf'), recursive=True))
+        else:
+            pdf_paths.append(path)
+    return pdf_paths
+
+
+def timed_classify(fn, pdf_bytes, seed):
+    # 两种实现以相同的方式随机抽页，固定随机种子保证抽到相同的页面
+    np.random.seed(seed)
+    start = time.perf_counter()
+    result = fn(pdf_bytes)
+    return result, time.perf_counter() - start
+
+
+def main():
+    repo_root = os.path.join(os.path.dirname(__file__), '..', '..')
+    paths = sys.argv[1:] or [
+        os.path.join(repo_root, 'demo', 'pdfs'),
+        os.path.join(repo_root, 'tests', 'unittest', 'pdfs'),
+    ]
+    pdf_paths = collect_pdfs(paths)
+
+    fast_total, legacy_total = 0.0, 0.0
+    mismatches = []
+    for seed, pdf_path in enumerate(pdf_paths):
+        with open(pdf_path, 'rb') as f:
+            pdf_bytes = f.read()
+        fast_result, fast_time = timed_classify(classify, pdf_bytes, seed)
+        legacy_result, legacy_time = timed_classify(classify_legacy, pdf_bytes, seed)
+        fast_total += fast_time
+        legacy_total += legacy_time
+        if fast_result != legacy_result:
+            mismatches.append((pdf_path, fast_result, legacy_result))
+        print(f'{os.path.basename(pdf_path)}: {fast_result}/{legacy_result} '
+              f'pdfium {fast_time * 1000:.1f}ms, pdfminer {legacy_time * 1000:.1f}ms')
+
+    print(f'{len(pdf_paths)} pdfs, agreement {len(pdf_paths) - len(mismatches)}/{len(pdf_paths)}')
+    print(f'pdfium:   {fast_total:.2f}s')
+    print(f'pdfminer: {legacy_total:.2f}s')
+    if fast_total > 0:
+        print(f'speedup:  {legacy_total / fast_total:.2f}x')
+    for pdf_path, fast_result, legacy_result in mismatches:
+        print(f'mismatch: {pdf_path} pdfium={fast_result} pdfminer={legacy_result}')
+
+
+if __name__ == '__main__':
+    main()
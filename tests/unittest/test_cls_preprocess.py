@@ -0,0 +1,43 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import cv2
+import numpy as np
+
+from mineru.model.cls_preprocess import ClsPreprocessor
+
+
+def _reference_preprocess(img):
+    """原PaddleTableClsModel/PaddleOrientationClsModel中逐图逐通道的实现"""
+    h, w = img.shape[:2]
+    scale = 256 / min(h, w)
+    img = cv2.resize(img, (round(w * scale), round(h * scale)), interpolation=1)
+    h, w = img.shape[:2]
+    x1 = max(0, (w - 224) // 2)
+    y1 = max(0, (h - 224) // 2)
+    img = img[y1:min(h, y1 + 224), x1:min(w, x1 + 224), ...]
+    split_im = list(cv2.split(img))
+    std = [0.229, 0.224, 0.225]
+    scale = 0.00392156862745098
+    mean = [0.485, 0.456, 0.406]
+    for c in range(img.shape[2]):
+        split_im[c] = split_im[c].astype(np.float32)
+        split_im[c] *= scale / std[c]
+        split_im[c] += -mean[c] / std[c]
+    return cv2.merge(split_im).transpose((2, 0, 1))
+
+
+def test_cls_preprocess_matches_reference():
+    rng = np.random.default_rng(0)
+    sizes = [(224, 224), (300, 1200), (1500, 260), (97, 413), (800, 600), (33, 35)]
+    imgs = [rng.integers(0, 256, (h, w, 3), dtype=np.uint8) for h, w in sizes]
+    expected = np.stack([_reference_preprocess(img) for img in imgs])
+
+    preprocessor = ClsPreprocessor()
+    batch = preprocessor(imgs)
+    assert batch.dtype == np.float32
+    assert batch.shape == (len(imgs), 3, 224, 224)
+    assert np.array_equal(batch, expected)
+
+    # 较小的batch复用同一块内存
+    single = preprocessor(imgs[1:2])
+    assert single.shape == (1, 3, 224, 224)
+    assert np.array_equal(single[0], expected[1])
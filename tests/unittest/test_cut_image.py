@@ -0,0 +1,70 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import concurrent.futures
+import gc
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from mineru.data.data_reader_writer import MemoryDataWriter
+from mineru.utils import cut_image as cut_image_module
+from mineru.utils.cut_image import ImageCutQueue, cut_image_and_table, flush_image_cut_jobs
+from mineru.utils.pdf_image_tools import cut_image
+
+BBOXES = [(10, 10, 200, 120), (50, 300, 400, 500), (0, 0, 612, 792), (100.6, 20.2, 300.9, 80.4)]
+
+
+@pytest.fixture
+def page_img():
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 255, (1584, 1224, 3), dtype=np.uint8))
+
+
+class FailingWriter(MemoryDataWriter):
+    def write(self, path, data):
+        raise IOError(f'write {path} failed')
+
+
+@pytest.mark.parametrize('workers', ['0', '2'])
+def test_cut_image_and_table_matches_inline_cut(monkeypatch, page_img, workers):
+    monkeypatch.setenv('MINERU_IMAGE_CUT_WORKERS', workers)
+    monkeypatch.setattr(cut_image_module, '_image_cut_queue', None)
+    writer, expected_writer = MemoryDataWriter(), MemoryDataWriter()
+    spans = [{'type': 'image', 'bbox': bbox} for bbox in BBOXES]
+    for span in spans:
+        cut_image_and_table(span, page_img, 'md5', 3, writer)
+    flush_image_cut_jobs(writer)
+
+    for span in spans:
+        expected_path = cut_image(span['bbox'], 3, page_img, 'image/md5', expected_writer)
+        assert span['image_path'] == expected_path
+    assert writer.files == expected_writer.files
+
+
+def test_flush_raises_write_error(page_img):
+    image_cut_queue = ImageCutQueue(2)
+    writer, failing_writer = MemoryDataWriter(), FailingWriter()
+    image_cut_queue.submit(BBOXES[0], 0, page_img, 'image/md5', writer)
+    image_cut_queue.submit(BBOXES[1], 0, page_img, 'image/md5', failing_writer)
+    # 只等待并上报对应writer的截图
+    image_cut_queue.flush(writer)
+    assert len(writer.files) == 1
+    with pytest.raises(IOError, match='failed'):
+        image_cut_queue.flush(failing_writer)
+    image_cut_queue.flush(failing_writer)
+
+
+def test_discard_and_released_writer_leave_no_record(page_img):
+    image_cut_queue = ImageCutQueue(2)
+    failing_writer = FailingWriter()
+    image_cut_queue.submit(BBOXES[0], 0, page_img, 'image/md5', failing_writer)
+    # 出错退出时丢弃错误，之后同一writer的flush不再上报
+    image_cut_queue.discard(failing_writer)
+    image_cut_queue.flush(failing_writer)
+
+    # 未flush的writer被回收后记录随之删除，不会被复用相同id的新writer继承
+    image_cut_queue.submit(BBOXES[1], 0, page_img, 'image/md5', failing_writer)
+    concurrent.futures.wait(image_cut_queue._jobs[failing_writer])
+    del failing_writer
+    gc.collect()
+    assert len(image_cut_queue._jobs) == 0
@@ -189,14 +189,14 @@ def write_infer_result(
         images_list = all_image_lists[idx]
         pdf_doc = all_pdf_docs[idx]
         _lang = lang_list[idx]
-        _ocr_enable = ocr_enabled_list[idx]
+        _page_ocr_enable_list = ocr_enabled_list[idx]
         middle_json = pipeline_result_to_middle_json(
             model_list,
             images_list,
             pdf_doc,
             image_writer,
             _lang,
-            _ocr_enable,
+            _page_ocr_enable_list,
             True,
         )
 
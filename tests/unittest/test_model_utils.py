@@ -0,0 +1,112 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import copy
+import json
+import os
+import random
+
+import pytest
+
+from mineru.utils.boxbase import (
+    calculate_iou,
+    calculate_overlap_area_2_minbox_area_ratio,
+    calculate_overlap_area_in_bbox1_area_ratio,
+    pairwise_iou,
+    pairwise_overlap_area_2_minbox_area_ratio,
+    pairwise_overlap_area_in_bbox1_area_ratio,
+)
+from mineru.utils.model_utils import get_res_list_from_layout_res
+
+# 由逐对比较实现生成的密集layout及其过滤结果，结果用输入layout_res的下标表示，合并产生的新表格下标为-1
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "model_utils_golden.json")
+
+PAIRWISE_KERNELS = [
+    (pairwise_iou, calculate_iou),
+    (pairwise_overlap_area_in_bbox1_area_ratio, calculate_overlap_area_in_bbox1_area_ratio),
+    (pairwise_overlap_area_2_minbox_area_ratio, calculate_overlap_area_2_minbox_area_ratio),
+]
+
+
+def _load_golden_pages():
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _random_bboxes(rnd, count, as_int):
+    bboxes = []
+    for _ in range(count):
+        if as_int:
+            x0, y0 = rnd.randint(0, 300), rnd.randint(0, 300)
+            x1, y1 = x0 + rnd.randint(0, 120), y0 + rnd.randint(0, 120)
+        else:
+            x0, y0 = rnd.uniform(0, 300), rnd.uniform(0, 300)
+            x1, y1 = x0 + rnd.uniform(0, 120), y0 + rnd.uniform(0, 120)
+        bboxes.append([x0, y0, x1, y1])
+    return bboxes
+
+
+def _degenerate_bboxes():
+    return [
+        [10, 10, 50, 50],
+        [10, 10, 50, 50],  # 完全相同
+        [50, 10, 90, 50],  # 边相接
+        [10, 50, 50, 90],  # 边相接
+        [20, 20, 20, 40],  # 宽为0
+        [20, 30, 40, 30],  # 高为0
+        [30, 30, 30, 30],  # 点
+        [50, 50, 50, 50],  # 角上的点
+        [40, 40, 20, 20],  # 坐标反转
+        [45, 10, 30, 50],  # 仅x反转
+        [0, 0, 100, 100],  # 包含其他所有box
+        [25.5, 25.5, 26.5, 26.5],
+        [49.9, 49.9, 50.1, 50.1],
+    ]
+
+
+def _assert_matches_scalar(pairwise_fn, scalar_fn, bboxes1, bboxes2):
+    matrix = pairwise_fn(bboxes1, bboxes2)
+    assert matrix.shape == (len(bboxes1), len(bboxes2))
+    for i, bbox1 in enumerate(bboxes1):
+        for j, bbox2 in enumerate(bboxes2):
+            # 阈值比较依赖逐位一致，不能使用近似比较
+            assert matrix[i, j] == scalar_fn(bbox1, bbox2), (bbox1, bbox2)
+
+
+@pytest.mark.parametrize("pairwise_fn, scalar_fn", PAIRWISE_KERNELS, ids=lambda fn: fn.__name__)
+def test_pairwise_kernels_match_scalar_on_degenerate_boxes(pairwise_fn, scalar_fn):
+    bboxes = _degenerate_bboxes()
+    _assert_matches_scalar(pairwise_fn, scalar_fn, bboxes, bboxes)
+
+
+@pytest.mark.parametrize("as_int", [True, False], ids=["int", "float"])
+@pytest.mark.parametrize("pairwise_fn, scalar_fn", PAIRWISE_KERNELS, ids=lambda fn: fn.__name__)
+def test_pairwise_kernels_match_scalar_on_random_boxes(pairwise_fn, scalar_fn, as_int):
+    rnd = random.Random(0)
+    bboxes1 = _random_bboxes(rnd, 120, as_int) + _degenerate_bboxes()
+    bboxes2 = _random_bboxes(rnd, 80, as_int) + _degenerate_bboxes()
+    _assert_matches_scalar(pairwise_fn, scalar_fn, bboxes1, bboxes2)
+
+
+@pytest.mark.parametrize("pairwise_fn, scalar_fn", PAIRWISE_KERNELS, ids=lambda fn: fn.__name__)
+def test_pairwise_kernels_handle_empty_input(pairwise_fn, scalar_fn):
+    assert pairwise_fn([], [[0, 0, 10, 10]]).shape == (0, 1)
+    assert pairwise_fn([[0, 0, 10, 10]], []).shape == (1, 0)
+
+
+@pytest.mark.parametrize("page", _load_golden_pages(), ids=lambda page: f"{len(page['layout_res'])}_blocks")
+def test_get_res_list_from_layout_res_matches_golden(page):
+    layout_res = copy.deepcopy(page["layout_res"])
+    index_of = {id(res): i for i, res in enumerate(layout_res)}
+
+    ocr_res_list, table_res_list, mfdetrec_res = get_res_list_from_layout_res(layout_res)
+
+    def items(res_list):
+        return [[index_of.get(id(res), -1), res["poly"], res.get("score")] for res in res_list]
+
+    result = {
+        "ocr_res_list": items(ocr_res_list),
+        "table_res_list": items(table_res_list),
+        "mfdetrec_res": [res["bbox"] for res in mfdetrec_res],
+        "layout_res": [[index_of.get(id(res), -1), res["poly"]] for res in layout_res],
+    }
+    # 经过json序列化，使元组与列表、numpy标量与python数值可比
+    assert json.loads(json.dumps(result)) == page["expected"]
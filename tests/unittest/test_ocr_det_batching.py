@@ -0,0 +1,63 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from mineru.model.ocr.paddleocr2pytorch.tools.infer.predict_det import TextDetector
+
+
+class _StubDetector(TextDetector):
+    """不加载模型，对每张padding后的图片返回一个覆盖整图的框和一个落在右下角padding区域的框"""
+
+    def __init__(self):
+        self.det_algorithm = "DB"
+        self.batch_shapes = []
+
+    def batch_predict(self, img_list, max_batch_size=8):
+        self.batch_shapes.append([img.shape for img in img_list])
+        results = []
+        for img in img_list:
+            h, w = img.shape[:2]
+            full_box = [[w - 1, h - 1], [0, 0], [w - 1, 0], [0, h - 1]]
+            padding_box = [[w - 20, h - 20], [w - 1, h - 20], [w - 1, h - 1], [w - 20, h - 1]]
+            results.append((np.array([full_box, padding_box], dtype=np.float32), 0.0))
+        return results
+
+
+def _img(h, w):
+    return np.zeros((h, w, 3), dtype=np.uint8)
+
+
+def test_batch_predict_by_resolution_clips_boxes_to_original_shape():
+    detector = _StubDetector()
+    # 前两张分到同一组并padding到128x192，第三张单独一组
+    img_list = [_img(100, 150), _img(110, 140), _img(300, 40)]
+
+    results = detector.batch_predict_by_resolution(img_list, resolution_group_stride=64)
+
+    assert sorted(detector.batch_shapes) == sorted([
+        [(128, 192, 3), (128, 192, 3)],
+        [(320, 64, 3)],
+    ])
+    assert len(results) == len(img_list)
+    for img, (dt_boxes, _) in zip(img_list, results):
+        h, w = img.shape[:2]
+        # 覆盖整图的框被裁剪到原图范围内并按顺时针排序，完全落在padding区域的框被过滤
+        np.testing.assert_array_equal(
+            dt_boxes, np.array([[[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]]], dtype=np.float32)
+        )
+
+
+def test_filter_det_res_clips_and_drops_small_boxes():
+    detector = _StubDetector()
+    dt_boxes = np.array([
+        [[-5, -5], [60, -5], [60, 30], [-5, 30]],
+        [[10, 10], [12, 10], [12, 40], [10, 40]],
+    ], dtype=np.float32)
+
+    filtered = detector.filter_det_res(dt_boxes, (20, 50, 3))
+
+    np.testing.assert_array_equal(
+        filtered, np.array([[[0, 0], [49, 0], [49, 19], [0, 19]]], dtype=np.float32)
+    )
@@ -0,0 +1,52 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import types
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnx")
+onnxruntime = pytest.importorskip("onnxruntime")
+pytest.importorskip("omegaconf")
+
+from mineru.model.ocr.paddleocr2pytorch.onnx_export import export_det_onnx, export_rec_onnx
+from mineru.model.ocr.paddleocr2pytorch.pytorchocr.modeling.architectures.base_model import BaseModel
+from mineru.model.ocr.paddleocr2pytorch.tools.infer.pytorchocr_utility import get_arch_config
+
+
+def _model(tmp_path, arch_name, **kwargs):
+    """随机初始化的网络，只包含导出用到的属性，onnx导出到tmp_path"""
+    torch.manual_seed(0)
+    weights_path = tmp_path / f'{arch_name}.pth'
+    weights_path.write_bytes(b'')
+    net = BaseModel(get_arch_config(str(weights_path)), **kwargs)
+    net.eval()
+    return types.SimpleNamespace(weights_path=str(weights_path), device='cpu', net=net)
+
+
+def _run_onnx(onnx_path, x):
+    session = onnxruntime.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    return session.run(None, {'x': x})[0]
+
+
+def test_det_onnx_matches_torch(tmp_path):
+    model = _model(tmp_path, 'ch_PP-OCRv5_det_infer')
+    onnx_path = export_det_onnx(model)
+
+    # 与导出时的示例输入不同的batch和尺寸，检查动态维度
+    x = np.random.RandomState(0).rand(2, 3, 320, 480).astype(np.float32)
+    with torch.no_grad():
+        expected = model.net(torch.from_numpy(x))['maps'].numpy()
+    np.testing.assert_allclose(_run_onnx(onnx_path, x), expected, rtol=1e-3, atol=1e-4)
+
+
+def test_rec_onnx_matches_torch(tmp_path):
+    model = _model(tmp_path, 'ch_PP-OCRv5_rec_infer', out_channels=6625)
+    model.rec_image_shape = [3, 48, 320]
+    onnx_path = export_rec_onnx(model)
+
+    x = np.random.RandomState(0).rand(3, 3, 48, 480).astype(np.float32)
+    with torch.no_grad():
+        out = model.net(torch.from_numpy(x))
+        expected = (out[-1] if isinstance(out, (list, tuple)) else out).numpy()
+    np.testing.assert_allclose(_run_onnx(onnx_path, x), expected, rtol=1e-3, atol=1e-4)
@@ -0,0 +1,41 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import pytest
+
+pytest.importorskip("torch")
+
+from mineru.model.ocr.paddleocr2pytorch.tools.infer.predict_rec import TextRecognizer
+
+
+def _recognizer(rec_batch_pixels, rec_algorithm="SVTR_LCNet"):
+    recognizer = TextRecognizer.__new__(TextRecognizer)
+    recognizer.rec_image_shape = [3, 48, 320]
+    recognizer.limited_max_width = 1280
+    recognizer.limited_min_width = 16
+    recognizer.rec_batch_num = 8
+    recognizer.rec_batch_pixels = rec_batch_pixels
+    recognizer.rec_algorithm = rec_algorithm
+    return recognizer
+
+
+def test_batch_ranges_respect_pixel_budget():
+    recognizer = _recognizer(16 * 48 * 320)
+    ratios = sorted([1.5] * 40 + [10] * 10 + [30] * 7)
+    batch_ranges = recognizer.get_batch_ranges(ratios)
+
+    assert batch_ranges[0] == (0, 16)
+    assert batch_ranges[-1][1] == len(ratios)
+    for (beg, end), (next_beg, _) in zip(batch_ranges, batch_ranges[1:]):
+        assert end == next_beg
+    for beg, end in batch_ranges:
+        padded_pixels = (end - beg) * recognizer.get_padded_width(ratios[end - 1]) * 48
+        assert end - beg == 1 or padded_pixels <= recognizer.rec_batch_pixels
+    # 长文本行的batch比短文本行小
+    assert batch_ranges[-1][1] - batch_ranges[-1][0] < 16
+
+
+def test_batch_ranges_fixed_batch_num():
+    ratios = [1.0] * 20
+    assert _recognizer(0).get_batch_ranges(ratios) == [(0, 8), (8, 16), (16, 20)]
+    assert _recognizer(1, rec_algorithm="SVTR").get_batch_ranges(ratios) == [(0, 8), (8, 16), (16, 20)]
+    assert _recognizer(1).get_batch_ranges([1.0, 2.0]) == [(0, 1), (1, 2)]
+    assert _recognizer(1).get_batch_ranges([]) == []
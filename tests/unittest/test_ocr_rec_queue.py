@@ -0,0 +1,85 @@
+# Copyright (c) Opendatalab. All rights reserved.
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("torch")
+
+from mineru.backend.pipeline import ocr_rec_queue as ocr_rec_queue_module
+from mineru.backend.pipeline.ocr_rec_queue import OcrRecQueue
+
+# lang -> rec模型权重，None与ch共用同一个rec模型
+REC_WEIGHTS = {None: "ch_rec.pth", "ch": "ch_rec.pth", "en": "en_rec.pth"}
+
+
+class _FakeOcrModel:
+    def __init__(self, lang, calls):
+        self.lang = lang
+        self.text_recognizer = SimpleNamespace(weights_path=REC_WEIGHTS[lang])
+        self._calls = calls
+
+    def ocr(self, img_list, det=True, tqdm_enable=False, tqdm_desc=None):
+        assert det is False
+        self._calls.append((self.text_recognizer.weights_path, list(img_list)))
+        # 识别结果带上rec模型，便于确认图片交给了正确的模型
+        return [[(f"{img}@{self.text_recognizer.weights_path}", 0.9) for img in img_list]]
+
+
+class _FakeAtomModelSingleton:
+    def __init__(self, calls):
+        self._calls = calls
+        self._models = {}
+
+    def get_atom_model(self, atom_model_name, det_db_box_thresh=0.3, lang=None):
+        if lang not in self._models:
+            self._models[lang] = _FakeOcrModel(lang, self._calls)
+        return self._models[lang]
+
+
+@pytest.fixture
+def rec_calls(monkeypatch):
+    calls = []
+    atom_model_manager = _FakeAtomModelSingleton(calls)
+    monkeypatch.setattr(ocr_rec_queue_module, "AtomModelSingleton", lambda: atom_model_manager)
+    return calls
+
+
+def test_mixed_langs_sharing_rec_model_keep_submit_order(rec_calls):
+    queue = OcrRecQueue()
+    tickets = [
+        queue.submit("ch", ["table_a0", "table_a1"]),
+        queue.submit("en", ["text_en0"]),
+        queue.submit(None, ["text_none0", "text_none1"]),
+        queue.submit("ch", ["table_b0"]),
+        queue.submit("en", []),
+        queue.submit("en", ["text_en1", "text_en2"]),
+    ]
+    assert len(queue) == 8
+
+    queue.run()
+
+    # 共用rec模型的语言合并为一次识别，每个rec模型只调用一次
+    assert sorted(rec_calls) == [
+        ("ch_rec.pth", ["table_a0", "table_a1", "text_none0", "text_none1", "table_b0"]),
+        ("en_rec.pth", ["text_en0", "text_en1", "text_en2"]),
+    ]
+    assert [[text for text, _ in queue.get(ticket)] for ticket in tickets] == [
+        ["table_a0@ch_rec.pth", "table_a1@ch_rec.pth"],
+        ["text_en0@en_rec.pth"],
+        ["text_none0@ch_rec.pth", "text_none1@ch_rec.pth"],
+        ["table_b0@ch_rec.pth"],
+        [],
+        ["text_en1@en_rec.pth", "text_en2@en_rec.pth"],
+    ]
+    # run之后释放图片，只保留结果
+    assert len(queue) == 0
+
+
+def test_empty_queue_runs_without_rec(rec_calls):
+    queue = OcrRecQueue()
+    ticket = queue.submit("ch", [])
+
+    queue.run()
+
+    assert rec_calls == []
+    assert queue.get(ticket) == []
@@ -0,0 +1,145 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import json
+import os
+import threading
+
+import pytest
+from PIL import Image
+
+from mineru.data.data_reader_writer import FileBasedDataReader, FileBasedDataWriter
+from mineru.utils import page_result_cache
+from mineru.utils.enum_class import ModelPath
+from mineru.utils.page_result_cache import PageResultCache, get_page_cache_key
+
+
+@pytest.fixture(autouse=True)
+def models_root(tmp_path, monkeypatch):
+    """模型根目录指向临时目录，避免计算缓存键时下载模型"""
+    root = tmp_path / 'models_root'
+    layout_weights = root / ModelPath.doclayout_yolo
+    layout_weights.parent.mkdir(parents=True)
+    layout_weights.write_bytes(b'layout')
+    monkeypatch.setattr(page_result_cache, 'get_pipeline_models_root', lambda: str(root))
+    page_result_cache.get_models_fingerprint.cache_clear()
+    yield root
+    page_result_cache.get_models_fingerprint.cache_clear()
+
+
+def _key():
+    return get_page_cache_key(Image.new('RGB', (64, 32), 'white'), 'ch', True, True, True)
+
+
+def test_cache_key_covers_quantize_and_ocr_backend(monkeypatch):
+    monkeypatch.setenv('MINERU_DEVICE_MODE', 'cpu')
+    monkeypatch.delenv('MINERU_CPU_QUANTIZE', raising=False)
+    monkeypatch.delenv('MINERU_OCR_BACKEND', raising=False)
+    fp32_key = _key()
+
+    monkeypatch.setenv('MINERU_CPU_QUANTIZE', 'true')
+    int8_key = _key()
+    monkeypatch.setenv('MINERU_OCR_BACKEND', 'onnx')
+    onnx_key = _key()
+
+    assert len({fp32_key, int8_key, onnx_key}) == 3
+
+
+def test_cache_key_ignores_quantize_off_cpu(monkeypatch):
+    monkeypatch.setenv('MINERU_DEVICE_MODE', 'cuda')
+    monkeypatch.delenv('MINERU_OCR_BACKEND', raising=False)
+    monkeypatch.delenv('MINERU_CPU_QUANTIZE', raising=False)
+    key = _key()
+    # gpu上不量化，结果可以复用
+    monkeypatch.setenv('MINERU_CPU_QUANTIZE', 'true')
+    assert _key() == key
+
+
+def test_cache_key_covers_model_weights(models_root, monkeypatch):
+    monkeypatch.setenv('MINERU_DEVICE_MODE', 'cpu')
+    old_key = _key()
+
+    # 更新权重文件后新进程的缓存键改变
+    layout_weights = models_root / ModelPath.doclayout_yolo
+    layout_weights.write_bytes(b'new layout weights')
+    os.utime(layout_weights, ns=(1, 1))
+    page_result_cache.get_models_fingerprint.cache_clear()
+    new_key = _key()
+
+    # 其他模型目录中的权重同样计入
+    unimernet_weights = models_root / ModelPath.unimernet_small / 'model.safetensors'
+    unimernet_weights.parent.mkdir(parents=True)
+    unimernet_weights.write_bytes(b'mfr')
+    page_result_cache.get_models_fingerprint.cache_clear()
+    mfr_key = _key()
+
+    assert len({old_key, new_key, mfr_key}) == 3
+
+
+def test_cache_key_covers_device(monkeypatch):
+    monkeypatch.delenv('MINERU_CPU_QUANTIZE', raising=False)
+    monkeypatch.setenv('MINERU_DEVICE_MODE', 'cpu')
+    cpu_key = _key()
+    monkeypatch.setenv('MINERU_DEVICE_MODE', 'cuda')
+    cuda_key = _key()
+    monkeypatch.setenv('MINERU_DEVICE_MODE', 'cuda:1')
+    assert cuda_key == _key()
+    assert cpu_key != cuda_key
+
+
+def _cache(cache_dir, max_size):
+    # 每个实例相当于一个独立进程，各自持有内存中的索引
+    return PageResultCache(
+        FileBasedDataReader(str(cache_dir)), FileBasedDataWriter(str(cache_dir)), max_size=max_size,
+        lock_path=str(cache_dir / 'index.lock'),
+    )
+
+
+def _index_keys(cache_dir):
+    return [key for key, _ in json.loads((cache_dir / PageResultCache.INDEX_FILE).read_text())]
+
+
+def test_flush_merges_index_of_other_processes(tmp_path):
+    cache_a = _cache(tmp_path, max_size=10_000)
+    cache_b = _cache(tmp_path, max_size=10_000)
+    cache_a.put('aa01', [{'a': 1}])
+    cache_b.put('bb01', [{'b': 1}])
+    cache_a.flush()
+    cache_b.flush()
+
+    assert sorted(_index_keys(tmp_path)) == ['aa01', 'bb01']
+    # flush后能看到其他进程写入的条目
+    assert cache_b.get('aa01') == [{'a': 1}]
+
+
+def test_eviction_covers_entries_of_other_processes(tmp_path):
+    entry = [{'text': 'x' * 80}]
+    entry_size = len(json.dumps(entry).encode('utf-8'))
+    cache_a = _cache(tmp_path, max_size=entry_size * 3)
+    cache_b = _cache(tmp_path, max_size=entry_size * 3)
+    for i in range(3):
+        cache_a.put(f'aa{i:02d}', entry)
+    cache_a.flush()
+    for i in range(2):
+        cache_b.put(f'bb{i:02d}', entry)
+    cache_b.flush()
+
+    assert _index_keys(tmp_path) == ['aa02', 'bb00', 'bb01']
+    assert not (tmp_path / 'aa' / 'aa00.json').exists()
+    assert cache_a.get('aa00') is None
+
+
+def test_concurrent_flush_keeps_all_entries(tmp_path):
+    caches = [_cache(tmp_path, max_size=1_000_000) for _ in range(4)]
+
+    def worker(cache_id):
+        cache = caches[cache_id]
+        for i in range(20):
+            cache.put(f'{cache_id:02d}{i:04d}', [i])
+            cache.flush()
+
+    threads = [threading.Thread(target=worker, args=(cache_id,)) for cache_id in range(len(caches))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(_index_keys(tmp_path)) == 4 * 20
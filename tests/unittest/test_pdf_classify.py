@@ -0,0 +1,140 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import glob
+import os
+import random
+
+import numpy as np
+import pytest
+
+from mineru.utils.pdf_classify import classify, classify_legacy, classify_pages
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+CORPUS_PDFS = sorted(
+    glob.glob(os.path.join(REPO_ROOT, 'demo', 'pdfs', '*.pdf'))
+    + glob.glob(os.path.join(os.path.dirname(__file__), 'pdfs', '*.pdf'))
+)
+
+HELVETICA = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+# Identity-H编码且没有ToUnicode的CID字体，pdfminer提取为(cid:x)
+CID_FONT = (
+    b"<< /Type /Font /Subtype /Type0 /BaseFont /Foo /Encoding /Identity-H /DescendantFonts [<< /Type /Font "
+    b"/Subtype /CIDFontType2 /BaseFont /Foo /CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+    b"/FontDescriptor << /Type /FontDescriptor /FontName /Foo /Flags 4 /FontBBox [0 0 1000 1000] /ItalicAngle 0 "
+    b"/Ascent 800 /Descent -200 /CapHeight 700 /StemV 80 >> /DW 500 >>] >>"
+)
+GRAY_IMAGE = b"<< /Type /XObject /Subtype /Image /Width 2 /Height 2 /ColorSpace /DeviceGray /BitsPerComponent 8 /Length 4 >>\nstream\n\x00\xff\xff\x00\nendstream"
+
+
+def _text_content(cid=False, line_count=30):
+    rng = random.Random(0)
+    parts = [b"BT /F1 10 Tf 12 TL 50 750 Td"]
+    for _ in range(line_count):
+        if cid:
+            parts.append(b"<" + b"".join(b"%04X" % rng.randint(3, 90) for _ in range(40)) + b"> Tj T*")
+        else:
+            parts.append(b"(" + " ".join(f"word{rng.randint(0, 99)}" for _ in range(10)).encode() + b") Tj T*")
+    parts.append(b"ET")
+    return b"\n".join(parts)
+
+
+def _image_content(width, height):
+    return b"q %d 0 0 %d 0 0 cm /Im1 Do Q" % (width, height)
+
+
+def _build_pdf(page_contents, font=HELVETICA):
+    """生成每页内容流为page_contents的最小pdf，页面共享字体F1和图片Im1"""
+    page_count = len(page_contents)
+    font_id, image_id = 3 + page_count * 2, 4 + page_count * 2
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % (3 + i * 2) for i in range(page_count)), page_count
+        ),
+    ]
+    for i, content in enumerate(page_contents):
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 %d 0 R >> "
+            b"/XObject << /Im1 %d 0 R >> >> /Contents %d 0 R >>" % (font_id, image_id, 4 + i * 2)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+    objects += [font, GRAY_IMAGE]
+
+    pdf_bytes = b"%PDF-1.7\n"
+    offsets = []
+    for i, obj in enumerate(objects):
+        offsets.append(len(pdf_bytes))
+        pdf_bytes += b"%d 0 obj\n%s\nendobj\n" % (i + 1, obj)
+    xref_offset = len(pdf_bytes)
+    pdf_bytes += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf_bytes += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf_bytes += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return pdf_bytes
+
+
+SYNTHETIC_PDFS = {
+    'text': (_build_pdf([_text_content()] * 3), 'txt'),
+    'cid_text': (_build_pdf([_text_content(cid=True)] * 3, font=CID_FONT), 'ocr'),
+    'full_page_image': (_build_pdf([_image_content(612, 792)] * 3), 'ocr'),
+    'scanned_with_text_layer': (_build_pdf([_image_content(612, 792) + b"\n" + _text_content()] * 3), 'ocr'),
+    'text_with_small_image': (_build_pdf([_image_content(200, 100) + b"\n" + _text_content()] * 3), 'txt'),
+    'blank': (_build_pdf([b""] * 2), 'ocr'),
+}
+
+
+@pytest.mark.parametrize('name', list(SYNTHETIC_PDFS))
+def test_classify_synthetic_pdfs(name):
+    pdf_bytes, expected = SYNTHETIC_PDFS[name]
+    assert classify(pdf_bytes) == expected
+    assert classify_legacy(pdf_bytes) == expected
+
+
+@pytest.mark.parametrize('pdf_path', CORPUS_PDFS, ids=os.path.basename)
+def test_classify_agrees_with_legacy(pdf_path):
+    with open(pdf_path, 'rb') as f:
+        pdf_bytes = f.read()
+    # 两种实现以相同的方式随机抽页，固定随机种子保证抽到相同的页面
+    np.random.seed(0)
+    result = classify(pdf_bytes)
+    np.random.seed(0)
+    assert result == classify_legacy(pdf_bytes)
+
+
+def test_classify_invalid_pdf():
+    assert classify(b'not a pdf') == 'ocr'
+
+
+def test_classify_pages_mixed_pdf():
+    pdf_bytes = _build_pdf([
+        _text_content(),
+        _image_content(612, 792),
+        _image_content(200, 100) + b"\n" + _text_content(),
+        _image_content(612, 792) + b"\n" + _text_content(),
+        b"BT /F1 24 Tf 50 700 Td (Chapter 1) Tj ET",
+        b"",
+    ])
+    # 字符少但没有大图覆盖的页面（稀疏文本页、空白页）没有扫描证据，保留文本层
+    assert classify_pages(pdf_bytes) == ['txt', 'ocr', 'txt', 'ocr', 'txt', 'txt']
+
+
+def test_classify_pages_empty_page_with_graphics():
+    # 文字转为曲线的页面没有可提取的字符，只有路径对象
+    glyph_paths = b"\n".join(
+        b"%d %d m %d %d l %d %d l h f" % (x, y, x + 4, y + 8, x + 8, y)
+        for y in range(100, 700, 12) for x in range(50, 550, 10)
+    )
+    pdf_bytes = _build_pdf([
+        glyph_paths,
+        # 裁剪到内容区域的扫描图，覆盖率低于阈值
+        _image_content(300, 200),
+        b"",
+    ])
+    assert classify_pages(pdf_bytes) == ['ocr', 'ocr', 'txt']
+
+
+def test_classify_pages_cid_text():
+    pdf_bytes = _build_pdf([_text_content(cid=True)] * 2, font=CID_FONT)
+    assert classify_pages(pdf_bytes) == ['ocr', 'ocr']
+
+
+def test_classify_pages_invalid_pdf():
+    assert classify_pages(b'not a pdf') == []
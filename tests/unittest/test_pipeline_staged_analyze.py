@@ -0,0 +1,55 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pypdfium2 as pdfium
+import pytest
+
+pytest.importorskip("torch")
+
+from mineru.backend.pipeline import pipeline_staged_analyze
+
+
+class _BrokenExecutor:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool('render worker died')
+
+    def shutdown(self, *args, **kwargs):
+        pass
+
+
+def _blank_pdf(page_count):
+    pdf_doc = pdfium.PdfDocument.new()
+    for _ in range(page_count):
+        pdf_doc.new_page(612, 792)
+    pdf_bytes = bytearray()
+
+    class _Buffer:
+        def write(self, data):
+            pdf_bytes.extend(data)
+            return len(data)
+
+    pdf_doc.save(_Buffer())
+    pdf_doc.close()
+    return bytes(pdf_bytes)
+
+
+def test_render_error_does_not_hang(monkeypatch):
+    monkeypatch.setattr(pipeline_staged_analyze, 'ProcessPoolExecutor', _BrokenExecutor)
+    outcome = {}
+
+    def run():
+        try:
+            pipeline_staged_analyze.doc_analyze_staged([_blank_pdf(3)], ['ch'], [None], parse_method='txt')
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+
+    assert not thread.is_alive()
+    assert isinstance(outcome.get('error'), BrokenProcessPool)
@@ -0,0 +1,177 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import io
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pypdfium2 as pdfium
+import pytest
+
+from mineru.data.data_reader_writer import DataReader, FileBasedDataReader
+from mineru.data.io.http import HttpReader
+from mineru.data.io.range_file import RangeReadFile
+
+DEMO_PDF = os.path.join(os.path.dirname(__file__), '..', '..', 'demo', 'pdfs', 'small_ocr.pdf')
+
+
+class CountingFileReader(FileBasedDataReader):
+    def __init__(self):
+        super().__init__()
+        self.read_calls = []
+
+    def read_at(self, path, offset=0, limit=-1):
+        self.read_calls.append((offset, limit))
+        return super().read_at(path, offset, limit)
+
+
+class NoSizeReader(DataReader):
+    def read_at(self, path, offset=0, limit=-1):
+        return b''
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    rng = random.Random(0)
+    data = bytes(rng.getrandbits(8) for _ in range(100_000))
+    path = tmp_path / 'data.bin'
+    path.write_bytes(data)
+    return str(path), data
+
+
+@pytest.fixture
+def big_pdf(tmp_path):
+    src = pdfium.PdfDocument(DEMO_PDF)
+    out = pdfium.PdfDocument.new()
+    for _ in range(10):
+        out.import_pages(src)
+    buffer = io.BytesIO()
+    out.save(buffer)
+    path = tmp_path / 'big.pdf'
+    path.write_bytes(buffer.getvalue())
+    return str(path), len(out)
+
+
+def test_range_read_file_matches_data(data_file):
+    path, data = data_file
+    reader = CountingFileReader()
+    rng = random.Random(1)
+    with RangeReadFile(reader, path, block_size=4096, max_cached_blocks=4) as f:
+        assert f.size == len(data)
+        for _ in range(200):
+            offset = rng.randrange(len(data) + 10)
+            length = rng.randrange(20_000)
+            f.seek(offset)
+            assert f.read(length) == data[offset:offset + length]
+            assert f.tell() == min(offset + length, len(data)) if offset < len(data) else offset
+        f.seek(-10, io.SEEK_END)
+        assert f.read() == data[-10:]
+    # 每次请求都对齐到块
+    assert all(offset % 4096 == 0 for offset, _ in reader.read_calls)
+
+
+def test_range_read_file_caches_blocks(data_file):
+    path, data = data_file
+    reader = CountingFileReader()
+    with RangeReadFile(reader, path, block_size=4096) as f:
+        f.seek(50_000)
+        f.read(100)
+        request_count = f.request_count
+        f.seek(50_010)
+        assert f.read(50) == data[50_010:50_060]
+        assert f.request_count == request_count == len(reader.read_calls)
+
+
+def test_range_read_file_requires_size():
+    with pytest.raises(NotImplementedError):
+        RangeReadFile(NoSizeReader(), 'any')
+
+
+def test_pdfium_reads_page_subset_lazily(big_pdf):
+    path, page_count = big_pdf
+    full_pdf = pdfium.PdfDocument(path)
+    with RangeReadFile(CountingFileReader(), path, block_size=16 * 1024) as f:
+        pdf = pdfium.PdfDocument(f)
+        assert len(pdf) == page_count
+        subset = pdfium.PdfDocument.new()
+        subset.import_pages(pdf, [0, 1])
+        for page_index in range(2):
+            subset_img = subset[page_index].render(scale=0.3).to_pil()
+            full_img = full_pdf[page_index].render(scale=0.3).to_pil()
+            assert subset_img.tobytes() == full_img.tobytes()
+        pdf.close()
+        assert f.bytes_fetched < f.size / 2
+
+
+def _serve(data, support_range, served=None):
+    """HEAD返回405的http服务，与只签名GET的预签名url一致，served记录每次返回的字节数"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            self.send_response(405)
+            self.end_headers()
+
+        def do_GET(self):
+            range_header = self.headers.get('Range')
+            if support_range and range_header:
+                start, end = range_header.split('=')[1].split('-')
+                body = data[int(start):int(end) + 1]
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{int(start) + len(body) - 1}/{len(data)}')
+            else:
+                body = data
+                self.send_response(200)
+            if served is not None:
+                served.append(len(body))
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/data.bin'
+
+
+def test_http_reader_size_without_head(data_file):
+    _, data = data_file
+    server, url = _serve(data, support_range=True)
+    try:
+        reader = HttpReader()
+        assert reader.get_size(url) == len(data)
+        with RangeReadFile(reader, url, block_size=4096) as f:
+            f.seek(30_000)
+            assert f.read(100) == data[30_000:30_100]
+    finally:
+        server.shutdown()
+
+
+def test_http_reader_without_range_support(data_file):
+    _, data = data_file
+    server, url = _serve(data, support_range=False)
+    try:
+        with pytest.raises(NotImplementedError):
+            HttpReader().get_size(url)
+    finally:
+        server.shutdown()
+
+
+def test_read_remote_fn_downloads_page_range(big_pdf):
+    pytest.importorskip('reportlab')
+    from mineru.cli.common import read_remote_fn
+
+    path, _ = big_pdf
+    with open(path, 'rb') as f:
+        data = f.read()
+    served = []
+    server, url = _serve(data, support_range=True, served=served)
+    try:
+        pdf_bytes, start_page_id, end_page_id = read_remote_fn(url, 2, 3)
+    finally:
+        server.shutdown()
+
+    assert (start_page_id, end_page_id) == (0, None)
+    assert len(pdfium.PdfDocument(pdf_bytes)) == 2
+    assert sum(served) < len(data) / 2
@@ -0,0 +1,97 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import threading
+
+import pytest
+
+from mineru.data.data_reader_writer import multi_bucket_s3
+from mineru.data.data_reader_writer.s3 import S3DataWriter
+
+# 只用于避免用例出错时永久阻塞
+WAIT_TIMEOUT = 10
+
+
+class _FakeS3Writer:
+    """记录上传的key和并发数，以key中的fail标记模拟上传失败。
+
+    设置barrier时每次上传都要等到barrier凑齐才继续，设置release时上传在release被set之前不会完成。
+    """
+
+    uploads = {}
+    active = 0
+    max_active = 0
+    barrier = None
+    release = None
+    lock = threading.Lock()
+
+    def __init__(self, bucket, *args, **kwargs):
+        self.bucket = bucket
+
+    def write(self, key, data):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            if cls.barrier is not None:
+                cls.barrier.wait(WAIT_TIMEOUT)
+            if cls.release is not None and not cls.release.wait(WAIT_TIMEOUT):
+                raise TimeoutError(f'upload {key} was never released')
+        finally:
+            with cls.lock:
+                cls.active -= 1
+        if 'fail' in key:
+            raise IOError(f'upload {key} failed')
+        with cls.lock:
+            cls.uploads[f'{self.bucket}/{key}'] = data
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    monkeypatch.setattr(_FakeS3Writer, 'uploads', {})
+    monkeypatch.setattr(_FakeS3Writer, 'active', 0)
+    monkeypatch.setattr(_FakeS3Writer, 'max_active', 0)
+    monkeypatch.setattr(_FakeS3Writer, 'barrier', None)
+    monkeypatch.setattr(_FakeS3Writer, 'release', None)
+    monkeypatch.setattr(multi_bucket_s3, 'S3Writer', _FakeS3Writer)
+    return _FakeS3Writer
+
+
+def _make_writer(max_workers=None):
+    kwargs = {} if max_workers is None else {'max_workers': max_workers}
+    return S3DataWriter('images', 'bucket', 'ak', 'sk', 'http://localhost:9000', **kwargs)
+
+
+def test_default_writes_synchronously(fake_s3):
+    writer = _make_writer()
+    writer.write('a.jpg', b'1')
+    assert fake_s3.uploads == {'bucket/images/a.jpg': b'1'}
+    with pytest.raises(IOError):
+        writer.write('fail.jpg', b'2')
+
+
+def test_concurrent_writes_are_flushed(fake_s3):
+    # 4个上传线程同时到达barrier才能继续，并发不足时barrier超时，上传失败
+    fake_s3.barrier = threading.Barrier(4)
+    fake_s3.release = threading.Event()
+    writer = _make_writer(max_workers=4)
+    for i in range(16):
+        writer.write(f'{i}.jpg', b'%d' % i)
+    # write只提交上传，不等待完成：此时所有上传都还被release挡住
+    assert fake_s3.uploads == {}
+    fake_s3.release.set()
+    writer.flush()
+    assert fake_s3.uploads == {f'bucket/images/{i}.jpg': b'%d' % i for i in range(16)}
+    assert fake_s3.max_active == 4
+    writer.close()
+
+
+def test_flush_raises_upload_error(fake_s3):
+    writer = _make_writer(max_workers=2)
+    writer.write('ok.jpg', b'1')
+    writer.write('fail.jpg', b'2')
+    with pytest.raises(IOError, match='fail.jpg'):
+        writer.flush()
+    # 错误只上报一次
+    writer.flush()
+    assert list(fake_s3.uploads) == ['bucket/images/ok.jpg']
+    writer.close()
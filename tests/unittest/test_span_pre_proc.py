@@ -0,0 +1,72 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import copy
+import json
+import os
+import random
+
+import pytest
+
+from mineru.utils.boxbase import BboxGridIndex
+from mineru.utils.span_block_fix import fill_spans_in_blocks
+from mineru.utils.span_pre_proc import (
+    remove_outside_spans,
+    remove_overlaps_low_confidence_spans,
+    remove_overlaps_min_spans,
+)
+
+# 由逐对比较实现生成的密集页面及其输出，输出用输入spans的下标表示
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "span_pre_proc_golden.json")
+
+
+def _load_golden_pages():
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("page", _load_golden_pages(), ids=lambda page: f"{len(page['spans'])}_spans")
+def test_span_pre_proc_matches_golden(page):
+    spans = copy.deepcopy(page["spans"])
+    all_bboxes = page["all_bboxes"]
+    all_discarded_blocks = page["all_discarded_blocks"]
+    expected = page["expected"]
+
+    index_of = {id(span): i for i, span in enumerate(spans)}
+
+    def ids(items):
+        return [index_of[id(span)] for span in items]
+
+    spans = remove_outside_spans(spans, all_bboxes, all_discarded_blocks)
+    assert ids(spans) == expected["remove_outside_spans"]
+
+    spans, dropped = remove_overlaps_low_confidence_spans(spans)
+    assert [ids(spans), ids(dropped)] == expected["remove_overlaps_low_confidence_spans"]
+
+    spans, dropped = remove_overlaps_min_spans(spans)
+    assert [ids(spans), ids(dropped)] == expected["remove_overlaps_min_spans"]
+
+    discarded_with_spans, spans = fill_spans_in_blocks(all_discarded_blocks, spans, 0.4)
+    block_with_spans, spans = fill_spans_in_blocks(all_bboxes, spans, 0.5)
+    assert [
+        [ids(block["spans"]) for block in discarded_with_spans],
+        [ids(block["spans"]) for block in block_with_spans],
+        ids(spans),
+    ] == expected["fill_spans_in_blocks"]
+
+
+def test_bbox_grid_index_query_matches_brute_force():
+    rnd = random.Random(0)
+    bboxes = []
+    for _ in range(500):
+        x0, y0 = rnd.uniform(0, 600), rnd.uniform(0, 800)
+        bboxes.append([x0, y0, x0 + rnd.choice([0, rnd.uniform(1, 40), rnd.uniform(100, 600)]), y0 + rnd.uniform(0, 30)])
+    # 非法bbox不与任何bbox相交
+    bboxes.append([10, 10, 5, 20])
+    index = BboxGridIndex(bboxes)
+
+    for query_bbox in bboxes + [[0, 0, 612, 792], [-10, -10, -1, -1]]:
+        expected = [
+            idx for idx, bbox in enumerate(bboxes)
+            if max(query_bbox[0], bbox[0]) <= min(query_bbox[2], bbox[2])
+            and max(query_bbox[1], bbox[1]) <= min(query_bbox[3], bbox[3])
+        ]
+        assert index.query(query_bbox) == expected
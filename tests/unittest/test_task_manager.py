@@ -0,0 +1,167 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import sys
+import types
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from mineru.cli.task_manager import QueueFullError, TaskManager, TaskStatus, _run_task
+
+
+class _ManualExecutor:
+    """submit只记录任务，由测试手动完成"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, jobs):
+        future = Future()
+        self.futures.append((jobs, future))
+        return future
+
+    def shutdown(self, *args, **kwargs):
+        pass
+
+
+class _ManualTaskManager(TaskManager):
+    def _create_executor(self):
+        return _ManualExecutor()
+
+
+class _BrokenExecutor(_ManualExecutor):
+    def submit(self, fn, jobs):
+        raise BrokenProcessPool('worker died')
+
+
+class _BrokenTaskManager(TaskManager):
+    """前两个进程池损坏(即重建后重试仍失败)，之后的进程池正常"""
+
+    def __init__(self, *args, **kwargs):
+        self.created_executors = 0
+        super().__init__(*args, **kwargs)
+
+    def _create_executor(self):
+        self.created_executors += 1
+        return _BrokenExecutor() if self.created_executors <= 2 else _ManualExecutor()
+
+
+def _submit(manager, name, page_count):
+    return manager.submit([name], page_count, {'name': name})
+
+
+def _finish(manager, task):
+    for jobs, future in manager._executor.futures:
+        if jobs == [task.parse_kwargs] and not future.done():
+            future.set_result(([{}], [None]))
+            return
+    raise AssertionError(f'{task.pdf_file_names} is not running')
+
+
+def test_small_task_uses_reserved_worker():
+    manager = _ManualTaskManager(workers=2, small_task_pages=20)
+    large = _submit(manager, 'large', 1000)
+    large_2 = _submit(manager, 'large_2', 500)
+    small = _submit(manager, 'small', 3)
+
+    assert large.status == TaskStatus.RUNNING
+    # 大任务最多占用workers - 1个worker
+    assert large_2.status == TaskStatus.QUEUED
+    assert small.status == TaskStatus.RUNNING
+
+    _finish(manager, small)
+    assert large_2.status == TaskStatus.QUEUED
+    _finish(manager, large)
+    assert large_2.status == TaskStatus.RUNNING
+
+
+def test_small_task_skips_queued_large_task():
+    manager = _ManualTaskManager(workers=1, small_task_pages=20)
+    large = _submit(manager, 'large', 1000)
+    large_2 = _submit(manager, 'large_2', 500)
+    small = _submit(manager, 'small', 3)
+
+    assert manager.get_status(small.task_id)['queue_position'] == 0
+    assert manager.get_status(large_2.task_id)['queue_position'] == 1
+
+    _finish(manager, large)
+    assert small.status == TaskStatus.RUNNING
+    assert large_2.status == TaskStatus.QUEUED
+    _finish(manager, small)
+    assert large_2.status == TaskStatus.RUNNING
+
+
+def test_queued_large_task_does_not_reject_small_task():
+    manager = _ManualTaskManager(workers=1, max_queued_pages=100, small_task_pages=20)
+    _submit(manager, 'running', 50)
+    _submit(manager, 'large', 90)
+    small = _submit(manager, 'small', 10)
+    assert small.status == TaskStatus.QUEUED
+
+    with pytest.raises(QueueFullError):
+        _submit(manager, 'large_2', 21)
+
+
+@pytest.fixture
+def fake_parse(monkeypatch):
+    """替换worker中的解析函数：合并推理只要包含bad文件就失败，单独解析时只有bad文件失败"""
+    calls = []
+
+    def do_parse_pipeline_batch(parse_jobs):
+        calls.append(('batch', [job['pdf_file_names'] for job in parse_jobs]))
+        for job in parse_jobs:
+            if 'bad.pdf' in job['pdf_file_names']:
+                raise ValueError('bad.pdf is corrupt')
+            job['memory_files']['batch.md'] = b'batch'
+
+    async def aio_do_parse(output_dir, memory_files, pdf_file_names, **kwargs):
+        calls.append(('single', pdf_file_names))
+        if 'bad.pdf' in pdf_file_names:
+            raise ValueError('bad.pdf is corrupt')
+        memory_files[f'{pdf_file_names[0]}.md'] = b'single'
+
+    common = types.ModuleType('mineru.cli.common')
+    common.do_parse_pipeline_batch = do_parse_pipeline_batch
+    common.aio_do_parse = aio_do_parse
+    monkeypatch.setitem(sys.modules, 'mineru.cli.common', common)
+    return calls
+
+
+def test_batch_failure_only_fails_bad_job(fake_parse):
+    jobs = [{'pdf_file_names': ['good.pdf']}, {'pdf_file_names': ['bad.pdf']}]
+    results, errors = _run_task(jobs)
+    assert fake_parse == [('batch', [['good.pdf'], ['bad.pdf']]), ('single', ['good.pdf']), ('single', ['bad.pdf'])]
+    # 合并推理的部分输出被丢弃，正常任务使用单独解析的结果
+    assert results == [{'good.pdf.md': b'single'}, None]
+    assert errors == [None, 'bad.pdf is corrupt']
+
+
+def test_batch_failure_marks_only_bad_task_failed():
+    # 两个任务凑满batch_max_pages后立即合并下发
+    manager = _ManualTaskManager(workers=1, batch_wait=10, batch_max_pages=2)
+    good = manager.submit(['good.pdf'], 1, {'name': 'good'}, batch_key='pipeline')
+    bad = manager.submit(['bad.pdf'], 1, {'name': 'bad'}, batch_key='pipeline')
+    ((jobs, future),) = manager._executor.futures
+    assert len(jobs) == 2
+
+    future.set_result(([{'good.md': b'1'}, None], [None, 'bad.pdf is corrupt']))
+    assert good.status == TaskStatus.DONE
+    assert good.result == {'good.md': b'1'}
+    assert bad.status == TaskStatus.FAILED
+    assert bad.error == 'bad.pdf is corrupt'
+    manager.close()
+
+
+def test_submit_failure_fails_batch_and_keeps_dispatching():
+    manager = _BrokenTaskManager(workers=1)
+    broken = _submit(manager, 'broken', 3)
+    # 重试提交失败时任务结束为失败，worker名额被释放
+    assert broken.status == TaskStatus.FAILED
+    assert 'worker died' in broken.error
+    assert broken.done_future.done()
+    assert manager._running == 0
+
+    task = _submit(manager, 'next', 3)
+    assert task.status == TaskStatus.RUNNING
+    _finish(manager, task)
+    assert task.status == TaskStatus.DONE
@@ -0,0 +1,120 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("skimage")
+pytest.importorskip("bs4")
+
+from mineru.model.table.rec.unet_table.main import UnetTableModel, WiredTableOutput, WiredTableRecognition
+from mineru.model.table.rec.unet_table.table_structure_unet import TSRUnet
+from mineru.model.table.rec.unet_table.utils import LoadImage, resize_img
+
+# 第二张表格的宽度，用于在后处理中识别出该表格并抛出异常
+BROKEN_WIDTH = 130
+
+
+class _FakeSession:
+    def __init__(self):
+        self.input_shapes = []
+
+    def __call__(self, inputs):
+        images = inputs[0]
+        self.input_shapes.append(images.shape)
+        return [np.zeros((images.shape[0], 1) + images.shape[2:], dtype=np.float32)]
+
+
+def _tsr_unet(monkeypatch):
+    tsr_unet = TSRUnet.__new__(TSRUnet)
+    tsr_unet.mean = np.array([123.675, 116.28, 103.53], dtype=np.float32)
+    tsr_unet.std = np.array([58.395, 57.12, 57.375], dtype=np.float32)
+    tsr_unet.inp_height = 1024
+    tsr_unet.inp_width = 1024
+    tsr_unet.pad_stride = 32
+    tsr_unet.session = _FakeSession()
+
+    def postprocess(img, pred, **kwargs):
+        if img.shape[1] == BROKEN_WIDTH:
+            raise RuntimeError('postprocess failed')
+        polygons = np.array([[0, 0, 10, 0, 10, 10, 0, 10]], dtype=np.float32)
+        return polygons, polygons.copy()
+
+    monkeypatch.setattr(tsr_unet, 'postprocess', postprocess)
+    return tsr_unet
+
+
+def _imgs():
+    return [np.full((100, width, 3), 255, dtype=np.uint8) for width in (120, BROKEN_WIDTH, 140)]
+
+
+def test_tsr_unet_batch_predict_isolates_failed_table(monkeypatch):
+    results = _tsr_unet(monkeypatch).batch_predict(_imgs())
+
+    assert results[1] is None
+    for result in (results[0], results[2]):
+        polygons, rotated_polygons = result
+        assert polygons.shape == (1, 4, 2)
+        assert rotated_polygons.shape == (1, 4, 2)
+
+
+def test_tsr_unet_batch_predict_pads_only_leftover_tables(monkeypatch):
+    tsr_unet = _tsr_unet(monkeypatch)
+    same_shape = [np.full((100, 120, 3), 255, dtype=np.uint8) for _ in range(2)]
+    # 缩放后尺寸不同但向上取整到pad_stride后相同的两张表格，以及一张尺寸独一无二的表格
+    leftovers = [np.full((100, width, 3), 255, dtype=np.uint8) for width in (200, 201)]
+    single = [np.full((300, 100, 3), 255, dtype=np.uint8)]
+    imgs = same_shape + leftovers + single
+    resized_shapes = [resize_img(img, (1024, 1024), True)[0].shape[:2] for img in imgs]
+    assert resized_shapes[2] != resized_shapes[3]
+
+    results = tsr_unet.batch_predict(imgs)
+
+    assert all(result is not None for result in results)
+    pad_shape = tuple(-(-size // 32) * 32 for size in resized_shapes[2])
+    assert sorted(shape[0:1] + shape[2:] for shape in tsr_unet.session.input_shapes) == sorted([
+        (2,) + resized_shapes[0],
+        (2,) + pad_shape,
+        (1,) + resized_shapes[4],
+    ])
+
+
+def test_tsr_unet_batch_predict_single_table_is_not_padded(monkeypatch):
+    tsr_unet = _tsr_unet(monkeypatch)
+    img = np.full((100, 121, 3), 255, dtype=np.uint8)
+    resized_shape = resize_img(img, (1024, 1024), True)[0].shape[:2]
+    assert resized_shape[0] % 32 != 0
+
+    tsr_unet.batch_predict([img])
+
+    assert tsr_unet.session.input_shapes == [(1, 3) + resized_shape]
+
+
+def test_unet_table_batch_predict_falls_back_only_failed_table(monkeypatch):
+    wired_table_model = WiredTableRecognition.__new__(WiredTableRecognition)
+    wired_table_model.table_structure = _tsr_unet(monkeypatch)
+    wired_table_model.load_img = LoadImage()
+    wired_table_model.ocr_engine = None
+
+    def recover_structure(img, polygons, rotated_polygons, ocr_result, **kwargs):
+        if img.shape[1] == 140:
+            raise RuntimeError('recover failed')
+        return {"blank_crops": [], "width": img.shape[1]}
+
+    def build_output(state):
+        return WiredTableOutput(f"<table>wired {state['width']}</table>")
+
+    monkeypatch.setattr(wired_table_model, 'recover_structure', recover_structure)
+    monkeypatch.setattr(wired_table_model, 'build_output', build_output)
+    monkeypatch.setattr(UnetTableModel, 'select_html', staticmethod(lambda wired, ocr, wireless: wired))
+
+    model = UnetTableModel.__new__(UnetTableModel)
+    model.wired_table_model = wired_table_model
+    table_res_list = [
+        {"wired_table_img": img, "ocr_result": [[None, "text", 1.0]], "table_res": {"html": f"wireless {i}"}}
+        for i, img in enumerate(_imgs())
+    ]
+    model.batch_predict(table_res_list)
+
+    assert [table_res["table_res"]["html"] for table_res in table_res_list] == [
+        "<table>wired 120</table>", "wireless 1", "wireless 2",
+    ]
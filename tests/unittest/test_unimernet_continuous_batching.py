@@ -0,0 +1,91 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import types
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from mineru.model.mfr.unimernet.unimernet_hf import modeling_unimernet
+from mineru.model.mfr.unimernet.unimernet_hf.unimer_mbart import UnimerMBartConfig, UnimerMBartForCausalLM
+
+BOS, PAD, EOS = 0, 1, 2
+ENCODER_LEN = 7
+D_MODEL = 32
+MAX_NEW_TOKENS = 20
+
+
+class _TinyUnimernet:
+    """只包含continuous_generate用到的属性，encoder直接把输入reshape为encoder hidden states"""
+
+    continuous_generate = modeling_unimernet.UnimernetModel.continuous_generate
+    _evict_finished = staticmethod(modeling_unimernet.UnimernetModel._evict_finished)
+
+    def __init__(self, decoder):
+        self.decoder = decoder
+        self.device = torch.device("cpu")
+        self.dtype = torch.float64
+        self.generation_config = types.SimpleNamespace(eos_token_id=EOS)
+        self.tokenizer = types.SimpleNamespace(
+            bos_token_id=BOS,
+            eos_token_id=EOS,
+            token2str=lambda tokens: [" ".join(map(str, t)) for t in tokens],
+        )
+
+    def get_max_new_tokens(self, batch_size):
+        return MAX_NEW_TOKENS
+
+    def encode_images(self, pixel_values):
+        return pixel_values.view(pixel_values.shape[0], ENCODER_LEN, D_MODEL)
+
+
+@pytest.fixture
+def tiny_model(monkeypatch):
+    default_dtype = torch.get_default_dtype()
+    # float64下逐条解码与连续批处理的结果不受浮点误差影响，可以逐token比较
+    torch.set_default_dtype(torch.float64)
+    torch.manual_seed(0)
+    config = UnimerMBartConfig(
+        vocab_size=50, d_model=D_MODEL, decoder_layers=2, decoder_attention_heads=4, decoder_ffn_dim=64,
+        max_position_embeddings=64, qk_squeeze=2, scale_embedding=False, is_decoder=True,
+        add_cross_attention=True, bos_token_id=BOS, eos_token_id=EOS, pad_token_id=PAD,
+    )
+    config._attn_implementation = "eager"
+    decoder = UnimerMBartForCausalLM(config).eval()
+    with torch.no_grad():
+        # 放大eos的权重，使不同输入在不同位置结束
+        decoder.lm_head.weight[EOS] *= 10
+    monkeypatch.setattr(modeling_unimernet, "latex_rm_whitespace", lambda s: s)
+    yield _TinyUnimernet(decoder)
+    torch.set_default_dtype(default_dtype)
+
+
+def _greedy_decode(decoder, image):
+    input_ids = torch.tensor([[BOS]])
+    encoder_hidden_states = image.view(1, ENCODER_LEN, D_MODEL)
+    tokens = []
+    with torch.no_grad():
+        for _ in range(MAX_NEW_TOKENS):
+            outputs = decoder.model.decoder(
+                input_ids=input_ids, encoder_hidden_states=encoder_hidden_states, return_dict=True
+            )
+            token = int(decoder.lm_head(outputs.last_hidden_state[:, -1]).argmax(-1))
+            if token == EOS:
+                break
+            tokens.append(token)
+            input_ids = torch.cat([input_ids, torch.tensor([[token]])], dim=1)
+    return " ".join(map(str, tokens))
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 8, 32])
+def test_continuous_generate_matches_greedy_decoding(tiny_model, batch_size):
+    images = [torch.randn(ENCODER_LEN * D_MODEL) * (0.2 + i) for i in range(23)]
+    expected = [_greedy_decode(tiny_model.decoder, image) for image in images]
+    # 输入需要覆盖提前结束和达到最大长度两种情况
+    assert len({len(s.split()) for s in expected}) > 1
+
+    finished = []
+    results = tiny_model.continuous_generate(iter(images), batch_size=batch_size, progress_callback=finished.append)
+
+    assert results == expected
+    assert sum(finished) == len(images)